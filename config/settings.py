@@ -43,6 +43,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'seats.middleware.RequestMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -55,7 +56,7 @@ ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'seats.metrics.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -70,6 +71,32 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
+# 请求性能统计：开启后输出 Server-Timing 响应头，并通过 /metrics 暴露 Prometheus 指标
+SEATS_REQUEST_METRICS = False
+
+# 导入临时文件：超过有效期（秒）自动清理；磁盘与内存占用超出上限时按最近访问淘汰；
+# 不超过 SEATS_TEMP_IMPORT_MEMORY_ITEM_BYTES 的小文件只保存在内存中
+SEATS_TEMP_IMPORT_TTL = 6 * 60 * 60
+SEATS_TEMP_IMPORT_MAX_DISK_BYTES = 200 * 1024 * 1024
+SEATS_TEMP_IMPORT_MAX_MEMORY_BYTES = 32 * 1024 * 1024
+SEATS_TEMP_IMPORT_MEMORY_ITEM_BYTES = 2 * 1024 * 1024
+SEATS_TEMP_IMPORT_SWEEP_INTERVAL = 10 * 60
+
+# 导出缓存：相同布局与导出选项的 Excel/SVG/PPTX 直接返回已生成的文件（带 ETag），
+# 缓存目录总大小超过上限（字节）时淘汰最久未使用的文件；设为 0 关闭缓存
+SEATS_EXPORT_CACHE_MAX_BYTES = 100 * 1024 * 1024
+# 缓存目录，默认为 BASE_DIR/export_cache；运行测试时改用临时目录（见 seats.test_runner）
+SEATS_EXPORT_CACHE_DIR = None
+
+# 后台任务：导入、排座、导出等视图带 async=1 参数时在后台线程中执行，通过 /jobs/<id>/ 查询进度。
+# SEATS_JOB_EAGER 为 True 时在当前请求中同步执行（用于测试）
+SEATS_JOB_WORKERS = 2
+SEATS_JOB_EAGER = False
+# 已结束的任务记录保留多久（秒），程序启动时清理更早的记录
+SEATS_JOB_RETENTION = 7 * 24 * 60 * 60
+
+TEST_RUNNER = 'seats.test_runner.SeatsTestRunner'
+
 
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
@@ -1,3 +1,4 @@
+import multiprocessing
 import os
 import sys
 from io import StringIO
@@ -57,6 +58,13 @@ def main():
     except Exception as e:
         print(f"数据库迁移出错: {e}", file=sys.stderr, flush=True)
 
+    # 清理过期的导入临时文件，并在后台定期清理
+    from seats.temp_store import store as temp_store
+    temp_store.start_sweeper()
+
+    # 启动后台任务线程池（导入、排座、导出等耗时操作）
+    from seats.jobs import runner as job_runner
+    job_runner.start()
 
     PORT = 23948
     print(f"正在启动服务器 http://127.0.0.1:23948 ...", flush=True)
@@ -64,5 +72,7 @@ def main():
     serve(application, host='127.0.0.1', port=PORT)
 
 if __name__ == '__main__':
+    # 打包后的 exe 中启动子进程（按年级导入并行解析工作表）需要此调用
+    multiprocessing.freeze_support()
     main()
    
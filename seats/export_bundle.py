@@ -0,0 +1,177 @@
+import os
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+
+# 本模块顶层不导入 Django，子进程（包括 spawn 启动方式）可以先导入本模块再初始化 Django
+
+# 批量导出支持的格式：格式名 -> (导出视图名, 文件名后缀)
+EXPORT_BUNDLE_FORMATS = {
+    'excel': ('export_students', '_座次图.xlsx'),
+    'svg': ('export_students_svg', '_座次图.svg'),
+    'pptx': ('export_students_pptx', '_座次图.pptx'),
+    'group_report': ('export_group_report', '_小组作业表.xlsx'),
+}
+EXPORT_BUNDLE_MAX_WORKERS = 4
+EXPORT_BUNDLE_FAILURE_NAME = '导出失败.txt'
+# xlsx/pptx 本身就是 zip 压缩包，再压缩几乎没有收益，只压缩文本格式
+_COMPRESSED_SUFFIXES = ('.svg',)
+
+
+class BundleTask:
+    __slots__ = ('arcname', 'view_name', 'classroom_pk', 'label')
+
+    def __init__(self, arcname, view_name, classroom_pk, label):
+        self.arcname = arcname
+        self.view_name = view_name
+        self.classroom_pk = classroom_pk
+        self.label = label
+
+
+def _safe_name(name):
+    return ''.join('_' if ch in '/\\:*?"<>|' else ch for ch in str(name)).strip() or '未命名'
+
+
+def build_bundle_tasks(classrooms, formats):
+    """按班级、格式生成导出任务；重名班级的目录名追加编号以免互相覆盖。"""
+    names = [_safe_name(classroom.name) for classroom in classrooms]
+    duplicated = {name for name in names if names.count(name) > 1}
+    tasks = []
+    for classroom, name in zip(classrooms, names):
+        folder = f'{name}_{classroom.pk}' if name in duplicated else name
+        for fmt in formats:
+            view_name, suffix = EXPORT_BUNDLE_FORMATS[fmt]
+            tasks.append(BundleTask(f'{folder}/{name}{suffix}', view_name, classroom.pk, f'{classroom.name} {fmt}'))
+    return tasks
+
+
+def init_worker():
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+    from .export_cache import cache
+
+    # 导出缓存的索引只在父进程中维护：子进程只读取已有条目，渲染结果交回父进程写入
+    cache.set_read_only()
+
+
+def _cache_entry(response):
+    etag = response.get('ETag', '')
+    disposition = response.get('Content-Disposition', '')
+    if response.status_code != 200 or not etag or not disposition:
+        return None
+    return etag.strip('"'), {'content_type': response['Content-Type'], 'content_disposition': disposition}
+
+
+def render_export(view_name, classroom_pk):
+    """在当前进程中调用导出视图，返回 (状态码, 内容字节, 缓存条目)。
+
+    缓存条目为 (缓存键, 元数据)，供父进程写入导出缓存；不可缓存时为 None。
+    """
+    from django.http import HttpRequest
+
+    from . import views
+
+    request = HttpRequest()
+    request.method = 'GET'
+    try:
+        response = getattr(views, view_name)(request, classroom_pk)
+    except Exception as e:
+        return 500, str(e).encode('utf-8'), None
+    content = b''.join(response) if response.streaming else response.content
+    return response.status_code, content, _cache_entry(response)
+
+
+def _bundle_workers(task_count, workers):
+    from django.db import connection
+
+    if workers is None:
+        workers = min(EXPORT_BUNDLE_MAX_WORKERS, os.cpu_count() or 1)
+    # 内存数据库（测试环境）无法跨进程共享，只能在当前进程中渲染
+    if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+        return 1
+    return max(1, min(workers, task_count))
+
+
+def _iter_rendered(tasks, workers):
+    workers = _bundle_workers(len(tasks), workers)
+    if workers <= 1:
+        for task in tasks:
+            status, content, _ = render_export(task.view_name, task.classroom_pk)
+            yield task, (status, content)
+        return
+
+    from django.db import connections
+
+    from .export_cache import cache
+
+    # 子进程不能复用父进程的数据库连接，先关闭，各进程按需重新连接
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        # 同时在途的任务不超过进程数的两倍，已渲染但未写入压缩包的文件不会在内存中堆积
+        pending = deque()
+        remaining = iter(tasks)
+        for task in remaining:
+            pending.append((task, pool.submit(render_export, task.view_name, task.classroom_pk)))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            task, future = pending.popleft()
+            next_task = next(remaining, None)
+            if next_task is not None:
+                pending.append((next_task, pool.submit(render_export, next_task.view_name, next_task.classroom_pk)))
+            status, content, entry = future.result()
+            if entry is not None and not cache.contains(entry[0]):
+                cache.put(entry[0], entry[1], content)
+            yield task, (status, content)
+
+
+class _ZipSink:
+    """只支持追加写入的输出对象；zipfile 检测到不可 seek 时改用数据描述符，整个包可以边生成边输出。"""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _zip_info(arcname):
+    info = zipfile.ZipInfo(arcname, date_time=time.localtime()[:6])
+    info.compress_type = zipfile.ZIP_DEFLATED if arcname.endswith(_COMPRESSED_SUFFIXES) else zipfile.ZIP_STORED
+    return info
+
+
+def iter_bundle_zip(tasks, workers=None):
+    """渲染全部任务并逐个写入 ZIP，产出压缩包的数据块；同一时刻只持有少量已渲染的文件。"""
+    sink = _ZipSink()
+    failures = []
+    with zipfile.ZipFile(sink, mode='w') as bundle:
+        for task, (status, content) in _iter_rendered(tasks, workers):
+            if status != 200:
+                message = content.decode('utf-8', errors='replace').strip()[:200]
+                failures.append(f'{task.label}：{message or status}')
+                continue
+            bundle.writestr(_zip_info(task.arcname), content)
+            yield sink.take()
+        if failures:
+            bundle.writestr(_zip_info(EXPORT_BUNDLE_FAILURE_NAME), '\n'.join(failures) + '\n')
+    yield sink.take()
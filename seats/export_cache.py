@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+EXPORT_CACHE_DIRNAME = 'export_cache'
+EXPORT_CACHE_SUFFIX = '.export'
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+# 导出格式版本：渲染逻辑有变化时递增，旧的缓存条目随之失效
+EXPORT_CACHE_VERSION = 3
+
+
+class ExportCache:
+    """导出文件（Excel、SVG、PPTX）的磁盘缓存。
+
+    键由导出类型、布局指纹与规范化后的导出选项计算得到，内容相同的导出共用同一条目，
+    键同时用作响应的 ETag。条目按最近访问排序，总大小超过上限时淘汰最久未使用的条目。
+    每个条目是一个文件：首行为 JSON 元数据（Content-Type 等），其后是导出内容。
+
+    索引只保存在当前进程中，因此只能由一个进程写入。批量导出的子进程调用 set_read_only()：
+    只按键直接读取磁盘上的文件，不写入、不淘汰；渲染结果交回父进程，由父进程写入缓存。
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._loaded_directory = None
+        self._read_only = False
+
+    def set_read_only(self, read_only=True):
+        self._read_only = read_only
+
+    @property
+    def max_bytes(self):
+        return getattr(settings, 'SEATS_EXPORT_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    @property
+    def directory(self):
+        path = getattr(settings, 'SEATS_EXPORT_CACHE_DIR', None) or os.path.join(settings.BASE_DIR, EXPORT_CACHE_DIRNAME)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @staticmethod
+    def make_key(kind, fingerprint, options):
+        raw = json.dumps(
+            [EXPORT_CACHE_VERSION, kind, fingerprint, options],
+            ensure_ascii=False,
+            sort_keys=True,
+            separators=(',', ':')
+        )
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+    def get(self, key):
+        """返回 (元数据, 内容)；未命中时返回 None。"""
+        if not self.enabled:
+            return None
+        if self._read_only:
+            return self._read_entry(self._path(key))
+        with self._lock:
+            self._ensure_loaded()
+            if key not in self._entries:
+                return None
+            path = self._path(key)
+            cached = self._read_entry(path)
+            if cached is None:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            try:
+                # 以修改时间记录最近访问，重启后据此恢复淘汰顺序
+                os.utime(path)
+            except OSError:
+                pass
+            return cached
+
+    def contains(self, key):
+        if not self.enabled or self._read_only:
+            return False
+        with self._lock:
+            self._ensure_loaded()
+            return key in self._entries
+
+    def put(self, key, meta, content):
+        if not self.enabled or self._read_only:
+            return
+        header = json.dumps(meta, ensure_ascii=True).encode('utf-8') + b'\n'
+        size = len(header) + len(content)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._ensure_loaded()
+            path = self._path(key)
+            temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+            with open(temp_path, 'wb') as fh:
+                fh.write(header)
+                fh.write(content)
+            os.replace(temp_path, path)
+            self._total_bytes -= self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._total_bytes += size
+            self._enforce_limit()
+
+    def clear(self):
+        with self._lock:
+            self._ensure_loaded()
+            for key in list(self._entries):
+                self._remove(key)
+
+    def stats(self):
+        with self._lock:
+            self._ensure_loaded()
+            return {'entries': len(self._entries), 'bytes': self._total_bytes}
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}{EXPORT_CACHE_SUFFIX}')
+
+    @staticmethod
+    def _read_entry(path):
+        try:
+            with open(path, 'rb') as fh:
+                meta = json.loads(fh.readline().decode('utf-8'))
+                return meta, fh.read()
+        except (OSError, ValueError):
+            return None
+
+    def _ensure_loaded(self):
+        # 首次使用（或缓存目录变化）时登记目录中已有的缓存文件，按修改时间排列
+        directory = self.directory
+        if self._loaded_directory == directory:
+            return
+        self._loaded_directory = directory
+        self._entries.clear()
+        self._total_bytes = 0
+        found = []
+        for filename in os.listdir(directory):
+            path = os.path.join(directory, filename)
+            if filename.endswith('.tmp'):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            if not filename.endswith(EXPORT_CACHE_SUFFIX) or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            found.append((stat.st_mtime, filename[:-len(EXPORT_CACHE_SUFFIX)], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total_bytes += size
+        self._enforce_limit()
+
+    def _remove(self, key):
+        self._total_bytes -= self._entries.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _enforce_limit(self):
+        # _entries 按最近访问排序，靠前的最久未使用
+        while self._entries and self._total_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+
+cache = ExportCache()
@@ -0,0 +1,274 @@
+import contextvars
+import copy
+import functools
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import close_old_connections, connection
+from django.http import HttpRequest, JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.datastructures import MultiValueDict
+
+from .models import Classroom, Job
+from .temp_store import store as temp_store
+
+
+# 默认后台线程数；SQLite 同一时刻只允许一个写入者，线程数不宜过多
+DEFAULT_JOB_WORKERS = 2
+# 进度写库的最小间隔（秒），避免频繁更新拖慢任务本身
+PROGRESS_FLUSH_INTERVAL = 0.5
+# 已结束的任务记录保留多久（秒），启动时清理更早的记录
+DEFAULT_JOB_RETENTION = 7 * 24 * 60 * 60
+ASYNC_PARAM = 'async'
+
+_current_job = contextvars.ContextVar('seats_current_job', default=None)
+
+
+class _JobContext:
+    __slots__ = ('job_id', 'last_flush')
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.last_flush = 0.0
+
+    def update(self, progress, message, force=False):
+        now = time.monotonic()
+        if not force and now - self.last_flush < PROGRESS_FLUSH_INTERVAL:
+            return
+        self.last_flush = now
+        fields = {'progress': max(0.0, min(1.0, float(progress)))}
+        if message is not None:
+            fields['message'] = str(message)[:255]
+        Job.objects.filter(pk=self.job_id).update(**fields)
+
+
+def report_progress(progress, message=None):
+    """在后台任务中汇报进度（0~1）；不在任务中调用时什么也不做。"""
+    job_context = _current_job.get()
+    if job_context is not None:
+        job_context.update(progress, message)
+
+
+class JobRunner:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def start(self, max_workers=None):
+        """启动后台线程池；上次运行遗留的未完成任务标记为失败，过期的已结束任务直接删除。"""
+        with self._lock:
+            if self._executor is not None:
+                return
+            Job.objects.filter(status__in=[Job.Status.PENDING, Job.Status.RUNNING]).update(
+                status=Job.Status.FAILED,
+                message='程序已重启，任务已中断',
+                finished_at=timezone.now(),
+            )
+            prune_finished_jobs()
+            workers = max_workers or getattr(settings, 'SEATS_JOB_WORKERS', DEFAULT_JOB_WORKERS)
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='seats-job')
+
+    def submit(self, kind, func, *args, classroom=None, **kwargs):
+        """创建任务记录并交给线程池执行；func 的返回值（需可 JSON 序列化）保存为任务结果。"""
+        job = Job.objects.create(kind=kind, classroom=classroom)
+        if getattr(settings, 'SEATS_JOB_EAGER', False):
+            # 同步执行（测试环境），与后台执行走同一流程
+            self._run(job.pk, func, args, kwargs, close_connection=False)
+        else:
+            if self._executor is None:
+                self.start()
+            # 等当前请求的事务提交后再执行，确保任务能读到刚创建的记录
+            connection.on_commit(lambda: self._executor.submit(self._run, job.pk, func, args, kwargs))
+        return job
+
+    def _run(self, job_id, func, args, kwargs, close_connection=True):
+        if close_connection:
+            close_old_connections()
+        job_context = _JobContext(job_id)
+        token = _current_job.set(job_context)
+        try:
+            Job.objects.filter(pk=job_id).update(status=Job.Status.RUNNING, started_at=timezone.now())
+            result = func(*args, **kwargs)
+            Job.objects.filter(pk=job_id).update(
+                status=Job.Status.SUCCESS,
+                progress=1.0,
+                message='已完成',
+                result=result,
+                finished_at=timezone.now(),
+            )
+        except Exception as e:
+            Job.objects.filter(pk=job_id).update(
+                status=Job.Status.FAILED,
+                message=str(e)[:255],
+                finished_at=timezone.now(),
+            )
+        finally:
+            _current_job.reset(token)
+            if close_connection:
+                connection.close()
+
+
+def prune_finished_jobs(retention=None):
+    """删除结束时间早于保留期限的任务记录，返回删除的条数。"""
+    if retention is None:
+        retention = getattr(settings, 'SEATS_JOB_RETENTION', DEFAULT_JOB_RETENTION)
+    cutoff = timezone.now() - timedelta(seconds=retention)
+    deleted, _ = Job.objects.filter(
+        status__in=[Job.Status.SUCCESS, Job.Status.FAILED],
+        finished_at__lt=cutoff,
+    ).delete()
+    return deleted
+
+
+runner = JobRunner()
+
+
+class _DetachedSession(dict):
+    """后台任务使用的会话副本。
+
+    提交任务时复制当前会话的值，任务线程只读写这份副本，不与请求线程共享 SessionStore；
+    任务结束后与提交时的快照比较，只把任务改动过的键写回最新的会话。
+    值为字典时（如按班级分开的撤销历史）再细分到子键，任务运行期间其他请求写入的内容不会被覆盖。
+    """
+
+    def __init__(self, session_key, values):
+        super().__init__(copy.deepcopy(values))
+        self.session_key = session_key
+        # 视图按 SessionStore 的习惯设置 modified；是否写回以与快照的比较为准
+        self.modified = False
+        self._original = values
+
+    def changes(self):
+        """与快照相比改动过的键：返回 (写入的键值, 删除的键)。"""
+        updated = {
+            key: value for key, value in self.items()
+            if key not in self._original or self._original[key] != value
+        }
+        removed = [key for key in self._original if key not in self]
+        return updated, removed
+
+    def save(self):
+        if not self.session_key:
+            return
+        updated, removed = self.changes()
+        if not updated and not removed:
+            return
+        store = import_module(settings.SESSION_ENGINE).SessionStore(session_key=self.session_key)
+        for key, value in updated.items():
+            original = self._original.get(key)
+            current = store.get(key)
+            if isinstance(value, dict) and isinstance(original, dict) and isinstance(current, dict):
+                merged = dict(current)
+                merged.update({sub: item for sub, item in value.items() if sub not in original or original[sub] != item})
+                for sub in original:
+                    if sub not in value:
+                        merged.pop(sub, None)
+                value = merged
+            store[key] = value
+        for key in removed:
+            store.pop(key, None)
+        store.save()
+
+
+def _detach_session(request):
+    session = getattr(request, 'session', None)
+    if session is None:
+        return None
+    if session.session_key is None:
+        # 先建立会话，任务结束后才能按会话标识写回
+        session.save()
+    return _DetachedSession(session.session_key, copy.deepcopy(dict(session.items())))
+
+
+def _detach_request(request):
+    """复制出与原请求生命周期无关的请求对象，上传文件先转存到临时存储。"""
+    detached = HttpRequest()
+    detached.method = request.method
+    detached.path = request.path
+    detached.path_info = request.path_info
+    detached.META = {
+        key: value for key, value in request.META.items()
+        if isinstance(value, str) and key not in {'HTTP_ACCEPT_ENCODING', 'HTTP_IF_NONE_MATCH'}
+    }
+    detached.META['HTTP_X_REQUESTED_WITH'] = 'XMLHttpRequest'
+    detached.GET = request.GET.copy()
+    detached.GET.pop(ASYNC_PARAM, None)
+    detached.POST = request.POST.copy()
+    detached.POST.pop(ASYNC_PARAM, None)
+    detached.session = _detach_session(request)
+    uploads = []
+    for field, files in request.FILES.lists():
+        for uploaded in files:
+            uploads.append((field, uploaded.name, uploaded.content_type, temp_store.save_upload(uploaded)))
+    return detached, uploads
+
+
+def _restore_uploads(detached, uploads):
+    files = MultiValueDict()
+    for field, name, content_type, file_id in uploads:
+        data = temp_store.read_bytes(file_id)
+        temp_store.discard(file_id)
+        if data is None:
+            raise ValueError('上传的文件已过期，请重新上传')
+        files.appendlist(field, SimpleUploadedFile(name, data, content_type=content_type))
+    detached.FILES = files
+
+
+def _response_result(job_id, response):
+    disposition = response.get('Content-Disposition', '')
+    if 'attachment' in disposition:
+        content = b''.join(response) if response.streaming else response.content
+        file_id = temp_store.save_bytes(content)
+        return {
+            'file_id': file_id,
+            'content_type': response.get('Content-Type', 'application/octet-stream'),
+            'content_disposition': disposition,
+            'download_url': reverse('job_download', args=[job_id]),
+        }
+    if response.status_code in (301, 302, 303):
+        return {'redirect': response['Location']}
+    if response.get('Content-Type', '').startswith('application/json'):
+        payload = json.loads(response.content.decode('utf-8'))
+        if response.status_code >= 400 or payload.get('status') == 'error':
+            raise ValueError(payload.get('message') or '任务执行失败')
+        return payload
+    if response.status_code >= 400:
+        raise ValueError(response.content.decode('utf-8', errors='replace')[:255] or '任务执行失败')
+    return {'status': 'success'}
+
+
+def _run_detached_view(view, pk, detached, uploads):
+    _restore_uploads(detached, uploads)
+    job_context = _current_job.get()
+    response = view(detached, pk)
+    if detached.session is not None:
+        detached.session.save()
+    return _response_result(job_context.job_id, response)
+
+
+def background_capable(kind):
+    """带 async=1 参数请求时，把视图放到后台任务中执行，立即返回任务编号与查询地址。"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, pk, *args, **kwargs):
+            if request.GET.get(ASYNC_PARAM) != '1' and request.POST.get(ASYNC_PARAM) != '1':
+                return view(request, pk, *args, **kwargs)
+            classroom = Classroom.objects.filter(pk=pk).first()
+            if classroom is None:
+                return JsonResponse({'status': 'error', 'message': '班级不存在'}, status=404)
+            detached, uploads = _detach_request(request)
+            job = runner.submit(kind, _run_detached_view, view, pk, detached, uploads, classroom=classroom)
+            return JsonResponse({
+                'status': 'queued',
+                'job_id': job.pk,
+                'job_url': reverse('job_status', args=[job.pk]),
+            }, status=202)
+        return wrapper
+    return decorator
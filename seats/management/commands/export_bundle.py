@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from seats.export_bundle import EXPORT_BUNDLE_FORMATS, build_bundle_tasks, iter_bundle_zip
+from seats.models import Classroom
+
+
+class Command(BaseCommand):
+    help = '把多个班级的座次图与小组作业表批量导出为一个 ZIP 文件，多进程并行渲染'
+
+    def add_arguments(self, parser):
+        parser.add_argument('classroom', nargs='*', type=int, help='班级编号；配合 --all 时可省略')
+        parser.add_argument('--all', action='store_true', help='导出全部班级')
+        parser.add_argument(
+            '--format',
+            action='append',
+            choices=list(EXPORT_BUNDLE_FORMATS),
+            help='导出格式，可重复指定；默认全部格式',
+        )
+        parser.add_argument('--workers', type=int, default=None, help='并行进程数，默认按 CPU 核数')
+        parser.add_argument('-o', '--output', required=True, help='输出的 ZIP 文件路径')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            classrooms = list(Classroom.objects.order_by('name', 'pk'))
+        else:
+            classrooms = list(Classroom.objects.filter(pk__in=options['classroom']).order_by('name', 'pk'))
+            missing = set(options['classroom']) - {classroom.pk for classroom in classrooms}
+            if missing:
+                raise CommandError(f'班级不存在：{", ".join(str(pk) for pk in sorted(missing))}')
+        if not classrooms:
+            raise CommandError('请指定要导出的班级，或使用 --all')
+
+        formats = list(dict.fromkeys(options['format'] or EXPORT_BUNDLE_FORMATS))
+        tasks = build_bundle_tasks(classrooms, formats)
+        with open(options['output'], 'wb') as fh:
+            for chunk in iter_bundle_zip(tasks, workers=options['workers']):
+                fh.write(chunk)
+        self.stdout.write(self.style.SUCCESS(
+            f'已导出 {len(classrooms)} 个班级、{len(tasks)} 个文件到 {options["output"]}'
+        ))
@@ -0,0 +1,156 @@
+import contextvars
+import threading
+import time
+from collections import deque
+
+from django.template.backends.django import DjangoTemplates
+
+
+# 每个视图保留最近的样本数，用于计算滚动分位数
+METRICS_WINDOW_SIZE = 512
+METRICS_QUANTILES = (0.5, 0.9, 0.99)
+
+_current_metrics = contextvars.ContextVar('seats_request_metrics', default=None)
+
+
+class RequestMetrics:
+    __slots__ = ('started', 'query_count', 'query_time', 'template_time')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.query_time = 0.0
+        self.template_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper 回调：统计 SQL 次数与耗时
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_count += 1
+            self.query_time += time.perf_counter() - started
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def activate(metrics):
+    return _current_metrics.set(metrics)
+
+
+def deactivate(token):
+    _current_metrics.reset(token)
+
+
+def current():
+    return _current_metrics.get()
+
+
+class _TimedTemplate:
+    def __init__(self, template):
+        self._template = template
+
+    def __getattr__(self, name):
+        return getattr(self._template, name)
+
+    def render(self, context=None, request=None):
+        metrics = _current_metrics.get()
+        if metrics is None:
+            return self._template.render(context, request)
+        started = time.perf_counter()
+        try:
+            return self._template.render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates 后端，仅在请求统计开启时记录模板渲染耗时。"""
+
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name))
+
+
+class _SeriesStats:
+    __slots__ = ('window', 'total', 'count')
+
+    def __init__(self):
+        self.window = deque(maxlen=METRICS_WINDOW_SIZE)
+        self.total = 0.0
+        self.count = 0
+
+    def add(self, value):
+        self.window.append(value)
+        self.total += value
+        self.count += 1
+
+    def quantiles(self):
+        values = sorted(self.window)
+        if not values:
+            return {q: 0.0 for q in METRICS_QUANTILES}
+        last = len(values) - 1
+        return {q: values[min(last, int(round(q * last)))] for q in METRICS_QUANTILES}
+
+
+METRIC_SERIES = (
+    ('duration', 'seats_request_duration_seconds', '请求总耗时（秒）'),
+    ('queries', 'seats_request_queries', '每个请求的 SQL 查询次数'),
+    ('db', 'seats_request_db_seconds', '每个请求的 SQL 耗时（秒）'),
+    ('template', 'seats_request_template_seconds', '每个请求的模板渲染耗时（秒）'),
+    ('compute', 'seats_request_compute_seconds', '每个请求除 SQL 与模板外的计算耗时（秒）'),
+)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view_name, samples):
+        with self._lock:
+            series = self._views.get(view_name)
+            if series is None:
+                series = {key: _SeriesStats() for key, _, _ in METRIC_SERIES}
+                self._views[view_name] = series
+            for key, value in samples.items():
+                series[key].add(value)
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                view_name: {
+                    key: (stats.quantiles(), stats.total, stats.count)
+                    for key, stats in series.items()
+                }
+                for view_name, series in self._views.items()
+            }
+
+    def render_prometheus(self):
+        snapshot = self.snapshot()
+        lines = []
+        for key, metric_name, help_text in METRIC_SERIES:
+            lines.append(f'# HELP {metric_name} {help_text}')
+            lines.append(f'# TYPE {metric_name} summary')
+            for view_name in sorted(snapshot):
+                quantiles, total, count = snapshot[view_name][key]
+                label = _escape_label(view_name)
+                for q, value in quantiles.items():
+                    lines.append(f'{metric_name}{{view="{label}",quantile="{q}"}} {value:.6g}')
+                lines.append(f'{metric_name}_sum{{view="{label}"}} {total:.6g}')
+                lines.append(f'{metric_name}_count{{view="{label}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
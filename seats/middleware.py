@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from . import metrics
+
+
+def request_metrics_enabled():
+    return bool(getattr(settings, 'SEATS_REQUEST_METRICS', False))
+
+
+class RequestMetricsMiddleware:
+    """记录每个请求的 SQL 次数/耗时、模板渲染与计算耗时，输出 Server-Timing 并累计分位数。"""
+
+    def __init__(self, get_response):
+        if not request_metrics_enabled():
+            # 关闭时直接从中间件链中移除，不产生额外开销
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_metrics = metrics.RequestMetrics()
+        token = metrics.activate(request_metrics)
+        try:
+            with connection.execute_wrapper(request_metrics):
+                response = self.get_response(request)
+        finally:
+            metrics.deactivate(token)
+
+        total = request_metrics.elapsed()
+        db_time = request_metrics.query_time
+        template_time = request_metrics.template_time
+        compute_time = max(0.0, total - db_time - template_time)
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={db_time * 1000:.1f};desc="SQL x{request_metrics.query_count}"',
+            f'tpl;dur={template_time * 1000:.1f}',
+            f'app;dur={compute_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match and match.view_name else 'unresolved'
+        metrics.registry.record(view_name, {
+            'duration': total,
+            'queries': request_metrics.query_count,
+            'db': db_time,
+            'template': template_time,
+            'compute': compute_time,
+        })
+        return response
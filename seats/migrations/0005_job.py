@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seats', '0004_alter_classroom_id_alter_layoutsnapshot_id_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=50, verbose_name='任务类型')),
+                ('status', models.CharField(choices=[('pending', '排队中'), ('running', '执行中'), ('success', '已完成'), ('failed', '失败')], default='pending', max_length=10, verbose_name='状态')),
+                ('progress', models.FloatField(default=0, verbose_name='进度')),
+                ('message', models.CharField(blank=True, default='', max_length=255, verbose_name='进度说明')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='结果')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('classroom', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='seats.classroom', verbose_name='所属班级')),
+            ],
+            options={
+                'verbose_name': '后台任务',
+                'verbose_name_plural': '后台任务',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
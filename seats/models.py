@@ -143,3 +143,29 @@ class SeatConstraint(models.Model):
 
     def __str__(self):
         return f"{self.classroom.name}-{self.get_constraint_type_display()}-{self.student.name}"
+
+
+class Job(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'pending', '排队中'
+        RUNNING = 'running', '执行中'
+        SUCCESS = 'success', '已完成'
+        FAILED = 'failed', '失败'
+
+    kind = models.CharField(max_length=50, verbose_name="任务类型")
+    classroom = models.ForeignKey(Classroom, on_delete=models.CASCADE, null=True, blank=True, related_name='jobs', verbose_name="所属班级")
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING, verbose_name="状态")
+    progress = models.FloatField(default=0, verbose_name="进度")
+    message = models.CharField(max_length=255, blank=True, default='', verbose_name="进度说明")
+    result = models.JSONField(null=True, blank=True, verbose_name="结果")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "后台任务"
+        verbose_name_plural = verbose_name
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.kind}-{self.get_status_display()}"
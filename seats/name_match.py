@@ -0,0 +1,172 @@
+import unicodedata
+from collections import Counter, defaultdict
+
+try:
+    from pypinyin import lazy_pinyin
+except ImportError:
+    lazy_pinyin = None
+
+try:
+    import opencc
+    _traditional_to_simplified = opencc.OpenCC('t2s').convert
+except Exception:
+    _traditional_to_simplified = None
+
+
+# 未安装 opencc 时使用的常见姓名用字繁简对照
+_NAME_CHAR_VARIANTS = (
+    '張张 陳陈 劉刘 黃黄 吳吴 趙赵 孫孙 鄭郑 馮冯 許许 楊杨 鍾钟 蕭萧 葉叶 韓韩 羅罗 馬马 龍龙 '
+    '衛卫 蘇苏 盧卢 錢钱 齊齐 賈贾 譚谭 鄧邓 閻阎 華华 偉伟 國国 東东 紅红 麗丽 軍军 傑杰 寶宝 '
+    '鳳凤 雲云 靜静 慶庆 興兴 豐丰 穎颖 瑩莹 嬌娇 婭娅 嫻娴 飛飞 鵬鹏 鴻鸿 誠诚 義义 禮礼 廣广 '
+    '莊庄 顧顾 陸陆 蔣蒋 嚴严 湯汤 萬万 雙双 鄒邹 歐欧 陽阳 濤涛 強强 進进 剛刚 輝辉 書书 曉晓 '
+    '藝艺 夢梦 潔洁 傳传 紀纪 賢贤 蓮莲 蘭兰 煒炜 瑋玮 韋韦 駿骏 銘铭 錦锦 鋒锋 學学 龐庞 魯鲁 '
+    '鄺邝 關关 溫温 範范 賴赖 聶聂 車车 鄔邬 濱滨 瀟潇 顏颜 龔龚 貝贝 寧宁 愛爱 樂乐 樺桦 楓枫 '
+    '峯峰 榮荣 達达 勝胜 賓宾 凱凯 馳驰 騰腾 靈灵 倫伦 瀅滢 鈺钰 錫锡 釗钊 銳锐 詩诗 語语 譽誉 '
+    '彥彦 詠咏 翹翘 薈荟 綺绮 緯纬 維维 綠绿 紹绍 純纯'
+)
+_NAME_CHAR_TABLE = str.maketrans({pair[0]: pair[1] for pair in _NAME_CHAR_VARIANTS.split()})
+NAME_SEPARATORS = frozenset('·•・.-_')
+
+# 相似度（0~1）：繁简/全角/空格差异视为同一人；编辑距离按名字长度折算；
+# 拼音相同可能只是同音字（张伟/张薇），低于自动合并阈值，只提示人工确认
+PINYIN_CONFIDENCE = 0.7
+AUTO_MATCH_CONFIDENCE = 0.8
+REVIEW_CONFIDENCE = 0.5
+# 每个待匹配姓名最多对共享 n-gram 最多的若干候选计算编辑距离
+CANDIDATE_LIMIT = 8
+
+
+def name_key(text):
+    """姓名归一化：全角转半角、繁体转简体、去掉空白与间隔号并转小写。"""
+    text = unicodedata.normalize('NFKC', str(text or ''))
+    if _traditional_to_simplified is not None:
+        text = _traditional_to_simplified(text)
+    else:
+        text = text.translate(_NAME_CHAR_TABLE)
+    return ''.join(ch for ch in text.lower() if not ch.isspace() and ch not in NAME_SEPARATORS)
+
+
+def pinyin_key(key):
+    if lazy_pinyin is None or not key or not any('一' <= ch <= '鿿' for ch in key):
+        return None
+    return ' '.join(lazy_pinyin(key))
+
+
+def _grams(key):
+    padded = f'^{key}$'
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+def _distance_limit(key):
+    return 1 if len(key) <= 4 else 2
+
+
+def bounded_edit_distance(a, b, limit):
+    """Levenshtein 距离；超过 limit 时提前返回 None。"""
+    if abs(len(a) - len(b)) > limit:
+        return None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        current = [i]
+        for j, cb in enumerate(b, start=1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb),
+            ))
+        if min(current) > limit:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= limit else None
+
+
+class NameMatch:
+    __slots__ = ('payload', 'name', 'confidence', 'reason')
+
+    def __init__(self, payload, name, confidence, reason):
+        self.payload = payload
+        self.name = name
+        self.confidence = confidence
+        self.reason = reason
+
+    @property
+    def is_confident(self):
+        return self.confidence >= AUTO_MATCH_CONFIDENCE
+
+
+class NameIndex:
+    """现有名单的模糊匹配索引：归一化姓名、拼音与字符二元组倒排表。
+
+    查询只对共享二元组的候选计算有界编辑距离，不会逐一扫描整个名单。
+    """
+
+    def __init__(self, items=()):
+        self._entries = []
+        self._by_key = defaultdict(list)
+        self._by_pinyin = defaultdict(list)
+        self._postings = defaultdict(list)
+        for name, payload in items:
+            self.add(name, payload)
+
+    def add(self, name, payload):
+        key = name_key(name)
+        if not key:
+            return
+        index = len(self._entries)
+        self._entries.append((key, name, payload))
+        self._by_key[key].append(index)
+        pinyin = pinyin_key(key)
+        if pinyin:
+            self._by_pinyin[pinyin].append(index)
+        for gram in _grams(key):
+            self._postings[gram].append(index)
+
+    def match(self, name, exclude=()):
+        """返回最可能的候选（NameMatch）；无候选或多个候选并列时返回 None。
+
+        exclude 中的对象（如已被前面的行认领的学生）在取候选之前就排除，不会占用候选名额。
+        """
+        key = name_key(name)
+        if not key:
+            return None
+
+        def allowed(index):
+            return self._entries[index][2] not in exclude
+
+        scores = {}
+        for index in self._by_key.get(key, ()):
+            if allowed(index):
+                scores[index] = (1.0, 'variant')
+
+        if not scores:
+            shared = Counter()
+            for gram in _grams(key):
+                shared.update(self._postings.get(gram, ()))
+            if exclude:
+                for index in [index for index in shared if not allowed(index)]:
+                    del shared[index]
+            limit = _distance_limit(key)
+            for index, _ in shared.most_common(CANDIDATE_LIMIT):
+                distance = bounded_edit_distance(key, self._entries[index][0], limit)
+                if distance is None:
+                    continue
+                confidence = 1 - distance / max(len(key), len(self._entries[index][0]))
+                scores[index] = (confidence, 'edit_distance')
+            pinyin = pinyin_key(key)
+            for index in self._by_pinyin.get(pinyin, ()) if pinyin else ():
+                if allowed(index) and scores.get(index, (0, ''))[0] < PINYIN_CONFIDENCE:
+                    scores[index] = (PINYIN_CONFIDENCE, 'pinyin')
+
+        candidates = [
+            (confidence, reason, index)
+            for index, (confidence, reason) in scores.items()
+            if confidence >= REVIEW_CONFIDENCE
+        ]
+        if not candidates:
+            return None
+        candidates.sort(key=lambda item: item[0], reverse=True)
+        best_confidence, reason, index = candidates[0]
+        if len(candidates) > 1 and candidates[1][0] == best_confidence:
+            return None
+        _, matched_name, payload = self._entries[index]
+        return NameMatch(payload, matched_name, best_confidence, reason)
@@ -0,0 +1,152 @@
+import copy
+import string
+
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls
+from pptx.util import Inches, Pt
+
+
+# 本模块只在安装了 python-pptx 时导入（见 export_students_pptx）
+
+# 各类形状的 XML 模板在进程内只解析一次；绘制时深拷贝模板，按固定的子节点位置改写坐标、颜色与文字，
+# 再直接追加到幻灯片的 spTree，避免逐个形状调用 python-pptx 的高层接口和重复解析 XML
+_SHAPE_STYLE_XML = (
+    '<p:style>'
+    '<a:lnRef idx="1"><a:schemeClr val="accent1"/></a:lnRef>'
+    '<a:fillRef idx="3"><a:schemeClr val="accent1"/></a:fillRef>'
+    '<a:effectRef idx="2"><a:schemeClr val="accent1"/></a:effectRef>'
+    '<a:fontRef idx="minor"><a:schemeClr val="lt1"/></a:fontRef>'
+    '</p:style>'
+    '<p:txBody><a:bodyPr rtlCol="0" anchor="ctr"/><a:lstStyle/><a:p><a:pPr algn="ctr"/></a:p></p:txBody>'
+)
+
+# 控制阴影透明度，避免默认主题阴影过重
+_SOFT_SHADOW_XML = (
+    '<a:effectLst>'
+    '<a:outerShdw blurRad="38100" dist="19050" dir="5400000" algn="ctr" rotWithShape="0">'
+    '<a:srgbClr val="000000"><a:alpha val="12000"/></a:srgbClr>'
+    '</a:outerShdw>'
+    '</a:effectLst>'
+)
+
+
+def _shape_xml(geometry, line_xml, effect_xml):
+    return (
+        f'<p:sp {nsdecls("p", "a", "r")}>'
+        '<p:nvSpPr><p:cNvPr id="0" name=""/><p:cNvSpPr/><p:nvPr/></p:nvSpPr>'
+        '<p:spPr>'
+        '<a:xfrm><a:off x="0" y="0"/><a:ext cx="0" cy="0"/></a:xfrm>'
+        f'<a:prstGeom prst="{geometry}"><a:avLst/></a:prstGeom>'
+        '<a:solidFill><a:srgbClr val="000000"/></a:solidFill>'
+        f'{line_xml}{effect_xml}'
+        '</p:spPr>'
+        f'{_SHAPE_STYLE_XML}'
+        '</p:sp>'
+    )
+
+
+_TEXT_XML = (
+    f'<p:sp {nsdecls("p", "a", "r")}>'
+    '<p:nvSpPr><p:cNvPr id="0" name=""/><p:cNvSpPr txBox="1"/><p:nvPr/></p:nvSpPr>'
+    '<p:spPr>'
+    '<a:xfrm><a:off x="0" y="0"/><a:ext cx="0" cy="0"/></a:xfrm>'
+    '<a:prstGeom prst="rect"><a:avLst/></a:prstGeom>'
+    '<a:noFill/>'
+    '</p:spPr>'
+    '<p:txBody>'
+    '<a:bodyPr wrap="none" lIns="0" rIns="0" tIns="0" bIns="0" anchor="ctr"><a:spAutoFit/></a:bodyPr>'
+    '<a:lstStyle/>'
+    '<a:p><a:pPr algn="l"/><a:r>'
+    '<a:rPr b="0" sz="1000">'
+    '<a:solidFill><a:srgbClr val="000000"/></a:solidFill>'
+    '<a:latin typeface=""/><a:ea typeface=""/><a:cs typeface=""/>'
+    '</a:rPr>'
+    '<a:t></a:t>'
+    '</a:r></a:p>'
+    '</p:txBody>'
+    '</p:sp>'
+)
+
+_TEMPLATES = {
+    'background': parse_xml(_shape_xml('rect', '<a:ln><a:noFill/></a:ln>', '')),
+    'framed': parse_xml(_shape_xml('roundRect', '<a:ln w="0"><a:solidFill><a:srgbClr val="000000"/></a:solidFill></a:ln>', _SOFT_SHADOW_XML)),
+    'borderless': parse_xml(_shape_xml('roundRect', '<a:ln><a:noFill/></a:ln>', _SOFT_SHADOW_XML)),
+    'text': parse_xml(_TEXT_XML),
+}
+_SHAPE_NAMES = {
+    'background': 'Rectangle',
+    'framed': 'Rounded Rectangle',
+    'borderless': 'Rounded Rectangle',
+    'text': 'TextBox',
+}
+
+
+def _srgb(color):
+    # "#rrggbb" / "#rgb" 转为 srgbClr 的 val；无法解析时按黑色处理
+    raw = str(color or '').strip().lstrip('#')
+    if len(raw) == 3:
+        raw = ''.join(ch * 2 for ch in raw)
+    if len(raw) != 6 or any(ch not in string.hexdigits for ch in raw):
+        return '000000'
+    return raw.upper()
+
+
+class SlideShapeWriter:
+    """按模板向幻灯片写入座次图所需的形状（背景、圆角矩形、文本框）。
+
+    坐标与尺寸以英寸为单位；颜色为 "#rrggbb"。写出的 XML 与 python-pptx 高层接口生成的一致。
+    """
+
+    def __init__(self, slide, font_name):
+        self._tree = slide.shapes._spTree
+        self._next_id = max((int(v) for v in self._tree.xpath('//p:cNvPr/@id')), default=0) + 1
+        self._font_name = font_name
+        self._font_sizes = {}
+
+    def _append(self, kind, x, y, w, h):
+        sp = copy.deepcopy(_TEMPLATES[kind])
+        c_nv_pr = sp[0][0]
+        c_nv_pr.set('id', str(self._next_id))
+        c_nv_pr.set('name', f'{_SHAPE_NAMES[kind]} {self._next_id - 1}')
+        self._next_id += 1
+        xfrm = sp[1][0]
+        xfrm[0].set('x', str(Inches(x)))
+        xfrm[0].set('y', str(Inches(y)))
+        xfrm[1].set('cx', str(Inches(w)))
+        xfrm[1].set('cy', str(Inches(h)))
+        self._tree.append(sp)
+        return sp
+
+    def add_background(self, w, h, fill_color):
+        sp = self._append('background', 0, 0, w, h)
+        sp[1][2][0].set('val', _srgb(fill_color))
+
+    def add_round_rect(self, x, y, w, h, fill_color, stroke_color=None, line_width_pt=None):
+        sp = self._append('framed' if stroke_color else 'borderless', x, y, w, h)
+        sp_pr = sp[1]
+        sp_pr[2][0].set('val', _srgb(fill_color))
+        if stroke_color:
+            line = sp_pr[3]
+            line.set('w', str(Pt(line_width_pt)))
+            line[0][0].set('val', _srgb(stroke_color))
+
+    def add_text(self, x, y, w, h, text, color, size_pt, bold=False, center=False, middle=True):
+        if text is None:
+            return
+        sp = self._append('text', x, y, w, h)
+        tx_body = sp[2]
+        tx_body[0].set('anchor', 'ctr' if middle else 't')
+        paragraph = tx_body[2]
+        paragraph[0].set('algn', 'ctr' if center else 'l')
+        run = paragraph[1]
+        r_pr = run[0]
+        r_pr.set('b', '1' if bold else '0')
+        sz = self._font_sizes.get(size_pt)
+        if sz is None:
+            sz = self._font_sizes[size_pt] = str(Pt(size_pt).centipoints)
+        r_pr.set('sz', sz)
+        r_pr[0][0].set('val', _srgb(color))
+        # 同时设置 latin/eastAsia/cs，确保中文文本在 PPT 中按指定字体渲染
+        for node in r_pr[1:4]:
+            node.set('typeface', self._font_name)
+        run[1].text = str(text)
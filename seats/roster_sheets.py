@@ -0,0 +1,163 @@
+import re
+
+import openpyxl
+from openpyxl.utils.cell import range_boundaries
+
+
+# 本模块只做工作簿的逐表读取，不依赖 Django，可直接在子进程中并行解析
+
+
+def workbook_kind(head):
+    if head.startswith(b'\xd0\xcf\x11\xe0'):
+        return 'xls'
+    if head.startswith(b'PK\x03\x04'):
+        return 'xlsx'
+    return None
+
+
+def normalize_cell(value):
+    # 与 pandas 读取 Excel 的行为保持一致：整数值的浮点数按整数处理，避免学号变成 "1001.0"
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and value == '':
+        return None
+    return value
+
+
+def _open_xls(source):
+    import xlrd
+    if hasattr(source, 'read'):
+        return xlrd.open_workbook(file_contents=source.read(), on_demand=True)
+    return xlrd.open_workbook(source, on_demand=True)
+
+
+def _iter_xls_sheet(book, sheet_index):
+    sheet = book.sheet_by_index(sheet_index)
+    for r in range(sheet.nrows):
+        yield tuple(normalize_cell(v) for v in sheet.row_values(r))
+
+
+def _iter_xlsx_sheet(ws):
+    ws.reset_dimensions()
+    for row in ws.iter_rows(values_only=True):
+        yield tuple(normalize_cell(v) for v in row)
+
+
+def iter_sheet_rows(source, kind, sheet_index=0):
+    """以只读流式方式逐行读取指定工作表，产出每行的值元组。"""
+    if kind == 'xls':
+        book = _open_xls(source)
+        try:
+            yield from _iter_xls_sheet(book, sheet_index)
+        finally:
+            book.release_resources()
+        return
+
+    wb = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        yield from _iter_xlsx_sheet(wb.worksheets[sheet_index])
+    finally:
+        wb.close()
+
+
+def iter_workbook_sheets(source, kind):
+    """只打开一次工作簿，依次产出 (工作表名, 行迭代器)；须按顺序消费。"""
+    if kind == 'xls':
+        book = _open_xls(source)
+        try:
+            for index, name in enumerate(book.sheet_names()):
+                yield name, _iter_xls_sheet(book, index)
+        finally:
+            book.release_resources()
+        return
+
+    wb = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            yield ws.title, _iter_xlsx_sheet(ws)
+    finally:
+        wb.close()
+
+
+def sheet_names(path, kind):
+    if kind == 'xls':
+        book = _open_xls(path)
+        try:
+            return book.sheet_names()
+        finally:
+            book.release_resources()
+    wb = openpyxl.load_workbook(path, read_only=True)
+    try:
+        return list(wb.sheetnames)
+    finally:
+        wb.close()
+
+
+def read_sheet_rows(path, kind, sheet_index):
+    # 子进程入口：返回整张表的行列表
+    return list(iter_sheet_rows(path, kind, sheet_index))
+
+
+# <mergeCells> 位于 <sheetData> 之后；单元格数据已由行迭代解析过，这里按字节跳过，只解析其后的少量内容
+_SHEET_DATA_END = re.compile(rb'</(?:[\w.-]+:)?sheetData\s*>|<(?:[\w.-]+:)?sheetData\s*/>')
+_MERGE_CELL_REF = re.compile(rb'<(?:[\w.-]+:)?mergeCell\b[^>]*?\bref\s*=\s*["\']([^"\']+)["\']')
+_SCAN_CHUNK_BYTES = 1024 * 1024
+_SCAN_OVERLAP_BYTES = 64
+
+
+def _open_sheet_xml(ws):
+    # openpyxl 只读工作表没有读取原始 XML 的公开接口；私有接口不可用时按没有合并区域处理
+    try:
+        return ws._get_source()
+    except Exception:
+        return None
+
+
+def _sheet_xml_tail(src):
+    """返回 </sheetData> 之后的原始字节；找不到时返回空字节串。"""
+    pending = b''
+    while True:
+        chunk = src.read(_SCAN_CHUNK_BYTES)
+        if not chunk:
+            return b''
+        pending += chunk
+        match = _SHEET_DATA_END.search(pending)
+        if match:
+            return pending[match.end():] + src.read()
+        pending = pending[-_SCAN_OVERLAP_BYTES:]
+
+
+def _read_merged_ranges(ws):
+    # 只读模式下 openpyxl 不解析合并区域，这里从工作表 XML 的尾部读取 <mergeCell ref="..."/>
+    src = _open_sheet_xml(ws)
+    if src is None:
+        return []
+    merged = []
+    try:
+        with src:
+            tail = _sheet_xml_tail(src)
+    except Exception:
+        return []
+    for ref in _MERGE_CELL_REF.findall(tail):
+        try:
+            merged.append(range_boundaries(ref.decode('ascii')))
+        except (UnicodeDecodeError, ValueError, TypeError):
+            continue
+    return merged
+
+
+def read_layout_sheet(source):
+    """只读流式读取当前工作表，返回 (各行的值元组列表, 合并区域列表)。
+
+    合并区域为 (起始列, 起始行, 结束列, 结束行)，与 openpyxl 的 MergedCellRange.bounds 一致；
+    不创建单元格与样式对象，格式复杂的学校模板也能较快解析。
+    """
+    wb = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        ws.reset_dimensions()
+        rows = list(ws.iter_rows(values_only=True))
+        merged = _read_merged_ranges(ws)
+    finally:
+        wb.close()
+    return rows, merged
@@ -0,0 +1,265 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from io import BytesIO
+
+from django.conf import settings
+
+
+TEMP_IMPORT_DIRNAME = 'temp_imports'
+
+# 默认值，可在 settings 中通过同名 SEATS_TEMP_IMPORT_* 配置覆盖
+DEFAULT_TTL_SECONDS = 6 * 60 * 60
+DEFAULT_MAX_DISK_BYTES = 200 * 1024 * 1024
+DEFAULT_MAX_MEMORY_BYTES = 32 * 1024 * 1024
+DEFAULT_MEMORY_ITEM_BYTES = 2 * 1024 * 1024
+DEFAULT_SWEEP_INTERVAL = 10 * 60
+
+
+class _Entry:
+    __slots__ = ('suffix', 'size', 'last_access', 'data', 'path')
+
+    def __init__(self, suffix, size, last_access, data=None, path=None):
+        self.suffix = suffix
+        self.size = size
+        self.last_access = last_access
+        self.data = data
+        self.path = path
+
+
+class TempImportStore:
+    """导入流程中的临时文件存储。
+
+    file_id 对应一份上传文件（或其解析缓存）。小文件只保存在内存 LRU 中，
+    大文件写入 BASE_DIR/temp_imports。超过有效期的文件会被清理；
+    内存或磁盘超出容量上限时按最近访问时间淘汰，内存中淘汰的条目会转存到磁盘。
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._loaded = False
+        self._last_sweep = 0.0
+        self._sweeper = None
+
+    # ---- 配置 ----
+
+    def _setting(self, name, default):
+        return getattr(settings, f'SEATS_TEMP_IMPORT_{name}', default)
+
+    @property
+    def ttl(self):
+        return self._setting('TTL', DEFAULT_TTL_SECONDS)
+
+    @property
+    def directory(self):
+        path = os.path.join(settings.BASE_DIR, TEMP_IMPORT_DIRNAME)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    # ---- 对外接口 ----
+
+    def save_upload(self, uploaded_file, suffix=''):
+        size = getattr(uploaded_file, 'size', None)
+        if size is not None and size <= self._setting('MEMORY_ITEM_BYTES', DEFAULT_MEMORY_ITEM_BYTES):
+            return self.save_bytes(b''.join(uploaded_file.chunks()), suffix)
+
+        file_id = str(uuid.uuid4())
+        path = os.path.join(self.directory, f'{file_id}{suffix}')
+        written = 0
+        with open(path, 'wb') as destination:
+            for chunk in uploaded_file.chunks():
+                destination.write(chunk)
+                written += len(chunk)
+        self._register(file_id, _Entry(suffix, written, time.time(), path=path))
+        return file_id
+
+    def save_bytes(self, data, suffix=''):
+        file_id = str(uuid.uuid4())
+        if len(data) <= self._setting('MEMORY_ITEM_BYTES', DEFAULT_MEMORY_ITEM_BYTES):
+            entry = _Entry(suffix, len(data), time.time(), data=data)
+        else:
+            path = os.path.join(self.directory, f'{file_id}{suffix}')
+            with open(path, 'wb') as fh:
+                fh.write(data)
+            entry = _Entry(suffix, len(data), time.time(), path=path)
+        self._register(file_id, entry)
+        return file_id
+
+    def open(self, file_id):
+        """返回可供 openpyxl/xlrd/pickle 读取的来源（文件路径或新的 BytesIO），不存在或已过期时返回 None。"""
+        entry = self._touch(file_id)
+        if entry is None:
+            return None
+        if entry.data is not None:
+            buffer = BytesIO(entry.data)
+            buffer.name = f'{file_id}{entry.suffix}'
+            return buffer
+        return entry.path
+
+    def read_bytes(self, file_id):
+        entry = self._touch(file_id)
+        if entry is None:
+            return None
+        if entry.data is not None:
+            return entry.data
+        with open(entry.path, 'rb') as fh:
+            return fh.read()
+
+    def exists(self, file_id):
+        return self._touch(file_id) is not None
+
+    def suffix_of(self, file_id):
+        """保存时登记的后缀，用来区分文件种类；不存在或已过期时返回 None。"""
+        entry = self._touch(file_id)
+        return None if entry is None else entry.suffix
+
+    def discard(self, file_id):
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._entries.pop(self._normalize_id(file_id) or '', None)
+            if entry is not None:
+                self._forget(entry)
+
+    def sweep(self, now=None):
+        """删除过期文件，并把内存与磁盘占用压回上限以内。"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._ensure_loaded()
+            self._last_sweep = now
+            expired = [
+                file_id for file_id, entry in self._entries.items()
+                if now - entry.last_access > self.ttl
+            ]
+            for file_id in expired:
+                self._forget(self._entries.pop(file_id))
+            self._enforce_limits()
+            return len(expired)
+
+    def start_sweeper(self, interval=None):
+        """启动时清理一次，并在后台线程中定期清理。"""
+        interval = interval or self._setting('SWEEP_INTERVAL', DEFAULT_SWEEP_INTERVAL)
+        self.sweep()
+        with self._lock:
+            if self._sweeper is not None:
+                return
+
+            def run():
+                while True:
+                    time.sleep(interval)
+                    try:
+                        self.sweep()
+                    except Exception:
+                        pass
+
+            self._sweeper = threading.Thread(target=run, name='temp-import-sweeper', daemon=True)
+            self._sweeper.start()
+
+    def stats(self):
+        with self._lock:
+            self._ensure_loaded()
+            return {
+                'entries': len(self._entries),
+                'memory_bytes': self._memory_bytes,
+                'disk_bytes': self._disk_bytes,
+            }
+
+    # ---- 内部实现 ----
+
+    @staticmethod
+    def _normalize_id(file_id):
+        try:
+            return str(uuid.UUID(str(file_id)))
+        except ValueError:
+            return None
+
+    def _ensure_loaded(self):
+        # 首次使用时登记目录中遗留的文件（例如上次运行未清理的预览），以文件修改时间作为最近访问时间
+        if self._loaded:
+            return
+        self._loaded = True
+        directory = self.directory
+        found = []
+        for filename in os.listdir(directory):
+            path = os.path.join(directory, filename)
+            file_id = self._normalize_id(filename[:36])
+            if file_id is None or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            found.append((stat.st_mtime, file_id, _Entry(filename[36:], stat.st_size, stat.st_mtime, path=path)))
+        for _, file_id, entry in sorted(found, key=lambda item: item[0]):
+            self._entries[file_id] = entry
+            self._disk_bytes += entry.size
+
+    def _register(self, file_id, entry):
+        with self._lock:
+            self._ensure_loaded()
+            self._entries[file_id] = entry
+            if entry.data is not None:
+                self._memory_bytes += entry.size
+            else:
+                self._disk_bytes += entry.size
+            self._enforce_limits(keep=file_id)
+            due = time.time() - self._last_sweep > self._setting('SWEEP_INTERVAL', DEFAULT_SWEEP_INTERVAL)
+        if due:
+            self.sweep()
+
+    def _touch(self, file_id):
+        file_id = self._normalize_id(file_id)
+        if file_id is None:
+            return None
+        now = time.time()
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._entries.get(file_id)
+            if entry is None:
+                return None
+            if now - entry.last_access > self.ttl or (entry.path and not os.path.exists(entry.path)):
+                self._forget(self._entries.pop(file_id))
+                return None
+            entry.last_access = now
+            self._entries.move_to_end(file_id)
+            return entry
+
+    def _forget(self, entry):
+        if entry.data is not None:
+            self._memory_bytes -= entry.size
+            entry.data = None
+            return
+        self._disk_bytes -= entry.size
+        if entry.path and os.path.exists(entry.path):
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def _enforce_limits(self, keep=None):
+        # _entries 按最近访问排序，靠前的最久未使用
+        max_memory = self._setting('MAX_MEMORY_BYTES', DEFAULT_MAX_MEMORY_BYTES)
+        for file_id, entry in list(self._entries.items()):
+            if self._memory_bytes <= max_memory:
+                break
+            if entry.data is None or file_id == keep:
+                continue
+            path = os.path.join(self.directory, f'{file_id}{entry.suffix}')
+            with open(path, 'wb') as fh:
+                fh.write(entry.data)
+            self._memory_bytes -= entry.size
+            self._disk_bytes += entry.size
+            entry.data = None
+            entry.path = path
+
+        max_disk = self._setting('MAX_DISK_BYTES', DEFAULT_MAX_DISK_BYTES)
+        for file_id, entry in list(self._entries.items()):
+            if self._disk_bytes <= max_disk:
+                break
+            if entry.data is not None or file_id == keep:
+                continue
+            self._forget(self._entries.pop(file_id))
+
+
+store = TempImportStore()
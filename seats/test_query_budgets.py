@@ -0,0 +1,215 @@
+import json
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Classroom, SeatConstraint, SeatGroup
+from .views import (
+    IMPORT_MODE_MATCH,
+    _apply_layout_excel_import,
+    _constraint_issues,
+    _evaluate_layout,
+    _process_import,
+    _snapshot_payload,
+)
+
+
+# 热点视图与辅助函数的 SQL 查询预算（上限）。
+# 夹具：8×10 网格、60 名学生、10 个小组、30 条约束。
+# 预算不应随学生/小组/约束数量增长；若某项超出，通常意味着重新引入了 N+1 查询。
+# 确需调整时，请在此表中更新数值并在提交说明中注明原因。
+QUERY_BUDGETS = {
+    'classroom_detail': 15,
+    'classroom_state': 11,
+    'classroom_state_columnar': 11,
+    'classroom_state_not_modified': 5,  # 命中 If-None-Match：只读取评估输入，不评估布局
+    'move_student': 25,
+    'move_students_batch': 39,  # 一次批量移动 3 名学生
+    'export_students': 2,
+    'export_students_svg': 2,
+    'export_students_pptx': 2,
+    'export_students_preview': 2,
+    'export_students_preview_toggle': 0,  # 带上布局指纹切换预览选项，复用内存中的几何模型
+    'export_group_report': 3,
+    '_evaluate_layout': 6,
+    '_constraint_issues': 2,
+    '_snapshot_payload': 4,
+    '_process_import': 6,  # 200 行名单：60 行更新 + 140 行新增
+    '_apply_layout_excel_import': 9,  # 8×10 座位表：60 名已有学生 + 20 名新生
+}
+
+
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.classroom = Classroom.objects.create(name="查询预算", rows=8, cols=10)
+        seats = list(cls.classroom.seats.order_by('row', 'col'))
+        groups = [
+            SeatGroup.objects.create(classroom=cls.classroom, name=f"第{i + 1}组", order=i)
+            for i in range(10)
+        ]
+        cls.students = [
+            cls.classroom.students.create(name=f"学生{i:02d}", student_id=f"S{i:03d}", score=60 + i % 40)
+            for i in range(60)
+        ]
+
+        # 前 6 行坐满 60 人，后 2 行留空；每 4 行 × 2 列为一个小组
+        for idx, seat in enumerate(seats):
+            seat.group = groups[((seat.row - 1) // 4) * 5 + (seat.col - 1) // 2]
+            if idx < len(cls.students):
+                seat.student = cls.students[idx]
+            seat.save(update_fields=['group', 'student'])
+        for group in groups:
+            leader_seat = group.seats.filter(student__isnull=False).first()
+            if leader_seat:
+                group.leader = leader_seat.student
+                group.save(update_fields=['leader'])
+
+        # 30 条均已满足的约束，覆盖各种约束类型
+        ctype = SeatConstraint.ConstraintType
+        constraints = []
+        for student in cls.students[0:10]:
+            constraints.append(SeatConstraint(classroom=cls.classroom, constraint_type=ctype.FORBID_ROW, student=student, row=8))
+        for student in cls.students[10:15]:
+            constraints.append(SeatConstraint(classroom=cls.classroom, constraint_type=ctype.FORBID_COL, student=student, col=10))
+        for student in cls.students[15:20]:
+            constraints.append(SeatConstraint(classroom=cls.classroom, constraint_type=ctype.FORBID_SEAT, student=student, row=8, col=10))
+        for student in cls.students[20:25]:
+            constraints.append(SeatConstraint(classroom=cls.classroom, constraint_type=ctype.MUST_ROW, student=student, row=3))
+        for student, target in zip(cls.students[25:30], cls.students[55:60]):
+            constraints.append(SeatConstraint(
+                classroom=cls.classroom,
+                constraint_type=ctype.FORBID_TOGETHER,
+                student=student,
+                target_student=target,
+                distance=1
+            ))
+        SeatConstraint.objects.bulk_create(constraints)
+
+    @contextmanager
+    def assertQueryBudget(self, name):
+        budget = QUERY_BUDGETS[name]
+        with CaptureQueriesContext(connection) as ctx:
+            yield
+        executed = len(ctx.captured_queries)
+        if executed > budget:
+            details = '\n'.join(
+                f"{i}. {query['sql']}" for i, query in enumerate(ctx.captured_queries, start=1)
+            )
+            self.fail(f"{name} 执行了 {executed} 条 SQL，超出预算 {budget} 条：\n{details}")
+
+    def _url(self, name):
+        return reverse(name, args=[self.classroom.pk])
+
+    def test_classroom_detail_budget(self):
+        with self.assertQueryBudget('classroom_detail'):
+            response = self.client.get(self._url('classroom_detail'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_classroom_state_budget(self):
+        with self.assertQueryBudget('classroom_state'):
+            response = self.client.get(self._url('classroom_state'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_classroom_state_columnar_budget(self):
+        with self.assertQueryBudget('classroom_state_columnar'):
+            response = self.client.get(self._url('classroom_state') + '?format=columnar')
+        self.assertEqual(response.status_code, 200)
+
+    def test_classroom_state_not_modified_budget(self):
+        version = self.client.get(self._url('classroom_state')).json()['version']
+        with self.assertQueryBudget('classroom_state_not_modified'):
+            response = self.client.get(self._url('classroom_state'), HTTP_IF_NONE_MATCH=f'"{version}"')
+        self.assertEqual(response.status_code, 304)
+
+    def test_move_student_budget(self):
+        payload = {'student_id': self.students[30].pk, 'row': 7, 'col': 1}
+        with self.assertQueryBudget('move_student'):
+            response = self.client.post(
+                self._url('move_student'),
+                data=json.dumps(payload),
+                content_type='application/json'
+            )
+        self.assertEqual(response.json().get('status'), 'success')
+
+    def test_move_students_batch_budget(self):
+        payload = {'moves': [
+            {'student_id': self.students[30].pk, 'row': 7, 'col': 1},
+            {'student_id': self.students[31].pk, 'row': 7, 'col': 2},
+            {'student_id': self.students[32].pk, 'row': 7, 'col': 3},
+        ]}
+        with self.assertQueryBudget('move_students_batch'):
+            response = self.client.post(
+                self._url('move_students_batch'),
+                data=json.dumps(payload),
+                content_type='application/json'
+            )
+        self.assertEqual(response.json().get('status'), 'success')
+
+    def test_export_students_budget(self):
+        with self.assertQueryBudget('export_students'):
+            response = self.client.get(self._url('export_students'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_export_students_svg_budget(self):
+        with self.assertQueryBudget('export_students_svg'):
+            response = self.client.get(self._url('export_students_svg'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_export_students_pptx_budget(self):
+        with self.assertQueryBudget('export_students_pptx'):
+            response = self.client.get(self._url('export_students_pptx'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_export_students_preview_budget(self):
+        with self.assertQueryBudget('export_students_preview'):
+            response = self.client.get(self._url('export_students_preview'), {'format': 'json'})
+        version = response.json()['scene']['version']
+        with self.assertQueryBudget('export_students_preview_toggle'):
+            response = self.client.get(
+                self._url('export_students_preview'),
+                {'version': version, 'theme': 'contrast', 'show_coords': '0'}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Scene-Version'], version)
+
+    def test_export_group_report_budget(self):
+        with self.assertQueryBudget('export_group_report'):
+            response = self.client.get(self._url('export_group_report'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_evaluate_layout_budget(self):
+        with self.assertQueryBudget('_evaluate_layout'):
+            _evaluate_layout(self.classroom)
+
+    def test_constraint_issues_budget(self):
+        with self.assertQueryBudget('_constraint_issues'):
+            issues = _constraint_issues(self.classroom)
+        self.assertEqual(issues, [])
+
+    def test_snapshot_payload_budget(self):
+        with self.assertQueryBudget('_snapshot_payload'):
+            _snapshot_payload(self.classroom)
+
+    def test_process_import_budget(self):
+        rows = [(f"学生{i:02d}", f"S{i:03d}", None, 90) for i in range(60)]
+        rows += [(f"新生{i:03d}", f"N{i:03d}", "男", 70) for i in range(140)]
+        with self.assertQueryBudget('_process_import'):
+            result = _process_import(self.classroom, rows, 0, 1, 2, 3, IMPORT_MODE_MATCH)
+        self.assertEqual((result['updated'], result['created']), (60, 140))
+
+    def test_apply_layout_excel_import_budget(self):
+        names = [f"学生{i:02d}" for i in range(60)] + [f"新生{i:02d}" for i in range(20)]
+        sheet = {
+            'bounds': {'min_row': 1, 'max_row': 8, 'min_col': 1, 'max_col': 10},
+            'cells': [tuple(names[r * 10:(r + 1) * 10]) for r in range(8)],
+            'merged': [],
+        }
+        options = {'manual_name_terms': set(names)}
+        with self.assertQueryBudget('_apply_layout_excel_import'):
+            cells, created = _apply_layout_excel_import(self.classroom, sheet, 1, 8, options)
+        self.assertEqual((cells, created), (80, 20))
+        self.assertEqual(self.classroom.seats.filter(student__isnull=False).count(), 80)
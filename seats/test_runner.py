@@ -0,0 +1,19 @@
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class SeatsTestRunner(DiscoverRunner):
+    """测试期间把导出缓存放到临时目录，不写入项目目录，也不会带到下一次测试运行。"""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._export_cache_dir = tempfile.TemporaryDirectory(prefix='seats-export-cache-')
+        self._saved_export_cache_dir = getattr(settings, 'SEATS_EXPORT_CACHE_DIR', None)
+        settings.SEATS_EXPORT_CACHE_DIR = self._export_cache_dir.name
+
+    def teardown_test_environment(self, **kwargs):
+        settings.SEATS_EXPORT_CACHE_DIR = self._saved_export_cache_dir
+        self._export_cache_dir.cleanup()
+        super().teardown_test_environment(**kwargs)
@@ -1,15 +1,50 @@
-from django.test import TestCase
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.http import StreamingHttpResponse
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 import json
 import importlib.util
+import os
+import pickle
+import tempfile
+import time
 import unittest
+import uuid
 import zipfile
-from io import BytesIO
+from concurrent.futures import Future
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 import openpyxl
 import pandas as pd
 
-from .models import Classroom, SeatConstraint, SeatCellType, SeatGroup
+if importlib.util.find_spec("pptx"):
+    from pptx import Presentation
+    from pptx.dml.color import RGBColor
+    from pptx.enum.shapes import MSO_SHAPE
+    from pptx.enum.text import MSO_ANCHOR, PP_ALIGN
+    from pptx.oxml import parse_xml
+    from pptx.oxml.ns import nsdecls, qn
+    from pptx.util import Inches, Pt
+
+from . import export_bundle, roster_sheets, views
+from .export_cache import ExportCache, cache as export_cache
+from .jobs import _DetachedSession, prune_finished_jobs
+from .metrics import registry
+from .models import Classroom, Job, SeatConstraint, SeatCellType, SeatGroup
+from .name_match import CANDIDATE_LIMIT, PINYIN_CONFIDENCE, NameIndex, NameMatch, bounded_edit_distance
+from .temp_store import TempImportStore
 from .views import _arrange_standard, _arrange_grouped, _apply_internal_policy, _process_import, IMPORT_MODE_MATCH, IMPORT_MODE_REPLACE
+from .views import (
+    _iter_import_records,
+    _normalize_import_records,
+    _parse_layout_sheet,
+    _write_group_report_sheet,
+    _write_seat_chart_sheet,
+)
 
 
 class ConstraintArrangeTests(TestCase):
@@ -757,6 +792,440 @@ class StudentImportTests(TestCase):
         self.assertEqual(result["updated"], 0)
         self.assertEqual(result["skipped"], 0)
 
+    def test_process_import_reports_rejected_rows(self):
+        classroom = Classroom.objects.create(name="导入校验", rows=2, cols=2)
+        rows = [
+            ("  张  三 ", 1001, "女", "92.5"),
+            (None, 1002, "男", 80),
+            (None, None, None, None),
+            ("姓名", "学号", "性别", "总分"),
+            ("李四", None, "未知", "缺考"),
+        ]
+
+        result = _process_import(classroom, rows, 0, 1, 2, 3, import_mode=IMPORT_MODE_REPLACE)
+
+        self.assertEqual(result["created"], 2)
+        self.assertEqual(result["rejected"], 2)
+        self.assertEqual(
+            result["rejections"],
+            [{"row": 2, "reason": "缺少姓名"}, {"row": 4, "reason": "疑似标题行"}],
+        )
+        zhang = classroom.students.get(name="张 三")
+        self.assertEqual((zhang.student_id, zhang.gender, zhang.score), ("1001", "F", 92.5))
+        li = classroom.students.get(name="李四")
+        self.assertEqual((li.student_id, li.gender, li.score), ("", None, 0))
+
+    def test_process_import_fuzzy_matches_variants_and_reports_low_confidence(self):
+        classroom = Classroom.objects.create(name="模糊匹配", rows=2, cols=2)
+        zhang = classroom.students.create(name="张伟", score=10)
+        chen = classroom.students.create(name="陈小明", score=20)
+        wang = classroom.students.create(name="欧阳娜娜", score=30)
+
+        rows = [
+            ("張　偉", 91),      # 繁体 + 全角空格：视为同一人
+            ("陈晓明", 92),      # 一字之差：低置信度，只提示不合并
+            ("欧阳娜娜", 93),    # 精确匹配
+            ("欧阳纳娜", 94),    # 已被精确匹配占用，不再模糊匹配
+        ]
+        result = _process_import(classroom, rows, 0, None, None, 1, import_mode=IMPORT_MODE_MATCH)
+
+        zhang.refresh_from_db()
+        chen.refresh_from_db()
+        wang.refresh_from_db()
+        self.assertEqual((zhang.name, zhang.score), ("張 偉", 91))
+        self.assertEqual(chen.score, 20)
+        self.assertEqual(wang.score, 93)
+        self.assertEqual((result["updated"], result["created"], result["fuzzy_matched"]), (2, 2, 1))
+        self.assertEqual(
+            [(item["row"], item["name"], item["matched_name"]) for item in result["fuzzy_review"]],
+            [(2, "陈晓明", "陈小明")],
+        )
+
+        result = _process_import(
+            classroom, [("陈晓明", 99)], 0, None, None, 1,
+            import_mode=IMPORT_MODE_MATCH, accept_fuzzy=True, dry_run=True,
+        )
+        self.assertEqual(result["updated"], 1)
+        chen.refresh_from_db()
+        self.assertEqual(chen.score, 20)
+
+    def test_process_import_match_duplicate_new_name_creates_once(self):
+        classroom = Classroom.objects.create(name="重复新生", rows=2, cols=2)
+        classroom.students.create(name="老生", score=10)
+
+        rows = [("新生甲", 80), ("新生甲", 85)]
+        result = _process_import(classroom, rows, 0, None, None, 1, import_mode=IMPORT_MODE_MATCH)
+
+        self.assertEqual((result["created"], result["updated"]), (1, 1))
+        self.assertEqual(
+            list(classroom.students.filter(name="新生甲").values_list("score", flat=True)),
+            [85],
+        )
+
+    def test_name_index_only_scores_candidates_sharing_ngrams(self):
+        index = NameIndex((f"学生{i:04d}", i) for i in range(2000))
+        index.add("李雷", "lei")
+        match = index.match("李蕾")
+        self.assertEqual((match.payload, match.confidence), ("lei", 0.5))
+        self.assertIsNone(index.match("韩梅梅"))
+        self.assertEqual(bounded_edit_distance("abcdef", "abcxyz", 2), None)
+        self.assertEqual(bounded_edit_distance("kitten", "sitting", 3), 3)
+        # 同音不同字只提示人工确认，不自动合并
+        self.assertFalse(NameMatch("wei", "张伟", PINYIN_CONFIDENCE, "pinyin").is_confident)
+
+    def test_name_index_skips_claimed_names_before_limiting_candidates(self):
+        claimed = {f"claimed-{i}" for i in range(CANDIDATE_LIMIT + 1)}
+        # 已认领的姓名与查询共享的二元组更多，不能挤掉未认领的相近姓名
+        index = NameIndex([(f"张三丰{i}", f"claimed-{i}") for i in range(CANDIDATE_LIMIT + 1)])
+        index.add("张三峰", "free")
+        self.assertIsNone(index.match("张三丰", exclude=claimed | {"free"}))
+        self.assertEqual(index.match("张三丰", exclude=claimed).payload, "free")
+
+        # 同名的已被认领时，继续按相近姓名查找
+        variants = NameIndex([("张三", "taken"), ("张叁", "free")])
+        self.assertEqual(variants.match("张三").payload, "taken")
+        self.assertEqual(variants.match("张三", exclude={"taken"}).payload, "free")
+
+    def _roster_upload(self, rows):
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        for row in rows:
+            ws.append(row)
+        buffer = BytesIO()
+        wb.save(buffer)
+        upload = BytesIO(buffer.getvalue())
+        upload.name = "roster.xlsx"
+        return upload
+
+    def test_import_students_detects_header_below_title_row(self):
+        classroom = Classroom.objects.create(name="流式导入", rows=2, cols=2)
+        upload = self._roster_upload([
+            ["高一(3)班 期中成绩"],
+            ["学号", "姓名", "性别", "总分"],
+            [1001, "张三", "男", 95],
+            [1002, "李四", "女", 88.5],
+        ])
+
+        response = self.client.post(
+            reverse("import_students", args=[classroom.pk]),
+            {"action": "upload", "excel_file": upload, "import_mode": IMPORT_MODE_MATCH},
+        )
+
+        self.assertEqual(response.json()["status"], "success")
+        zhang = classroom.students.get(name="张三")
+        self.assertEqual(zhang.student_id, "1001")
+        self.assertEqual(zhang.gender, "M")
+        self.assertEqual(classroom.students.get(name="李四").score, 88.5)
+
+    def test_import_students_accepts_gbk_csv_and_tsv(self):
+        classroom = Classroom.objects.create(name="CSV导入", rows=2, cols=2)
+        url = reverse("import_students", args=[classroom.pk])
+
+        csv_upload = BytesIO("学号,姓名,性别,总分\r\n001,张三,男,95\r\n002,李四,女,\r\n".encode("gbk"))
+        csv_upload.name = "roster.csv"
+        response = self.client.post(url, {"action": "upload", "excel_file": csv_upload})
+        self.assertEqual(response.json()["status"], "success")
+        zhang = classroom.students.get(name="张三")
+        self.assertEqual((zhang.student_id, zhang.gender, zhang.score), ("001", "M", 95))
+        self.assertEqual(classroom.students.get(name="李四").score, 0)
+
+        tsv_upload = BytesIO("\ufeff姓名\t总分\n张三\t99.5\n".encode("utf-8"))
+        tsv_upload.name = "roster.tsv"
+        response = self.client.post(url, {"action": "upload", "excel_file": tsv_upload})
+        self.assertEqual(response.json()["status"], "success")
+        self.assertEqual(classroom.students.get(name="张三").score, 99.5)
+
+        csv_upload = BytesIO("名字,成绩\n王五,77\n".encode("utf-8"))
+        csv_upload.name = "roster.csv"
+        file_id = self.client.post(url, {"action": "upload", "excel_file": csv_upload}).json()["file_id"]
+        response = self.client.post(url, {
+            "action": "confirm", "file_id": file_id, "start_row": 0, "name_col_index": 0, "score_col_index": 1,
+        })
+        self.assertEqual(response.json()["status"], "success")
+        self.assertEqual(classroom.students.get(name="王五").score, 77)
+
+    def test_import_students_ambiguous_preview_then_confirm(self):
+        classroom = Classroom.objects.create(name="手动匹配", rows=2, cols=2)
+        upload = self._roster_upload([
+            ["名单", None, None],
+            ["序号", "名字", "成绩"],
+            [1, "王五", 77],
+            [2, "赵六", 66],
+        ])
+        url = reverse("import_students", args=[classroom.pk])
+
+        response = self.client.post(url, {"action": "upload", "excel_file": upload})
+        payload = response.json()
+        self.assertEqual(payload["status"], "ambiguous")
+        self.assertEqual(payload["preview_data"][0], ["名单", "", ""])
+        self.assertEqual(len(payload["preview_data"]), 4)
+
+        confirm = {
+            "action": "confirm",
+            "file_id": payload["file_id"],
+            "start_row": 1,
+            "name_col_index": 5,
+            "score_col_index": 2,
+        }
+        # 选错姓名列时未导入任何学生，缓存保留以便重新匹配
+        response = self.client.post(url, confirm)
+        self.assertEqual(response.json()["status"], "success")
+        self.assertEqual(classroom.students.count(), 0)
+
+        response = self.client.post(url, dict(confirm, name_col_index=1))
+        self.assertEqual(response.json()["status"], "success")
+        self.assertEqual(classroom.students.get(name="王五").score, 77)
+        self.assertEqual(classroom.students.count(), 2)
+
+        response = self.client.post(url, dict(confirm, name_col_index=1))
+        self.assertEqual(response.status_code, 400)
+
+    def test_import_normalization_is_shared_by_dataframe_and_plain_rows(self):
+        rows = [
+            ["  张  三 ", "1001 ", "男", "95"],
+            ["李四", None, " female ", 88.5],
+            ["", "", None, None],
+            [None, "1003", "", ""],
+            ["姓名", "学号", "性别", "总分"],
+            ["王五", float("nan"), "未知", "缺考"],
+        ]
+        expected_rows = [
+            (1, "张 三", "张 三", "1001", "M", 95.0),
+            (2, "李四", "李四", "", "F", 88.5),
+            (6, "王五", "王五", "", None, 0.0),
+        ]
+        expected_rejections = [{"row": 4, "reason": "缺少姓名"}, {"row": 5, "reason": "疑似标题行"}]
+        frame = pd.DataFrame(rows, dtype=object)
+        # pandas 读出的空单元格是 NaN/NaT，而不是 None
+        frame = frame.where(frame.notna(), pd.NaT)
+
+        for source in (rows, frame):
+            normalized, rejections = _normalize_import_records(_iter_import_records(source, 0, 1, 2, 3), True)
+            self.assertEqual(normalized, expected_rows)
+            self.assertEqual(rejections, expected_rejections)
+
+
+class GradeImportTests(TestCase):
+    def _grade_workbook(self):
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = "高一(1)班"
+        ws.append(["姓名", "学号", "总分"])
+        ws.append(["张三", "1001", 90])
+        ws.append(["李四", "1002", 80])
+        ws = wb.create_sheet("高一(2)班")
+        ws.append(["高一(2)班 名单"])
+        ws.append(["学生姓名", "性别", "总分"])
+        ws.append(["王五", "男", 70])
+        wb.create_sheet("说明").append(["本表仅供参考"])
+        buffer = BytesIO()
+        wb.save(buffer)
+        upload = BytesIO(buffer.getvalue())
+        upload.name = "grade.xlsx"
+        return upload
+
+    def test_import_grade_creates_and_matches_classrooms_by_sheet_name(self):
+        existing = Classroom.objects.create(name="高一(1)班", rows=2, cols=2)
+        existing.students.create(name="张三", student_id="1001", score=10)
+
+        response = self.client.post(reverse("import_grade"), {
+            "excel_file": self._grade_workbook(),
+            "rows": 5,
+            "cols": 6,
+        })
+
+        payload = response.json()
+        self.assertEqual(payload["status"], "success")
+        self.assertEqual(
+            [(item["sheet"], item["status"]) for item in payload["sheets"]],
+            [("高一(1)班", "success"), ("高一(2)班", "success"), ("说明", "skipped")],
+        )
+        self.assertEqual(existing.students.get(name="张三").score, 90)
+        self.assertEqual(existing.students.count(), 2)
+        created = Classroom.objects.get(name="高一(2)班")
+        self.assertEqual((created.rows, created.cols), (5, 6))
+        self.assertEqual(created.students.get(name="王五").gender, "M")
+        self.assertFalse(Classroom.objects.filter(name="说明").exists())
+
+    def test_read_sheet_rows_matches_streaming_reader(self):
+        with tempfile.NamedTemporaryFile(suffix=".xlsx") as fh:
+            fh.write(self._grade_workbook().getvalue())
+            fh.flush()
+            self.assertEqual(roster_sheets.sheet_names(fh.name, "xlsx"), ["高一(1)班", "高一(2)班", "说明"])
+            self.assertEqual(
+                roster_sheets.read_sheet_rows(fh.name, "xlsx", 1),
+                [("高一(2)班 名单",), ("学生姓名", "性别", "总分"), ("王五", "男", 70)],
+            )
+
+
+class LayoutImportTests(TestCase):
+    def _layout_upload(self):
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws["B1"] = "讲台"
+        ws.merge_cells("B1:E1")
+        ws.append([None, "张三", "李四", None, "王五"])
+        ws.append([None, "陈七", "空位", None, "周八"])
+        buffer = BytesIO()
+        wb.save(buffer)
+        upload = BytesIO(buffer.getvalue())
+        upload.name = "layout.xlsx"
+        return upload
+
+    def test_parse_layout_sheet_fills_merged_blocks_from_label_grid(self):
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws["A1"] = "高一 (1) 班"
+        ws.merge_cells("A1:F1")
+        for col, name in zip("ACE", ["张三", "李四", None]):
+            if name:
+                ws[f"{col}2"] = name
+            ws.merge_cells(f"{col}2:{chr(ord(col) + 1)}3")
+        ws["A4"] = "讲台"
+        ws["F4"] = "后门"
+        buffer = BytesIO()
+        wb.save(buffer)
+        buffer.seek(0)
+
+        full = openpyxl.load_workbook(BytesIO(buffer.getvalue())).active
+        self.assertEqual(
+            roster_sheets.read_layout_sheet(BytesIO(buffer.getvalue()))[1],
+            [tuple(merged_range.bounds) for merged_range in full.merged_cells.ranges],
+        )
+        # 读取原始 XML 的私有接口不可用时退化为没有合并区域，而不是导入失败
+        with mock.patch.object(roster_sheets, "_open_sheet_xml", return_value=None):
+            self.assertEqual(roster_sheets.read_layout_sheet(BytesIO(buffer.getvalue()))[1], [])
+
+        sheet = _parse_layout_sheet(buffer)
+        self.assertEqual(sheet["bounds"], {"min_row": 1, "max_row": 4, "min_col": 1, "max_col": 6})
+        self.assertEqual(sheet["cells"], [
+            ("高一(1)班",) * 6,
+            ("张三", "张三", "李四", "李四", "", ""),
+            ("张三", "张三", "李四", "李四", "", ""),
+            ("讲台", "", "", "", "", "后门"),
+        ])
+
+    def test_layout_cell_classifier_keeps_precedence_and_memoizes(self):
+        options = {
+            "manual_name_terms": {"讲台君"},
+            "manual_empty_terms": {"黑板报"},
+            "manual_aisle_terms": {"后排"},
+            "auto_detect_names": True,
+        }
+        classify = views._layout_cell_classifier(options)
+        self.assertIs(classify, views._layout_cell_classifier(dict(options)))
+
+        with mock.patch("seats.views._is_name_like_text", wraps=views._is_name_like_text) as name_like:
+            self.assertEqual(classify("讲台君"), (SeatCellType.SEAT, "讲台君", "手动姓名"))
+            self.assertEqual(classify("黑板报")[0], SeatCellType.PODIUM)
+            self.assertEqual(classify("过道空位")[0], SeatCellType.EMPTY)
+            self.assertEqual(classify("后排")[0], SeatCellType.AISLE)
+            self.assertEqual(classify(""), (SeatCellType.AISLE, None, "空白识别为走廊"))
+            for _ in range(3):
+                self.assertEqual(classify("王小明"), (SeatCellType.SEAT, "王小明", "自动姓名"))
+        self.assertEqual(name_like.call_count, 1)
+
+        no_names = views._layout_cell_classifier(dict(options, auto_detect_names=False))
+        self.assertEqual(no_names("王小明"), (SeatCellType.SEAT, None, "默认座位"))
+
+    def test_layout_defaults_pick_largest_of_side_by_side_blocks(self):
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws["A1"] = "讲台"
+        ws.merge_cells("A1:E1")
+        ws["H1"] = "讲台"
+        ws.merge_cells("H1:I1")
+        ws.append(["张三", "李四", None, "王五", "赵六", None, None, "孙一", "钱二"])
+        ws.append(["陈七", "周八", None, "吴九", "郑十", None, None, "冯三"])
+        buffer = BytesIO()
+        wb.save(buffer)
+        upload = BytesIO(buffer.getvalue())
+        upload.name = "two_classes.xlsx"
+
+        classroom = Classroom.objects.create(name="并排座位表", rows=2, cols=2)
+        url = reverse("import_layout_excel", args=[classroom.pk])
+        payload = self.client.post(url, {"action": "upload", "layout_excel_file": upload}).json()
+        auto = payload["auto_selected"]
+        self.assertEqual((auto["start_col"], auto["end_col"]), (1, 5))
+        self.assertEqual((auto["podium_row"], auto["start_row"], auto["end_row"]), (1, 2, 3))
+        self.assertEqual(auto["aisle_cols"], [3])
+        self.assertEqual(
+            [(b["min_col"], b["max_col"], b["named"]) for b in auto["blocks"]],
+            [(1, 5, 8), (8, 9, 3)],
+        )
+        self.assertEqual((payload["grid_rows"], payload["grid_cols"]), (2, 5))
+
+        response = self.client.post(url, {
+            "action": "confirm",
+            "file_id": payload["file_id"],
+            "start_row": 2,
+            "end_row": 3,
+            "start_col": 1,
+            "end_col": 5,
+        })
+        self.assertEqual(response.json()["status"], "success")
+        self.assertEqual(classroom.students.count(), 8)
+        self.assertFalse(classroom.students.filter(name="孙一").exists())
+
+    def test_layout_defaults_keep_full_width_across_wide_aisle(self):
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws["D1"] = "讲台"
+        surnames = "赵钱孙李周"
+        for r, surname in enumerate(surnames):
+            given = "一二三四五"
+            ws.append([surname + given[0], surname + given[1], None, None] + [surname + g for g in given[2:]])
+        buffer = BytesIO()
+        wb.save(buffer)
+        upload = BytesIO(buffer.getvalue())
+        upload.name = "wide_aisle.xlsx"
+
+        classroom = Classroom.objects.create(name="宽走廊座位表", rows=2, cols=2)
+        url = reverse("import_layout_excel", args=[classroom.pk])
+        payload = self.client.post(url, {"action": "upload", "layout_excel_file": upload}).json()
+        auto = payload["auto_selected"]
+        self.assertEqual((auto["start_col"], auto["end_col"]), (None, None))
+        self.assertEqual((auto["podium_row"], auto["start_row"], auto["end_row"]), (1, 2, 6))
+        self.assertEqual(auto["aisle_cols"], [3, 4])
+        self.assertEqual(
+            [(b["min_col"], b["max_col"], b["named"]) for b in auto["blocks"]],
+            [(5, 7, 15), (1, 2, 10)],
+        )
+        self.assertEqual((payload["grid_rows"], payload["grid_cols"]), (5, 7))
+
+    def test_layout_workbook_is_parsed_once_for_detect_preview_and_apply(self):
+        classroom = Classroom.objects.create(name="座位表导入", rows=2, cols=2)
+        url = reverse("import_layout_excel", args=[classroom.pk])
+
+        with mock.patch("seats.views.openpyxl.load_workbook", wraps=openpyxl.load_workbook) as load:
+            payload = self.client.post(url, {"action": "upload", "layout_excel_file": self._layout_upload()}).json()
+            self.assertEqual(payload["status"], "ready")
+            self.assertEqual(payload["auto_selected"]["podium_row"], 1)
+            self.assertEqual((payload["start_row"], payload["end_row"]), (2, 3))
+            self.assertEqual((payload["grid_rows"], payload["grid_cols"]), (2, 4))
+            self.assertEqual(payload["stats"]["named"], 5)
+
+            preview = self.client.post(url, {"action": "preview", "file_id": payload["file_id"], "start_row": 1, "end_row": 3}).json()
+            self.assertEqual(preview["stats"]["podium"], 4)
+            self.assertEqual(preview["bounds"], {"min_row": 1, "max_row": 3, "min_col": 2, "max_col": 5})
+
+            # 内存中的解析结果被淘汰后，从临时存储中的缓存恢复，仍不重新读取工作簿
+            views._import_artifact_memo.clear()
+            response = self.client.post(url, {"action": "confirm", "file_id": payload["file_id"], "start_row": 2, "end_row": 3})
+            self.assertEqual(response.json()["status"], "success")
+        self.assertEqual(load.call_count, 1)
+        self.assertTrue(load.call_args.kwargs["read_only"])
+
+        classroom.refresh_from_db()
+        self.assertEqual((classroom.rows, classroom.cols), (2, 4))
+        self.assertEqual(classroom.students.count(), 5)
+        seat = classroom.seats.get(row=2, col=2)
+        self.assertEqual(seat.cell_type, SeatCellType.EMPTY)
+        self.assertEqual(classroom.seats.get(row=1, col=3).cell_type, SeatCellType.AISLE)
+
+        response = self.client.post(url, {"action": "preview", "file_id": payload["file_id"]})
+        self.assertEqual(response.status_code, 400)
+
 
 class ClassroomFeatureTests(TestCase):
     def test_export_options_pages_render(self):
@@ -830,6 +1299,41 @@ class ClassroomFeatureTests(TestCase):
         self.assertEqual(ws.cell(row=2, column=1).value, "D")
         self.assertEqual(ws.cell(row=3, column=2).value, "A")
 
+    def test_excel_exports_share_named_styles_in_one_workbook(self):
+        classroom = Classroom.objects.create(name="样式班", rows=1, cols=2)
+        group = classroom.groups.create(name="第1组", order=1)
+        seat = classroom.seats.get(row=1, col=1)
+        seat.student = classroom.students.create(name="张三", score=90)
+        seat.group = group
+        seat.save()
+        group.leader = seat.student
+        group.save(update_fields=["leader"])
+        seats = list(classroom.seats.select_related("student"))
+
+        wb = openpyxl.Workbook(write_only=True)
+        _write_seat_chart_sheet(wb, classroom, seats, False)
+        _write_group_report_sheet(wb, classroom, [group], [seat])
+        classroom.name = "样式班（翻转）"
+        _write_seat_chart_sheet(wb, classroom, seats, True)
+        buffer = BytesIO()
+        wb.save(buffer)
+
+        loaded = openpyxl.load_workbook(BytesIO(buffer.getvalue()))
+        self.assertEqual(loaded.sheetnames, ["样式班", "小组作业登记表", "样式班（翻转）"])
+        self.assertEqual(len(loaded.named_styles), len(set(loaded.named_styles)))
+        chart = loaded["样式班"]
+        self.assertEqual(chart["A3"].style, "座次表学生")
+        self.assertEqual(chart["A3"].border.left.style, "thin")
+        self.assertEqual(chart["B3"].style, "座次表座位")
+        self.assertIn("A1:B1", {str(rng) for rng in chart.merged_cells.ranges})
+        report = loaded["小组作业登记表"]
+        self.assertEqual(report["A1"].value, "第1组")
+        self.assertEqual(report["H2"].value, "张三")
+        self.assertEqual(report["H2"].style, "小组作业表组长")
+        self.assertEqual(report["H2"].font.color.rgb, "00FF0000")
+        self.assertIn("A1:F1", {str(rng) for rng in report.merged_cells.ranges})
+        self.assertEqual(loaded["样式班（翻转）"]["A3"].value, "讲台")
+
     def test_export_students_svg_returns_svg_content(self):
         classroom = Classroom.objects.create(name="SVG班", rows=1, cols=2)
         student = classroom.students.create(name="Alice", score=95)
@@ -842,7 +1346,7 @@ class ClassroomFeatureTests(TestCase):
 
         self.assertEqual(response.status_code, 200)
         self.assertIn("image/svg+xml", response.get("Content-Type", ""))
-        content = response.content.decode("utf-8")
+        content = response.getvalue().decode("utf-8")
         self.assertIn("<svg", content)
         self.assertIn("Alice", content)
         self.assertIn("SVG班", content)
@@ -862,7 +1366,7 @@ class ClassroomFeatureTests(TestCase):
         response = self.client.get(url)
 
         self.assertEqual(response.status_code, 200)
-        content = response.content.decode("utf-8")
+        content = response.getvalue().decode("utf-8")
         self.assertNotIn("座次图", content)
         self.assertNotIn("讲台", content)
         self.assertNotIn("Alice", content)
@@ -879,7 +1383,7 @@ class ClassroomFeatureTests(TestCase):
         response = self.client.get(url)
 
         self.assertEqual(response.status_code, 200)
-        content = response.content.decode("utf-8")
+        content = response.getvalue().decode("utf-8")
         self.assertIn("#0b1220", content)
         self.assertNotIn("走廊", content)
 
@@ -898,7 +1402,7 @@ class ClassroomFeatureTests(TestCase):
         response = self.client.get(url)
 
         self.assertEqual(response.status_code, 200)
-        content = response.content.decode("utf-8")
+        content = response.getvalue().decode("utf-8")
         self.assertIn('class="cell-name" font-size="', content)
         self.assertIn('dominant-baseline="middle"', content)
 
@@ -921,23 +1425,156 @@ class ClassroomFeatureTests(TestCase):
         self.assertIn(".pptx", response.get("Content-Disposition", ""))
         self.assertTrue(response.content.startswith(b"PK"))
 
-    def test_export_students_svg_preview_student_returns_real_student(self):
-        classroom = Classroom.objects.create(name="SVG预览班", rows=1, cols=2)
-        s1 = classroom.students.create(name="Alice", score=90)
-        s2 = classroom.students.create(name="Bob", score=80)
+    @unittest.skipUnless(importlib.util.find_spec("pptx"), "python-pptx not installed")
+    def test_export_students_pptx_shapes_are_readable(self):
+        classroom = Classroom.objects.create(name="PPT模板班", rows=1, cols=3)
+        group = classroom.groups.create(name="第1组", order=1)
         seat = classroom.seats.get(row=1, col=1)
-        seat.student = s1
-        seat.save(update_fields=["student"])
+        seat.student = classroom.students.create(name="张三", score=88)
+        seat.group = group
+        seat.save()
+        aisle = classroom.seats.get(row=1, col=3)
+        aisle.cell_type = SeatCellType.AISLE
+        aisle.save(update_fields=["cell_type"])
 
-        url = reverse("export_students_svg_preview_student", args=[classroom.pk])
+        url = reverse("export_students_pptx", args=[classroom.pk]) + "?theme=classic"
         response = self.client.get(url)
 
         self.assertEqual(response.status_code, 200)
-        payload = response.json()
-        self.assertEqual(payload.get("status"), "success")
-        sample = payload.get("sample") or {}
-        self.assertEqual(sample.get("classroom"), "SVG预览班")
-        self.assertIn(sample.get("name"), ["Alice", "Bob"])
+        slide = Presentation(BytesIO(response.content)).slides[0]
+        shapes = list(slide.shapes)
+        shape_ids = [shape.shape_id for shape in shapes]
+        self.assertEqual(len(shape_ids), len(set(shape_ids)))
+        texts = [shape.text_frame.text for shape in shapes if shape.has_text_frame and shape.text_frame.text]
+        for text in ["PPT模板班 座次图", "讲台", "(1-1)", "第1组", "张三", "88分", "空座位", "走廊"]:
+            self.assertIn(text, texts)
+        name_run = next(shape for shape in shapes if shape.has_text_frame and shape.text_frame.text == "张三")
+        name_font = name_run.text_frame.paragraphs[0].runs[0].font
+        self.assertTrue(name_font.bold)
+        self.assertEqual(name_font.name, "鸿蒙黑体")
+        self.assertEqual(str(shapes[0].fill.fore_color.rgb), "F7FAFF")
+
+    @unittest.skipUnless(importlib.util.find_spec("pptx"), "python-pptx not installed")
+    def test_export_students_pptx_templates_match_shape_api_output(self):
+        def rgb(color):
+            raw = str(color or "").strip().lstrip("#")
+            if len(raw) == 3:
+                raw = "".join(ch * 2 for ch in raw)
+            try:
+                return RGBColor(int(raw[0:2], 16), int(raw[2:4], 16), int(raw[4:6], 16)) if len(raw) == 6 else RGBColor(0, 0, 0)
+            except ValueError:
+                return RGBColor(0, 0, 0)
+
+        class ShapeApiWriter:
+            # 改用 XML 模板之前逐个形状调用 python-pptx 高层接口的写法，作为输出一致的基准
+            def __init__(self, slide, font_name):
+                self.shapes = slide.shapes
+                self.font_name = font_name
+
+            def add_background(self, w, h, fill_color):
+                bg = self.shapes.add_shape(MSO_SHAPE.RECTANGLE, Inches(0), Inches(0), Inches(w), Inches(h))
+                bg.fill.solid()
+                bg.fill.fore_color.rgb = rgb(fill_color)
+                bg.line.fill.background()
+
+            def add_round_rect(self, x, y, w, h, fill_color, stroke_color=None, line_width_pt=None):
+                shape = self.shapes.add_shape(MSO_SHAPE.ROUNDED_RECTANGLE, Inches(x), Inches(y), Inches(w), Inches(h))
+                shape.fill.solid()
+                shape.fill.fore_color.rgb = rgb(fill_color)
+                if stroke_color:
+                    shape.line.color.rgb = rgb(stroke_color)
+                    shape.line.width = Pt(line_width_pt)
+                else:
+                    shape.line.fill.background()
+                sp_pr = shape._element.spPr
+                for child in list(sp_pr):
+                    if child.tag == qn("a:effectLst"):
+                        sp_pr.remove(child)
+                sp_pr.append(parse_xml(
+                    f'<a:effectLst {nsdecls("a")}>'
+                    '<a:outerShdw blurRad="38100" dist="19050" dir="5400000" algn="ctr" rotWithShape="0">'
+                    '<a:srgbClr val="000000"><a:alpha val="12000"/></a:srgbClr>'
+                    '</a:outerShdw>'
+                    '</a:effectLst>'
+                ))
+
+            def add_text(self, x, y, w, h, text, color, size_pt, bold=False, center=False, middle=True):
+                if text is None:
+                    return
+                shape = self.shapes.add_textbox(Inches(x), Inches(y), Inches(w), Inches(h))
+                tf = shape.text_frame
+                tf.clear()
+                tf.margin_left = tf.margin_right = tf.margin_top = tf.margin_bottom = 0
+                tf.word_wrap = False
+                tf.vertical_anchor = MSO_ANCHOR.MIDDLE if middle else MSO_ANCHOR.TOP
+                paragraph = tf.paragraphs[0]
+                paragraph.alignment = PP_ALIGN.CENTER if center else PP_ALIGN.LEFT
+                run = paragraph.add_run()
+                run.text = str(text)
+                run.font.name = self.font_name
+                run.font.bold = bool(bold)
+                run.font.size = Pt(size_pt)
+                run.font.color.rgb = rgb(color)
+                r_pr = run._r.get_or_add_rPr()
+                for tag in ("latin", "ea", "cs"):
+                    node = r_pr.find(qn(f"a:{tag}"))
+                    if node is None:
+                        r_pr.append(parse_xml(f'<a:{tag} {nsdecls("a")} typeface="{self.font_name}"/>'))
+                    else:
+                        node.set("typeface", self.font_name)
+
+        classroom = Classroom.objects.create(name="PPT一致性", rows=3, cols=4)
+        groups = [classroom.groups.create(name=f"第{i}组", order=i) for i in (1, 2)]
+        names = ["张三", "李四", "欧阳娜娜", "王五", "赵六"]
+        seats = list(classroom.seats.filter(col__lte=3).order_by("row", "col"))
+        for seat, name in zip(seats, names):
+            seat.student = classroom.students.create(name=name, score=60 + len(name) * 10)
+            seat.group = groups[seat.col % 2]
+            seat.save()
+        classroom.seats.filter(col=4).update(cell_type=SeatCellType.AISLE)
+        groups[0].leader = classroom.students.get(name="李四")
+        groups[0].save(update_fields=["leader"])
+
+        url = reverse("export_students_pptx", args=[classroom.pk])
+        with override_settings(SEATS_EXPORT_CACHE_MAX_BYTES=0):
+            for query in ("", "?theme=contrast&show_score=0&show_coords=0&show_group=0"):
+                fast = self.client.get(url + query)
+                with mock.patch("seats.pptx_slides.SlideShapeWriter", ShapeApiWriter):
+                    reference = self.client.get(url + query)
+                with zipfile.ZipFile(BytesIO(fast.content)) as a, zipfile.ZipFile(BytesIO(reference.content)) as b:
+                    self.assertEqual(a.read("ppt/slides/slide1.xml"), b.read("ppt/slides/slide1.xml"), query)
+
+    def test_export_students_preview_renders_scene_with_options(self):
+        classroom = Classroom.objects.create(name="预览班", rows=2, cols=8)
+        student = classroom.students.create(name="张三", score=88)
+        group = SeatGroup.objects.create(classroom=classroom, name="第1组", order=0)
+        seat = classroom.seats.get(row=1, col=1)
+        seat.student = student
+        seat.group = group
+        seat.save(update_fields=["student", "group"])
+        url = reverse("export_students_preview", args=[classroom.pk])
+
+        scene = self.client.get(url, {"format": "json"}).json()["scene"]
+        self.assertEqual((scene["rows"], scene["cols"]), (2, 8))
+        self.assertEqual(scene["groups"], [[group.pk, "第1组"]])
+        self.assertEqual(scene["cells"][0], [1, 1, "seat", "张三", student.display_score, group.pk])
+        self.assertEqual(scene["cells"][1][3], None)
+
+        response = self.client.get(url, {"version": scene["version"], "theme": "contrast", "show_score": "0"})
+        self.assertEqual(response.status_code, 200)
+        svg_text = response.content.decode("utf-8")
+        self.assertIn('width="640"', svg_text)
+        self.assertIn('viewBox="0 0 1078 320"', svg_text)
+        self.assertIn("张三", svg_text)
+        self.assertNotIn("88分", svg_text)
+        self.assertIn("#0b1220", svg_text)
+
+        # 不带指纹（重新打开选项页）时重新读取座位，得到新布局的指纹
+        seat.student = None
+        seat.save(update_fields=["student"])
+        response = self.client.get(url)
+        self.assertNotEqual(response["X-Scene-Version"], scene["version"])
+        self.assertNotIn("张三", response.content.decode("utf-8"))
 
     def test_export_group_report_header_font_size_code_is_delimited(self):
         classroom = Classroom.objects.create(name="09班", rows=2, cols=2)
@@ -983,3 +1620,509 @@ class ClassroomFeatureTests(TestCase):
         self.assertEqual(response.json().get("status"), "error")
         classroom.refresh_from_db()
         self.assertEqual(classroom.name, "原班级2")
+
+
+class ClassroomStateTests(TestCase):
+    def test_classroom_detail_embeds_bootstrap_state(self):
+        classroom = Classroom.objects.create(name="首屏", rows=1, cols=2)
+        seat = classroom.seats.get(row=1, col=1)
+        seat.student = classroom.students.create(name="Alice", score=90)
+        seat.save(update_fields=["student"])
+        classroom.students.create(name="Bob")
+
+        detail_resp = self.client.get(reverse("classroom_detail", args=[classroom.pk]))
+        self.assertEqual(detail_resp.status_code, 200)
+        bootstrap = detail_resp.context["bootstrap_state"]
+        self.assertIn('id="classroom-bootstrap-state"', detail_resp.content.decode("utf-8"))
+
+        state_resp = self.client.get(reverse("classroom_state", args=[classroom.pk]))
+        self.assertEqual(state_resp.status_code, 200)
+        self.assertEqual(state_resp.json(), bootstrap)
+        self.assertEqual(state_resp["ETag"], f'"{bootstrap["version"]}"')
+
+    def test_classroom_state_returns_304_for_current_version(self):
+        classroom = Classroom.objects.create(name="版本", rows=1, cols=2)
+        student = classroom.students.create(name="Alice")
+        url = reverse("classroom_state", args=[classroom.pk])
+
+        version = self.client.get(url).json()["version"]
+        not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=f'"{version}"')
+        self.assertEqual(not_modified.status_code, 304)
+
+        seat = classroom.seats.get(row=1, col=2)
+        seat.student = student
+        seat.save(update_fields=["student"])
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=f'"{version}"')
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.json()["version"], version)
+
+    def test_classroom_state_304_skips_layout_evaluation(self):
+        classroom = Classroom.objects.create(name="免评估", rows=1, cols=2)
+        classroom.students.create(name="Alice")
+        url = reverse("classroom_state", args=[classroom.pk])
+
+        version = self.client.get(url).json()["version"]
+        with mock.patch("seats.views._evaluate_layout") as evaluate:
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=f'"{version}"')
+        self.assertEqual(not_modified.status_code, 304)
+        evaluate.assert_not_called()
+
+    def test_classroom_state_version_tracks_suggestion_inputs(self):
+        classroom = Classroom.objects.create(name="建议输入", rows=1, cols=2)
+        student = classroom.students.create(name="Alice", score=0)
+        url = reverse("classroom_state", args=[classroom.pk])
+
+        version = self.client.get(url).json()["version"]
+        student.score = 88
+        student.save(update_fields=["score"])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=f'"{version}"').status_code, 200)
+
+        version = self.client.get(url).json()["version"]
+        SeatConstraint.objects.create(
+            classroom=classroom, student=student,
+            constraint_type=SeatConstraint.ConstraintType.MUST_ROW, row=1
+        )
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=f'"{version}"').status_code, 200)
+
+    def test_classroom_state_columnar_format(self):
+        classroom = Classroom.objects.create(name="列式", rows=1, cols=3)
+        group = SeatGroup.objects.create(classroom=classroom, name="G1", order=1)
+        alice = classroom.students.create(name="Alice", score=95)
+        bob = classroom.students.create(name="Bob")
+        seat = classroom.seats.get(row=1, col=1)
+        seat.student = alice
+        seat.group = group
+        seat.save(update_fields=["student", "group"])
+        group.leader = alice
+        group.save(update_fields=["leader"])
+        aisle = classroom.seats.get(row=1, col=3)
+        aisle.cell_type = SeatCellType.AISLE
+        aisle.save(update_fields=["cell_type"])
+
+        url = reverse("classroom_state", args=[classroom.pk]) + "?format=columnar"
+        data = self.client.get(url).json()
+
+        self.assertEqual(data["format"], "columnar")
+        seats = data["seats"]
+        self.assertEqual(seats["row"], [1, 1, 1])
+        self.assertEqual(seats["col"], [1, 2, 3])
+        self.assertEqual([data["cell_types"][code] for code in seats["cell_type"]], ["seat", "seat", "aisle"])
+        self.assertEqual(seats["student"], [alice.pk, None, None])
+        self.assertEqual(seats["group"], [group.pk, None, None])
+        self.assertEqual(seats["leader"], [1, 0, 0])
+        self.assertEqual(data["students"][str(alice.pk)]["name"], "Alice")
+        self.assertEqual(data["groups"][str(group.pk)]["name"], "G1")
+        self.assertEqual(data["unseated"], [bob.pk])
+        self.assertIn("delete_url", data["students"][str(bob.pk)])
+
+    def test_classroom_state_is_gzipped_when_accepted(self):
+        classroom = Classroom.objects.create(name="压缩", rows=6, cols=8)
+        url = reverse("classroom_state", args=[classroom.pk]) + "?format=columnar"
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        self.addCleanup(registry.reset)
+
+    @override_settings(SEATS_REQUEST_METRICS=True)
+    def test_server_timing_header_and_prometheus_metrics(self):
+        classroom = Classroom.objects.create(name="统计", rows=2, cols=2)
+
+        response = self.client.get(reverse("classroom_detail", args=[classroom.pk]))
+        self.assertEqual(response.status_code, 200)
+        server_timing = response["Server-Timing"]
+        self.assertIn('desc="SQL x', server_timing)
+        self.assertIn("tpl;dur=", server_timing)
+        self.assertIn("total;dur=", server_timing)
+
+        metrics_resp = self.client.get(reverse("request_metrics"))
+        self.assertEqual(metrics_resp.status_code, 200)
+        body = metrics_resp.content.decode("utf-8")
+        self.assertIn("# TYPE seats_request_duration_seconds summary", body)
+        self.assertIn('seats_request_queries_count{view="classroom_detail"} 1', body)
+        self.assertIn('seats_request_duration_seconds{view="classroom_detail",quantile="0.99"}', body)
+
+    def test_metrics_disabled_by_default(self):
+        classroom = Classroom.objects.create(name="统计关闭", rows=1, cols=1)
+        response = self.client.get(reverse("classroom_detail", args=[classroom.pk]))
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(self.client.get(reverse("request_metrics")).status_code, 404)
+
+
+class TempImportStoreTests(TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.base_dir = temp_dir.name
+        settings_override = override_settings(
+            BASE_DIR=self.base_dir,
+            SEATS_TEMP_IMPORT_TTL=60,
+            SEATS_TEMP_IMPORT_MAX_DISK_BYTES=250,
+            SEATS_TEMP_IMPORT_MAX_MEMORY_BYTES=150,
+            SEATS_TEMP_IMPORT_MEMORY_ITEM_BYTES=100,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.store = TempImportStore()
+        self.upload = SimpleUploadedFile
+
+    def _disk_files(self):
+        return sorted(os.listdir(self.store.directory))
+
+    def test_small_upload_stays_in_memory(self):
+        file_id = self.store.save_upload(self.upload("a.xlsx", b"x" * 80), ".xlsx")
+
+        self.assertEqual(self._disk_files(), [])
+        self.assertEqual(self.store.open(file_id).read(), b"x" * 80)
+        self.assertIsNone(self.store.open("../../etc/passwd"))
+
+    def test_memory_overflow_spills_and_disk_cap_evicts_least_recent(self):
+        first = self.store.save_bytes(b"1" * 90, ".pkl")
+        second = self.store.save_bytes(b"2" * 90, ".pkl")
+        # 内存上限 150 字节：最早的条目转存到磁盘
+        self.assertEqual(self._disk_files(), [f"{first}.pkl"])
+        self.assertEqual(self.store.read_bytes(first), b"1" * 90)
+
+        large = self.store.save_upload(self.upload("big.xlsx", b"L" * 200), ".xlsx")
+        # 磁盘上限 250 字节：淘汰最久未访问的条目，刚写入的保留
+        self.assertFalse(self.store.exists(first))
+        self.assertTrue(self.store.exists(second))
+        self.assertEqual(self.store.open(large), os.path.join(self.store.directory, f"{large}.xlsx"))
+
+    def test_sweep_removes_expired_entries_and_leftover_files(self):
+        leftover = str(uuid.uuid4())
+        leftover_path = os.path.join(self.store.directory, f"{leftover}.xlsx")
+        with open(leftover_path, "wb") as fh:
+            fh.write(b"old")
+        os.utime(leftover_path, (time.time() - 120, time.time() - 120))
+        # 首次写入时登记目录中遗留的文件并顺带清理过期项
+        fresh = self.store.save_bytes(b"new", ".pkl")
+
+        self.assertFalse(os.path.exists(leftover_path))
+        self.assertEqual(self.store.sweep(), 0)
+        self.assertTrue(self.store.exists(fresh))
+        self.assertEqual(self.store.sweep(now=time.time() + 120), 1)
+        self.assertFalse(self.store.exists(fresh))
+
+    def test_import_views_only_unpickle_their_own_artifacts(self):
+        classroom = Classroom.objects.create(name="临时文件种类", rows=2, cols=2)
+        raw_upload = views.temp_store.save_upload(self.upload("roster.xlsx", pickle.dumps({"columns": []})))
+        roster_id = views._store_roster_artifact([("姓名",), ("张三",)])
+
+        with mock.patch("seats.views.pickle.loads") as loads:
+            self.assertIsNone(views._load_roster_artifact(raw_upload))
+            self.assertIsNone(views._load_layout_sheet(roster_id))
+            response = self.client.post(reverse("import_students", args=[classroom.pk]), {
+                "action": "confirm", "file_id": raw_upload, "name_col_index": 0,
+            })
+            layout = self.client.post(reverse("import_layout_excel", args=[classroom.pk]), {
+                "action": "confirm", "file_id": roster_id, "start_row": 1, "end_row": 2,
+            })
+        loads.assert_not_called()
+        self.assertIn("过期", response.json()["message"])
+        self.assertIn("过期", layout.json()["message"])
+        self.assertEqual(views._load_roster_artifact(roster_id)["row_count"], 2)
+
+
+class ExportCacheTests(TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        settings_override = override_settings(SEATS_EXPORT_CACHE_DIR=temp_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_repeated_export_is_served_from_cache_with_etag(self):
+        classroom = Classroom.objects.create(name="导出缓存", rows=2, cols=2)
+        student = classroom.students.create(name="张三", score=90)
+        seat = classroom.seats.get(row=1, col=1)
+        seat.student = student
+        seat.save()
+        url = reverse("export_students", args=[classroom.pk])
+
+        first = self.client.get(url)
+        etag = first["ETag"]
+        with mock.patch("seats.views.openpyxl.Workbook") as workbook:
+            second = self.client.get(url + "?layout_transform=none")
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        workbook.assert_not_called()
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["Content-Disposition"], first["Content-Disposition"])
+        self.assertEqual(not_modified.status_code, 304)
+
+        rotated = self.client.get(url + "?rotate_180=1")
+        self.assertNotEqual(rotated["ETag"], etag)
+
+        student.name = "张三丰"
+        student.save()
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], etag)
+
+        svg_url = reverse("export_students_svg", args=[classroom.pk])
+        svg = self.client.get(svg_url, {"theme": "CLASSIC"})
+        self.assertEqual(self.client.get(svg_url, HTTP_IF_NONE_MATCH=svg["ETag"]).status_code, 304)
+
+    def test_svg_export_streams_symbol_templates_then_caches(self):
+        classroom = Classroom.objects.create(name="SVG流式", rows=2, cols=3)
+        group = classroom.groups.create(name="第1组", order=1)
+        for col, name in enumerate(["张三", "李四"], start=1):
+            seat = classroom.seats.get(row=1, col=col)
+            seat.student = classroom.students.create(name=name, score=90)
+            seat.group = group
+            seat.save()
+        aisle = classroom.seats.get(row=2, col=3)
+        aisle.cell_type = SeatCellType.AISLE
+        aisle.save()
+        url = reverse("export_students_svg", args=[classroom.pk])
+
+        response = self.client.get(url)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        content = response.getvalue().decode("utf-8")
+        self.assertEqual(content.count('<symbol id="group-tag-'), 1)
+        self.assertEqual(content.count('xlink:href="#group-tag-'), 2)
+        self.assertEqual(content.count('xlink:href="#seat-vacant"'), 3)
+        self.assertEqual(content.count('xlink:href="#cell-aisle"'), 1)
+        self.assertEqual(content.count("走廊"), 1)
+        self.assertNotIn("fill=", content)
+
+        cached = self.client.get(url)
+        self.assertNotIsInstance(cached, StreamingHttpResponse)
+        self.assertEqual(cached.content.decode("utf-8"), content)
+        self.assertEqual(cached["ETag"], response["ETag"])
+
+    def test_export_cache_evicts_least_recently_used_entries(self):
+        cache = ExportCache()
+        meta = {"content_type": "text/plain", "content_disposition": "attachment"}
+        with override_settings(SEATS_EXPORT_CACHE_MAX_BYTES=500):
+            cache.put("a", meta, b"a" * 100)
+            cache.put("b", meta, b"b" * 100)
+            self.assertEqual(cache.get("a"), (meta, b"a" * 100))
+            cache.put("c", meta, b"c" * 100)
+            self.assertIsNone(cache.get("b"))
+            self.assertIsNotNone(cache.get("a"))
+
+            reloaded = ExportCache()
+            self.assertEqual(reloaded.stats()["entries"], 2)
+            self.assertEqual(reloaded.get("c"), (meta, b"c" * 100))
+
+        with override_settings(SEATS_EXPORT_CACHE_MAX_BYTES=0):
+            cache.put("d", meta, b"d")
+            self.assertIsNone(cache.get("a"))
+
+    def test_read_only_cache_reads_other_writers_without_touching_disk(self):
+        meta = {"content_type": "text/plain", "content_disposition": "attachment"}
+        with override_settings(SEATS_EXPORT_CACHE_MAX_BYTES=300):
+            worker = ExportCache()
+            worker.set_read_only()
+            self.assertIsNone(worker.get("a"))
+
+            parent = ExportCache()
+            parent.put("a", meta, b"a" * 100)
+            in_flight = os.path.join(parent.directory, "b.export.0.tmp")
+            with open(in_flight, "wb") as fh:
+                fh.write(b"b" * 200)
+
+            # 子进程的索引先于父进程的写入建立，仍能直接按键读到条目
+            self.assertEqual(worker.get("a"), (meta, b"a" * 100))
+            worker.put("c", meta, b"c" * 100)
+            self.assertFalse(worker.contains("a"))
+            self.assertIsNone(parent.get("c"))
+            self.assertTrue(os.path.exists(in_flight))
+            self.assertEqual(parent.stats(), {"entries": 1, "bytes": os.path.getsize(parent._path("a"))})
+
+
+class ExportBundleTests(TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+        settings_override = override_settings(BASE_DIR=temp_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.first = Classroom.objects.create(name="一班", rows=2, cols=2)
+        self.second = Classroom.objects.create(name="二班", rows=1, cols=2)
+        group = self.first.groups.create(name="第1组", order=1)
+        seat = self.first.seats.get(row=1, col=1)
+        seat.student = self.first.students.create(name="张三", score=90)
+        seat.group = group
+        seat.save()
+
+    def test_bundle_streams_every_format_for_selected_classrooms(self):
+        response = self.client.get(reverse("export_bundle"), {
+            "classroom": [self.first.pk, self.second.pk],
+            "format": ["excel", "svg", "group_report"],
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/zip")
+        bundle = zipfile.ZipFile(BytesIO(response.getvalue()))
+        self.assertIsNone(bundle.testzip())
+        self.assertEqual(bundle.namelist(), [
+            "一班/一班_座次图.xlsx",
+            "一班/一班_座次图.svg",
+            "一班/一班_小组作业表.xlsx",
+            "二班/二班_座次图.xlsx",
+            "二班/二班_座次图.svg",
+            "二班/二班_小组作业表.xlsx",
+        ])
+        self.assertIn("张三", bundle.read("一班/一班_座次图.svg").decode("utf-8"))
+        workbook = openpyxl.load_workbook(BytesIO(bundle.read("一班/一班_座次图.xlsx")))
+        self.assertEqual(workbook.active["A3"].value, "张三")
+
+    def test_bundle_workers_hand_renders_back_for_the_parent_to_cache(self):
+        class WorkerPool:
+            # 在当前进程中模拟子进程：与 init_worker 一样，渲染期间导出缓存只读
+            def __init__(self, max_workers, initializer):
+                pass
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def submit(self, func, *args):
+                future = Future()
+                export_cache.set_read_only()
+                try:
+                    future.set_result(func(*args))
+                finally:
+                    export_cache.set_read_only(False)
+                return future
+
+        cache_dir = os.path.join(self.temp_dir, "export_cache")
+        tasks = export_bundle.build_bundle_tasks([self.first, self.second], ["excel", "svg"])
+        with override_settings(SEATS_EXPORT_CACHE_DIR=cache_dir), \
+                mock.patch.object(export_bundle, "ProcessPoolExecutor", WorkerPool), \
+                mock.patch.object(export_bundle, "_bundle_workers", return_value=2):
+            bundle = zipfile.ZipFile(BytesIO(b"".join(export_bundle.iter_bundle_zip(tasks))))
+            stats = export_cache.stats()
+            on_disk = sum(os.path.getsize(os.path.join(cache_dir, name)) for name in os.listdir(cache_dir))
+
+        self.assertEqual(len(bundle.namelist()), len(tasks))
+        self.assertEqual(stats, {"entries": len(tasks), "bytes": on_disk})
+
+    def test_bundle_rejects_missing_classrooms_and_unknown_formats(self):
+        url = reverse("export_bundle")
+
+        response = self.client.get(url, {"classroom": [999]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["message"], "请选择要导出的班级")
+
+        response = self.client.get(url, {"classroom": [self.first.pk], "format": ["pdf"]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("pdf", response.json()["message"])
+
+    def test_export_bundle_command_writes_zip_for_all_classrooms(self):
+        output = os.path.join(self.temp_dir, "bundle.zip")
+        Classroom.objects.create(name="一班", rows=1, cols=1)
+        call_command("export_bundle", "--all", "--format", "svg", "-o", output, stdout=StringIO())
+
+        with zipfile.ZipFile(output) as bundle:
+            names = bundle.namelist()
+        self.assertEqual(len(names), 3)
+        self.assertIn("二班/二班_座次图.svg", names)
+        self.assertEqual({name.split("/")[0] for name in names if name.startswith("一班")}, {
+            f"一班_{pk}" for pk in Classroom.objects.filter(name="一班").values_list("pk", flat=True)
+        })
+
+
+@override_settings(SEATS_JOB_EAGER=True)
+class BackgroundJobTests(TestCase):
+    def test_async_export_runs_as_job_and_serves_download(self):
+        classroom = Classroom.objects.create(name="后台导出", rows=2, cols=2)
+        classroom.students.create(name="张三", score=90)
+
+        response = self.client.get(reverse("export_students_svg", args=[classroom.pk]), {"async": "1"})
+        self.assertEqual(response.status_code, 202)
+        queued = response.json()
+        self.assertEqual(queued["status"], "queued")
+
+        status = self.client.get(queued["job_url"]).json()
+        self.assertEqual((status["kind"], status["status"], status["progress"]), ("export_students_svg", "success", 1.0))
+        self.assertNotIn("file_id", status["result"])
+
+        download = self.client.get(status["result"]["download_url"])
+        direct = self.client.get(reverse("export_students_svg", args=[classroom.pk]))
+        self.assertEqual(download.content, direct.getvalue())
+        self.assertEqual(download["Content-Disposition"], direct["Content-Disposition"])
+
+    def test_async_job_writes_session_changes_back_from_a_copy(self):
+        classroom = Classroom.objects.create(name="后台排座", rows=2, cols=2)
+        classroom.students.create(name="张三", score=90)
+        session = self.client.session
+        session["history"] = {str(classroom.pk): {"undo": [{"type": "move"}], "redo": []}}
+        session.save()
+
+        queued = self.client.post(
+            reverse("auto_arrange_seats", args=[classroom.pk]),
+            {"method": "random", "async": "1"},
+        ).json()
+        status = self.client.get(queued["job_url"]).json()
+
+        self.assertEqual(status["status"], "success")
+        self.assertEqual(self.client.session["history"][str(classroom.pk)], {"undo": [], "redo": []})
+
+    def test_detached_session_writes_back_only_what_the_job_changed(self):
+        live = SessionStore()
+        live["history"] = {"1": {"undo": [{"type": "move"}], "redo": []}, "2": {"undo": [], "redo": []}}
+        live["ignore_export_1"] = True
+        live.save()
+        detached = _DetachedSession(live.session_key, dict(live.items()))
+
+        # 任务运行期间，其他请求为班级 2 记录了撤销历史并写入了新键
+        during = SessionStore(session_key=live.session_key)
+        during["history"]["2"]["undo"].append({"type": "group"})
+        during["theme"] = "dark"
+        during.save()
+
+        detached["history"]["1"] = {"undo": [], "redo": []}
+        detached.pop("ignore_export_1")
+        detached.save()
+
+        after = SessionStore(session_key=live.session_key)
+        self.assertEqual(after["history"]["1"], {"undo": [], "redo": []})
+        self.assertEqual(after["history"]["2"], {"undo": [{"type": "group"}], "redo": []})
+        self.assertEqual(after["theme"], "dark")
+        self.assertNotIn("ignore_export_1", after)
+
+    def test_prune_finished_jobs_keeps_recent_and_unfinished(self):
+        old = timezone.now() - timedelta(days=30)
+        stale = Job.objects.create(kind="export_students", status=Job.Status.SUCCESS, finished_at=old)
+        failed = Job.objects.create(kind="export_students", status=Job.Status.FAILED, finished_at=old)
+        recent = Job.objects.create(kind="export_students", status=Job.Status.SUCCESS, finished_at=timezone.now())
+        running = Job.objects.create(kind="export_students", status=Job.Status.RUNNING)
+
+        self.assertEqual(prune_finished_jobs(retention=7 * 24 * 60 * 60), 2)
+        remaining = set(Job.objects.values_list("pk", flat=True))
+        self.assertEqual(remaining, {recent.pk, running.pk})
+        self.assertFalse({stale.pk, failed.pk} & remaining)
+
+    def test_async_import_keeps_uploaded_file_and_reports_failure(self):
+        classroom = Classroom.objects.create(name="后台导入", rows=2, cols=2)
+        wb = openpyxl.Workbook()
+        wb.active.append(["姓名", "总分"])
+        wb.active.append(["李四", 88])
+        buffer = BytesIO()
+        wb.save(buffer)
+        upload = BytesIO(buffer.getvalue())
+        upload.name = "roster.xlsx"
+        url = reverse("import_students", args=[classroom.pk])
+
+        queued = self.client.post(url, {"action": "upload", "excel_file": upload, "async": "1"}).json()
+        status = self.client.get(queued["job_url"]).json()
+        self.assertEqual(status["status"], "success")
+        self.assertEqual(status["result"]["status"], "success")
+        self.assertEqual(classroom.students.get(name="李四").score, 88)
+
+        queued = self.client.post(url, {"action": "confirm", "file_id": "missing", "name_col_index": 0, "async": "1"}).json()
+        status = self.client.get(queued["job_url"]).json()
+        self.assertEqual(status["status"], "failed")
+        self.assertIn("过期", status["message"])
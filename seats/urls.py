@@ -4,6 +4,11 @@ from . import views
 urlpatterns = [
     path('', views.index, name='index'),
     path('create/', views.create_classroom, name='create_classroom'),
+    path('import/grade/', views.import_grade, name='import_grade'),
+    path('export/bundle/', views.export_bundle, name='export_bundle'),
+    path('metrics', views.request_metrics, name='request_metrics'),
+    path('jobs/<int:job_id>/', views.job_status, name='job_status'),
+    path('jobs/<int:job_id>/download/', views.job_download, name='job_download'),
     path('classroom/<int:pk>/', views.classroom_detail, name='classroom_detail'),
     path('classroom/<int:pk>/layout/', views.layout_editor, name='layout_editor'),
     path('classroom/<int:pk>/layout/grid/', views.update_layout_grid, name='update_layout_grid'),
@@ -13,7 +18,7 @@ urlpatterns = [
     path('classroom/<int:pk>/export/', views.export_students, name='export_students'),
     path('classroom/<int:pk>/export/options/', views.export_students_options_page, name='export_students_options_page'),
     path('classroom/<int:pk>/export/svg/', views.export_students_svg, name='export_students_svg'),
-    path('classroom/<int:pk>/export/svg/preview-student/', views.export_students_svg_preview_student, name='export_students_svg_preview_student'),
+    path('classroom/<int:pk>/export/preview/', views.export_students_preview, name='export_students_preview'),
     path('classroom/<int:pk>/export/svg/options/', views.export_students_svg_options_page, name='export_students_svg_options_page'),
     path('classroom/<int:pk>/export/pptx/', views.export_students_pptx, name='export_students_pptx'),
     path('classroom/<int:pk>/export/pptx/options/', views.export_students_pptx_options_page, name='export_students_pptx_options_page'),
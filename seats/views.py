@@ -1,25 +1,49 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse, JsonResponse
+from django.http import Http404, HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.views.decorators.gzip import gzip_page
 from django.views.decorators.http import require_POST
 from django.db import transaction, models, IntegrityError
 from django.utils import timezone
 from django.urls import reverse
 from django.utils.encoding import escape_uri_path
-from django.conf import settings
-from .models import Classroom, Student, Seat, SeatCellType, SeatGroup, LayoutSnapshot, SeatConstraint
+from django.utils.http import parse_etags, quote_etag
+from .models import Classroom, Student, Seat, SeatCellType, SeatGroup, LayoutSnapshot, SeatConstraint, Job
+from .metrics import registry as metrics_registry
+from .middleware import request_metrics_enabled
+from .temp_store import store as temp_store
+from .export_cache import cache as export_cache
+from .export_bundle import EXPORT_BUNDLE_FORMATS, build_bundle_tasks, iter_bundle_zip
+from . import roster_sheets
+from .jobs import background_capable, report_progress
+from .name_match import NameIndex
 import pandas as pd
+import numpy as np
 from io import BytesIO
+import io
+import csv
+import codecs
 import json
 import random
 import os
 import re
-import uuid
 import html
+import hashlib
+import functools
+import itertools
+import pickle
+import threading
 import openpyxl
 import math
-from collections import defaultdict
-from openpyxl.styles import Alignment, Border, Side, Font, PatternFill
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Side, Font, NamedStyle, PatternFill
+from openpyxl.styles.borders import DEFAULT_BORDER
+from openpyxl.styles.fonts import DEFAULT_FONT
 from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.cell_range import CellRange
+from openpyxl.worksheet.page import PageMargins
+from openpyxl.worksheet.worksheet import Worksheet
 
 DISABLED_SUGGESTION_TYPES = {'jqj_hzh'}
 
@@ -118,18 +142,6 @@ def _name_emphasis_font_size(text):
     return size
 
 
-def _hex_to_rgb_parts(color):
-    raw = str(color or '').strip().lstrip('#')
-    if len(raw) == 3:
-        raw = ''.join(ch * 2 for ch in raw)
-    if len(raw) != 6:
-        return 0, 0, 0
-    try:
-        return int(raw[0:2], 16), int(raw[2:4], 16), int(raw[4:6], 16)
-    except ValueError:
-        return 0, 0, 0
-
-
 def _sync_seats(classroom, rows, cols):
     if classroom.rows != rows or classroom.cols != cols:
         classroom.rows = rows
@@ -143,7 +155,7 @@ def _snapshot_payload(classroom, include_students=True, include_constraints=True
     seats = list(classroom.seats.select_related('student', 'group'))
     groups = list(classroom.groups.all())
     students = list(classroom.students.all())
-    constraints = list(classroom.constraints.all())
+    constraints = list(classroom.constraints.select_related('student', 'target_student'))
 
     data = {
         'meta': {
@@ -357,14 +369,21 @@ def _is_ajax_request(request):
 
 
 def _normalize_group_leaders(classroom, group_ids=None):
-    groups = classroom.groups.all()
+    groups = classroom.groups.filter(leader__isnull=False)
     if group_ids is not None:
         groups = groups.filter(pk__in=list(group_ids))
+    groups = list(groups)
+    if not groups:
+        return
+    seated_pairs = set(
+        Seat.objects.filter(
+            group_id__in=[group.pk for group in groups],
+            cell_type=SeatCellType.SEAT,
+            student__isnull=False
+        ).values_list('group_id', 'student_id')
+    )
     for group in groups:
-        if not group.leader_id:
-            continue
-        still_in_group = group.seats.filter(cell_type=SeatCellType.SEAT, student_id=group.leader_id).exists()
-        if not still_in_group:
+        if (group.pk, group.leader_id) not in seated_pairs:
             group.leader = None
             group.save(update_fields=['leader'])
 
@@ -587,7 +606,7 @@ def _constraint_issues(classroom):
     seats = list(classroom.seats.select_related('student'))
     student_seat = {seat.student_id: seat for seat in seats if seat.student_id}
 
-    for constraint in classroom.constraints.filter(enabled=True):
+    for constraint in classroom.constraints.filter(enabled=True).select_related('student', 'target_student'):
         student = constraint.student
         seat = student_seat.get(student.pk)
         ctype = constraint.constraint_type
@@ -873,10 +892,18 @@ def _evaluate_layout(classroom, request=None):
         })
 
     if groups:
+        group_students = defaultdict(list)
+        grouped_seats = classroom.seats.filter(
+            cell_type=SeatCellType.SEAT,
+            group__isnull=False,
+            student__isnull=False
+        ).select_related('student')
+        for seat in grouped_seats:
+            group_students[seat.group_id].append(seat.student)
+
         group_data = []
         for g in groups:
-             seats = g.seats.filter(cell_type=SeatCellType.SEAT).select_related('student')
-             students = [s.student for s in seats if s.student]
+             students = group_students.get(g.pk)
              if not students: continue
              current_sum = sum(s.score or 0 for s in students)
              count = len(students)
@@ -934,42 +961,37 @@ def _evaluate_layout(classroom, request=None):
     return _filter_internal_issues(issues)
 
 
-def classroom_detail(request, pk):
-    classroom = get_object_or_404(Classroom, pk=pk)
-    suggestions = _evaluate_layout(classroom, request)
-    seats = list(classroom.seats.select_related('student', 'group').all())
-    seat_map = _build_seat_map(seats)
+def _classroom_state_version(payload):
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
 
-    seat_grid = []
-    for r in range(1, classroom.rows + 1):
-        row_seats = []
-        for c in range(1, classroom.cols + 1):
-            row_seats.append(seat_map.get((r, c)))
-        seat_grid.append(row_seats)
 
-    unseated_students = classroom.students.filter(assigned_seat__isnull=True).order_by('name')
-    groups = classroom.groups.all()
-    snapshots = classroom.layout_snapshots.all()
-    constraints = classroom.constraints.select_related('student', 'target_student').all()
-    
-    return render(request, 'seats/classroom_detail.html', {
-        'classroom': classroom,
-        'seat_grid': seat_grid,
-        'students': classroom.students.all().order_by('name'),
-        'unseated_students': unseated_students,
-        'groups': groups,
-        'snapshots': snapshots,
-        'constraints': constraints,
-        'suggestions': suggestions
+def _classroom_input_version(classroom, seats, unseated_students, request=None, state_format=''):
+    """由布局评估依赖的输入（座位、学生、小组、启用的约束、忽略标记）计算状态版本，无需先评估布局。"""
+    seat_inputs = []
+    for seat in seats:
+        student = seat.student
+        group = seat.group
+        seat_inputs.append([
+            seat.row, seat.col, seat.cell_type,
+            [student.pk, student.name, student.score] if student else None,
+            [group.pk, group.name, group.leader_id] if group else None,
+        ])
+    ignore_export = request.session.get(f'ignore_export_{classroom.pk}', False) if request else False
+    return _classroom_state_version({
+        'format': state_format,
+        'size': [classroom.rows, classroom.cols],
+        'seats': seat_inputs,
+        'unseated': [[student.pk, student.name, student.score] for student in unseated_students],
+        'groups': list(classroom.groups.order_by('pk').values_list('pk', 'name', 'leader_id')),
+        'constraints': list(classroom.constraints.filter(enabled=True).order_by('pk').values_list(
+            'pk', 'constraint_type', 'student_id', 'target_student_id', 'row', 'col', 'distance'
+        )),
+        'ignore_export': bool(ignore_export),
     })
 
 
-def classroom_state(request, pk):
-    classroom = get_object_or_404(Classroom, pk=pk)
-    suggestions = _evaluate_layout(classroom, request)
-    seats = list(classroom.seats.select_related('student', 'group').all())
-    unseated_students = classroom.students.filter(assigned_seat__isnull=True).order_by('name')
-
+def _build_classroom_state(classroom, seats, unseated_students, suggestions, version):
     seat_payload = []
     for seat in seats:
         student = seat.student
@@ -1002,14 +1024,184 @@ def classroom_state(request, pk):
             'delete_url': reverse('delete_student', args=[classroom.pk, student.pk])
         })
 
-    return JsonResponse({
+    state = {
         'seats': seat_payload,
         'unseated': unseated_payload,
         'suggestions': suggestions,
-        'unseated_count': len(unseated_payload)
+        'unseated_count': len(unseated_payload),
+        'version': version
+    }
+    return state
+
+
+STATE_CELL_TYPE_CODES = list(SeatCellType.values)
+STATE_CELL_TYPE_INDEX = {value: idx for idx, value in enumerate(STATE_CELL_TYPE_CODES)}
+
+
+def _build_classroom_state_columnar(classroom, seats, unseated_students, suggestions, version):
+    rows = []
+    cols = []
+    cell_types = []
+    student_ids = []
+    group_ids = []
+    leader_flags = []
+    students = {}
+    groups = {}
+
+    for seat in seats:
+        student = seat.student
+        group = seat.group
+        rows.append(seat.row)
+        cols.append(seat.col)
+        cell_types.append(STATE_CELL_TYPE_INDEX.get(seat.cell_type, 0))
+        student_ids.append(student.pk if student else None)
+        group_ids.append(group.pk if group else None)
+        leader_flags.append(1 if (student and group and group.leader_id == student.pk) else 0)
+        if student:
+            students[str(student.pk)] = {
+                'name': student.name,
+                'score_display': student.display_score if (student.score or 0) > 0 else None
+            }
+        if group and str(group.pk) not in groups:
+            groups[str(group.pk)] = {'name': group.name}
+
+    unseated_ids = []
+    for student in unseated_students:
+        unseated_ids.append(student.pk)
+        students[str(student.pk)] = {
+            'name': student.name,
+            'score_display': student.display_score if (student.score or 0) > 0 else None,
+            'delete_url': reverse('delete_student', args=[classroom.pk, student.pk])
+        }
+
+    state = {
+        'format': 'columnar',
+        'rows': classroom.rows,
+        'cols': classroom.cols,
+        'cell_types': STATE_CELL_TYPE_CODES,
+        'cell_type_labels': [label for _, label in SeatCellType.choices],
+        'seats': {
+            'row': rows,
+            'col': cols,
+            'cell_type': cell_types,
+            'student': student_ids,
+            'group': group_ids,
+            'leader': leader_flags
+        },
+        'students': students,
+        'groups': groups,
+        'unseated': unseated_ids,
+        'suggestions': suggestions,
+        'unseated_count': len(unseated_ids),
+        'version': version
+    }
+    return state
+
+
+def _etag_matches(request, version):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header or not version:
+        return False
+    # GZip 压缩后 ETag 会被标记为弱校验，比较时忽略 W/ 前缀
+    etags = [tag[2:] if tag.startswith('W/') else tag for tag in parse_etags(header)]
+    return '*' in etags or quote_etag(version) in etags
+
+
+def classroom_detail(request, pk):
+    classroom = get_object_or_404(Classroom, pk=pk)
+    suggestions = _evaluate_layout(classroom, request)
+    seats = list(classroom.seats.select_related('student', 'group').all())
+    seat_map = _build_seat_map(seats)
+
+    seat_grid = []
+    for r in range(1, classroom.rows + 1):
+        row_seats = []
+        for c in range(1, classroom.cols + 1):
+            row_seats.append(seat_map.get((r, c)))
+        seat_grid.append(row_seats)
+
+    unseated_students = list(classroom.students.filter(assigned_seat__isnull=True).order_by('name'))
+    groups = classroom.groups.all()
+    snapshots = classroom.layout_snapshots.all()
+    constraints = classroom.constraints.select_related('student', 'target_student').all()
+    # 首屏直接内嵌与 classroom_state 一致的状态，前端据此初始化，免去再次评估布局
+    version = _classroom_input_version(classroom, seats, unseated_students, request)
+    bootstrap_state = _build_classroom_state(classroom, seats, unseated_students, suggestions, version)
+
+    return render(request, 'seats/classroom_detail.html', {
+        'classroom': classroom,
+        'seat_grid': seat_grid,
+        'students': classroom.students.all().order_by('name'),
+        'unseated_students': unseated_students,
+        'groups': groups,
+        'snapshots': snapshots,
+        'constraints': constraints,
+        'suggestions': suggestions,
+        'bootstrap_state': bootstrap_state
+    })
+
+
+@gzip_page
+def classroom_state(request, pk):
+    classroom = get_object_or_404(Classroom, pk=pk)
+    seats = list(classroom.seats.select_related('student', 'group').all())
+    unseated_students = list(classroom.students.filter(assigned_seat__isnull=True).order_by('name'))
+    columnar = str(request.GET.get('format', '')).strip().lower() == 'columnar'
+    # 版本只取决于评估输入，命中 If-None-Match 时直接返回 304，不再评估布局
+    version = _classroom_input_version(classroom, seats, unseated_students, request, 'columnar' if columnar else '')
+
+    if _etag_matches(request, version):
+        response = HttpResponseNotModified()
+    else:
+        suggestions = _evaluate_layout(classroom, request)
+        if columnar:
+            state = _build_classroom_state_columnar(classroom, seats, unseated_students, suggestions, version)
+        else:
+            state = _build_classroom_state(classroom, seats, unseated_students, suggestions, version)
+        response = JsonResponse(state)
+    response['ETag'] = quote_etag(version)
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def request_metrics(request):
+    if not request_metrics_enabled():
+        raise Http404('请求统计未开启')
+    return HttpResponse(
+        metrics_registry.render_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+def job_status(request, job_id):
+    job = get_object_or_404(Job, pk=job_id)
+    result = job.result
+    if isinstance(result, dict) and 'file_id' in result:
+        # 下载文件的内部标识不对外暴露
+        result = {key: value for key, value in result.items() if key != 'file_id'}
+    return JsonResponse({
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'message': job.message,
+        'result': result,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
     })
 
 
+def job_download(request, job_id):
+    job = get_object_or_404(Job, pk=job_id, status=Job.Status.SUCCESS)
+    result = job.result or {}
+    content = temp_store.read_bytes(result.get('file_id')) if result.get('file_id') else None
+    if content is None:
+        raise Http404('导出文件已过期，请重新导出')
+    response = HttpResponse(content, content_type=result.get('content_type') or 'application/octet-stream')
+    response['Content-Disposition'] = result.get('content_disposition') or 'attachment'
+    return response
+
 def layout_editor(request, pk):
     classroom = get_object_or_404(Classroom, pk=pk)
     seats = list(classroom.seats.all())
@@ -1037,21 +1229,6 @@ def update_layout_grid(request, pk):
     return redirect('layout_editor', pk=pk)
 
 
-def _ensure_temp_import_dir():
-    temp_dir = os.path.join(settings.BASE_DIR, 'temp_imports')
-    os.makedirs(temp_dir, exist_ok=True)
-    return temp_dir
-
-
-def _save_uploaded_temp_file(uploaded_file, suffix):
-    file_id = str(uuid.uuid4())
-    temp_path = os.path.join(_ensure_temp_import_dir(), f'{file_id}{suffix}')
-    with open(temp_path, 'wb+') as destination:
-        for chunk in uploaded_file.chunks():
-            destination.write(chunk)
-    return file_id, temp_path
-
-
 def _parse_bool(value):
     return str(value or '').strip().lower() in {'1', 'true', 'yes', 'on'}
 
@@ -1082,66 +1259,109 @@ def _is_name_like_text(text):
     return bool(re.fullmatch(r'[^\d\s]{2,5}', text))
 
 
-def _build_merged_value_map(ws, min_row, max_row, min_col, max_col):
-    merged_map = {}
-    for merged_range in ws.merged_cells.ranges:
-        c1, r1, c2, r2 = merged_range.bounds
-        if r2 < min_row or r1 > max_row or c2 < min_col or c1 > max_col:
-            continue
-        master_val = ws.cell(row=r1, column=c1).value
-        rr1 = max(r1, min_row)
-        rr2 = min(r2, max_row)
-        cc1 = max(c1, min_col)
-        cc2 = min(c2, max_col)
-        for r in range(rr1, rr2 + 1):
-            for c in range(cc1, cc2 + 1):
-                merged_map[(r, c)] = master_val
-    return merged_map
-
-
-def _detect_layout_bounds(ws):
-    min_row = None
-    max_row = None
-    min_col = None
-    max_col = None
-    for row in ws.iter_rows(min_row=1, max_row=ws.max_row, min_col=1, max_col=ws.max_column):
-        for cell in row:
-            if _normalize_cell_text(cell.value):
-                r, c = cell.row, cell.column
-                min_row = r if min_row is None else min(min_row, r)
-                max_row = r if max_row is None else max(max_row, r)
-                min_col = c if min_col is None else min(min_col, c)
-                max_col = c if max_col is None else max(max_col, c)
-    if min_row is None:
-        return {
-            'min_row': 1,
-            'max_row': 1,
-            'min_col': 1,
-            'max_col': 1
-        }
+LAYOUT_SHEET_SUFFIX = '.layout.pkl'
+
+
+def _parse_layout_sheet(source):
+    """解析座位表（当前工作表），得到去空白后的文本矩阵，合并单元格按左上角的值填充。
+
+    矩阵只覆盖有内容的区域（bounds），检测、预览与导入都基于它，上传后只解析一次。
+    """
+    values, merged = roster_sheets.read_layout_sheet(source)
+    width = max((len(row) for row in values), default=0)
+    texts = np.full((len(values), width), '', dtype=object)
+    for r, row in enumerate(values):
+        texts[r, :len(row)] = [_normalize_cell_text(value) for value in row]
+    del values
+
+    filled = texts != ''
+    used_rows = np.flatnonzero(filled.any(axis=1))
+    used_cols = np.flatnonzero(filled.any(axis=0))
+    if used_rows.size:
+        min_row, max_row = int(used_rows[0]) + 1, int(used_rows[-1]) + 1
+        min_col, max_col = int(used_cols[0]) + 1, int(used_cols[-1]) + 1
+        grid = texts[min_row - 1:max_row, min_col - 1:max_col]
+    else:
+        min_row = max_row = min_col = max_col = 1
+        grid = np.full((1, 1), '', dtype=object)
+
+    if merged:
+        labels = _merged_label_grid(merged, min_row, max_row, min_col, max_col)
+        masters = np.array(
+            [
+                texts[r1 - 1, c1 - 1] if r1 <= texts.shape[0] and c1 <= texts.shape[1] else ''
+                for c1, r1, _, _ in merged
+            ] + [''],
+            dtype=object
+        )
+        grid = np.where(labels >= 0, masters[labels], grid)
+
     return {
-        'min_row': min_row,
-        'max_row': max_row,
-        'min_col': min_col,
-        'max_col': max_col
+        'bounds': {
+            'min_row': min_row,
+            'max_row': max_row,
+            'min_col': min_col,
+            'max_col': max_col
+        },
+        'cells': [tuple(row) for row in grid.tolist()],
+        'merged': merged,
     }
 
 
-def _calc_col_bounds_for_rows(ws, start_row, end_row, base_min_col, base_max_col):
-    min_col = None
-    max_col = None
-    merged_map = _build_merged_value_map(ws, start_row, end_row, base_min_col, base_max_col)
+def _merged_label_grid(merged, min_row, max_row, min_col, max_col):
+    """合并区域标签数组：每个格子记录所在合并区域在 merged 中的序号，不在任何合并区域内为 -1。
+
+    每个合并区域只做一次切片赋值，之后按格子查找左上角的值是 O(1) 的数组索引。
+    """
+    labels = np.full((max_row - min_row + 1, max_col - min_col + 1), -1, dtype=np.int32)
+    for idx, (c1, r1, c2, r2) in enumerate(merged):
+        rr1, rr2 = max(r1, min_row), min(r2, max_row)
+        cc1, cc2 = max(c1, min_col), min(c2, max_col)
+        if rr1 > rr2 or cc1 > cc2:
+            continue
+        labels[rr1 - min_row:rr2 - min_row + 1, cc1 - min_col:cc2 - min_col + 1] = idx
+    return labels
+
+
+def _iter_layout_sheet_rows(sheet, start_row, end_row):
+    # 产出 (表格行号, 该行文本元组)，行号与 Excel 中一致
+    min_row = sheet['bounds']['min_row']
     for r in range(start_row, end_row + 1):
-        for c in range(base_min_col, base_max_col + 1):
-            val = merged_map.get((r, c), ws.cell(row=r, column=c).value)
-            if _normalize_cell_text(val):
-                min_col = c if min_col is None else min(min_col, c)
-                max_col = c if max_col is None else max(max_col, c)
-    if min_col is None:
-        return base_min_col, base_max_col
+        yield r, sheet['cells'][r - min_row]
+
+
+def _layout_sheet_array(sheet):
+    # 文本矩阵的 NumPy 视图，首次使用时生成并挂在解析结果上复用
+    array = sheet.get('array')
+    if array is None:
+        array = np.empty((len(sheet['cells']), len(sheet['cells'][0])), dtype=object)
+        array[:, :] = sheet['cells']
+        sheet['array'] = array
+    return array
+
+
+def _clamp_layout_cols(sheet, start_col=None, end_col=None):
+    bounds = sheet['bounds']
+    min_col = max(bounds['min_col'], int(start_col or bounds['min_col']))
+    max_col = min(bounds['max_col'], int(end_col or bounds['max_col']))
+    if max_col < min_col:
+        max_col = min_col
     return min_col, max_col
 
 
+def _calc_col_bounds_for_rows(sheet, start_row, end_row, start_col=None, end_col=None):
+    bounds = sheet['bounds']
+    base_min_col, base_max_col = _clamp_layout_cols(sheet, start_col, end_col)
+    region = _layout_sheet_array(sheet)[
+        start_row - bounds['min_row']:end_row - bounds['min_row'] + 1,
+        base_min_col - bounds['min_col']:base_max_col - bounds['min_col'] + 1
+    ]
+    used = np.flatnonzero((region != '').any(axis=0))
+    if not used.size:
+        return base_min_col, base_max_col
+    return base_min_col + int(used[0]), base_min_col + int(used[-1])
+
+
 def _transform_layout_rows(rows, layout_transform):
     transform = str(layout_transform or 'none').strip().lower()
     if transform == 'flip_ud':
@@ -1153,63 +1373,145 @@ def _transform_layout_rows(rows, layout_transform):
     return rows
 
 
-def _detect_layout_import_defaults(temp_path, options):
-    wb = openpyxl.load_workbook(temp_path, data_only=True)
-    ws = wb.active
-    bounds = _detect_layout_bounds(ws)
-    min_row = bounds['min_row']
-    max_row = bounds['max_row']
-    min_col = bounds['min_col']
-    max_col = bounds['max_col']
-    merged_map = _build_merged_value_map(ws, min_row, max_row, min_col, max_col)
+# 两块座位区域之间至少间隔多少个空行/空列才视为互相独立（单个空列通常是走廊）
+LAYOUT_BLOCK_MIN_GAP = 2
+# 表中没有讲台时，并排各块人数都不少于最多一块的这一比例，才视为几个独立的班
+LAYOUT_BLOCK_SIZE_RATIO = 0.8
 
-    row_podium_count = defaultdict(int)
-    row_name_count = defaultdict(int)
 
-    for r in range(min_row, max_row + 1):
-        for c in range(min_col, max_col + 1):
-            raw_val = merged_map.get((r, c), ws.cell(row=r, column=c).value)
-            text = _normalize_cell_text(raw_val)
-            cell_type, student_name, _ = _classify_layout_cell(text, options)
-            if cell_type == SeatCellType.PODIUM:
-                row_podium_count[r] += 1
-            if student_name:
-                row_name_count[r] += 1
+def _layout_type_masks(sheet, options):
+    """把文本矩阵转换为布尔掩码：非空、讲台、走廊、含姓名。每个不同的文本只分类一次。"""
+    array = _layout_sheet_array(sheet)
+    uniques, inverse = np.unique(array, return_inverse=True)
+    inverse = inverse.reshape(array.shape)
+    classify = _layout_cell_classifier(options)
+    results = [classify(text) for text in uniques.tolist()]
+    return {
+        'filled': array != '',
+        'podium': np.array([r[0] == SeatCellType.PODIUM for r in results], dtype=bool)[inverse],
+        'aisle': np.array([r[0] == SeatCellType.AISLE for r in results], dtype=bool)[inverse],
+        'named': np.array([bool(r[1]) for r in results], dtype=bool)[inverse],
+    }
+
+
+def _mask_runs(profile, min_gap=LAYOUT_BLOCK_MIN_GAP):
+    """一维布尔数组中 True 的连续段 [(起, 止)]（含端点）；间隔不足 min_gap 的段合并为一段。"""
+    idx = np.flatnonzero(profile)
+    if not idx.size:
+        return []
+    breaks = np.flatnonzero(np.diff(idx) - 1 >= min_gap)
+    starts = np.concatenate(([idx[0]], idx[breaks + 1]))
+    ends = np.concatenate((idx[breaks], [idx[-1]]))
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def _detect_seat_blocks(named, bounds):
+    """按姓名分布找出互相独立的座位区域（如同一张表中左右并排的几个班），按人数从多到少排列。"""
+    blocks = []
+    for c0, c1 in _mask_runs(named.any(axis=0)):
+        band = named[:, c0:c1 + 1]
+        for r0, r1 in _mask_runs(band.any(axis=1)):
+            used = np.flatnonzero(band[r0:r1 + 1].any(axis=0))
+            blocks.append({
+                'min_row': bounds['min_row'] + r0,
+                'max_row': bounds['min_row'] + r1,
+                'min_col': bounds['min_col'] + c0 + int(used[0]),
+                'max_col': bounds['min_col'] + c0 + int(used[-1]),
+                'named': int(band[r0:r1 + 1].sum()),
+            })
+    blocks.sort(key=lambda block: (-block['named'], block['min_row'], block['min_col']))
+    return blocks
+
+
+def _separate_column_bands(masks):
+    """并排的几块座位区域明显是不同的班时返回各列区域，否则返回空列表，按整表宽度识别。
 
-    wb.close()
+    每块各有一个只属于自己的讲台，或表中没有讲台且各块人数相近，才视为不同的班；
+    宽走廊把一个班分成左右两半、讲台只有一个时，仍按一个班处理。
+    """
+    bands = _mask_runs(masks['named'].any(axis=0))
+    if len(bands) < 2:
+        return []
+    podium_runs = _mask_runs(masks['podium'].any(axis=0), min_gap=1)
+    if podium_runs:
+        owners = [
+            [i for i, (c0, c1) in enumerate(bands) if p0 <= c1 and c0 <= p1]
+            for p0, p1 in podium_runs
+        ]
+        if any(len(owner) > 1 for owner in owners):
+            return []
+        owned = {owner[0] for owner in owners if owner}
+        return bands if len(owned) == len(bands) else []
+    sizes = [int(masks['named'][:, c0:c1 + 1].sum()) for c0, c1 in bands]
+    if min(sizes) >= max(sizes) * LAYOUT_BLOCK_SIZE_RATIO:
+        return bands
+    return []
+
+
+def _detect_layout_import_defaults(sheet, options):
+    bounds = sheet['bounds']
+    min_row = bounds['min_row']
+    max_row = bounds['max_row']
+    masks = _layout_type_masks(sheet, options)
+    blocks = _detect_seat_blocks(masks['named'], bounds)
+
+    # 确认是多个班左右并排时，只取人数最多的那一列区域，讲台与起止行都在该区域内识别；
+    # 否则保持整表宽度，各区域只通过 blocks 告知选项页
+    start_col = end_col = None
+    col_slice = slice(None)
+    column_bands = _separate_column_bands(masks)
+    if column_bands:
+        c0, c1 = max(column_bands, key=lambda band: masks['named'][:, band[0]:band[1] + 1].sum())
+        col_slice = slice(c0, c1 + 1)
+        start_col = bounds['min_col'] + c0
+        end_col = bounds['min_col'] + c1
+
+    row_podium_count = masks['podium'][:, col_slice].sum(axis=1)
+    row_name_count = masks['named'][:, col_slice].sum(axis=1)
 
     start_row = min_row
     end_row = max_row
     layout_transform = 'none'
 
     podium_row = None
-    if row_podium_count:
-        podium_row = max(
-            row_podium_count.keys(),
-            key=lambda row: (row_podium_count[row], -row)
-        )
+    if row_podium_count.any():
+        # argmax 取第一个最大值，即讲台格子最多的行中最靠上的一行
+        podium_index = int(np.argmax(row_podium_count))
+        podium_row = min_row + podium_index
 
-    if podium_row and row_name_count.get(podium_row, 0) == 0:
-        above_names = sum(row_name_count[r] for r in range(min_row, podium_row))
-        below_names = sum(row_name_count[r] for r in range(podium_row + 1, max_row + 1))
+        if row_name_count[podium_index] == 0:
+            above_names = int(row_name_count[:podium_index].sum())
+            below_names = int(row_name_count[podium_index + 1:].sum())
 
-        if below_names > above_names and below_names > 0:
-            start_row = min(max_row, podium_row + 1)
-        elif above_names > 0:
-            end_row = max(min_row, podium_row - 1)
+            if below_names > above_names and below_names > 0:
+                start_row = min(max_row, podium_row + 1)
+            elif above_names > 0:
+                end_row = max(min_row, podium_row - 1)
 
-        if podium_row != min_row:
-            layout_transform = 'rotate_180'
+            if podium_row != min_row:
+                layout_transform = 'rotate_180'
 
     if start_row > end_row:
         start_row = min_row
         end_row = max_row
 
+    # 选定区域内整列都是空白或走廊的列，视为走廊列
+    region_min_col, region_max_col = _calc_col_bounds_for_rows(sheet, start_row, end_row, start_col, end_col)
+    region = masks['aisle'][
+        start_row - min_row:end_row - min_row + 1,
+        region_min_col - bounds['min_col']:region_max_col - bounds['min_col'] + 1
+    ]
+    aisle_cols = [region_min_col + int(idx) for idx in np.flatnonzero(region.all(axis=0))]
+
     return {
         'start_row': start_row,
         'end_row': end_row,
+        'start_col': start_col,
+        'end_col': end_col,
         'layout_transform': layout_transform,
-        'podium_row': podium_row
+        'podium_row': podium_row,
+        'blocks': blocks,
+        'aisle_cols': aisle_cols
     }
 
 
@@ -1218,49 +1520,103 @@ LAYOUT_AISLE_KEYWORDS = {'走廊', '过道', '通道'}
 LAYOUT_EMPTY_KEYWORDS = {'空位', '留空', '空座', '无人'}
 
 
-def _classify_layout_cell(text, options):
-    manual_name_terms = options.get('manual_name_terms', set())
-    manual_podium_terms = options.get('manual_podium_terms', set())
-    manual_empty_terms = options.get('manual_empty_terms', set())
-    manual_aisle_terms = options.get('manual_aisle_terms', set())
-    auto_detect_names = options.get('auto_detect_names', True)
+# 同一份选项对应的分类器在内存中保留的份数（调整词典后切换回来无需重新分类）
+LAYOUT_CLASSIFIER_CACHE_SIZE = 16
+_layout_classifier_cache = OrderedDict()
+_layout_classifier_lock = threading.Lock()
 
-    if not text:
-        return SeatCellType.AISLE, None, '空白识别为走廊'
 
-    if text in manual_name_terms:
-        return SeatCellType.SEAT, text, '手动姓名'
-    if text in manual_podium_terms or any(k in text for k in LAYOUT_PODIUM_KEYWORDS):
-        return SeatCellType.PODIUM, None, '讲台关键词'
-    if text in manual_empty_terms or any(k in text for k in LAYOUT_EMPTY_KEYWORDS):
-        return SeatCellType.EMPTY, None, '空位关键词'
-    if text in manual_aisle_terms or any(k in text for k in LAYOUT_AISLE_KEYWORDS):
-        return SeatCellType.AISLE, None, '走廊关键词'
+class LayoutCellClassifier:
+    """座位表格子分类器。
 
-    if auto_detect_names and _is_name_like_text(text):
-        return SeatCellType.SEAT, text, '自动姓名'
+    讲台、空位、走廊关键词编译成一个按优先级排列的正则，手动词条按原文查表；
+    同一文本只分类一次，结果为 (格子类型, 学生姓名, 识别依据)。
+    """
 
-    return SeatCellType.SEAT, None, '默认座位'
+    CATEGORIES = (
+        ('podium', SeatCellType.PODIUM, '讲台关键词'),
+        ('empty', SeatCellType.EMPTY, '空位关键词'),
+        ('aisle', SeatCellType.AISLE, '走廊关键词'),
+    )
+
+    def __init__(self, manual_name_terms=(), manual_podium_terms=(), manual_empty_terms=(),
+                 manual_aisle_terms=(), auto_detect_names=True):
+        self.manual_name_terms = frozenset(manual_name_terms)
+        self.auto_detect_names = auto_detect_names
+        self._manual_categories = defaultdict(set)
+        for category, terms in (
+            ('podium', manual_podium_terms),
+            ('empty', manual_empty_terms),
+            ('aisle', manual_aisle_terms),
+        ):
+            for term in terms:
+                self._manual_categories[term].add(category)
+        keywords = {
+            'podium': LAYOUT_PODIUM_KEYWORDS,
+            'empty': LAYOUT_EMPTY_KEYWORDS,
+            'aisle': LAYOUT_AISLE_KEYWORDS,
+        }
+        # 零宽前瞻可以在每个位置各匹配一次，关键词互相重叠时也不会漏掉；
+        # 同一位置按分支顺序取第一个，恰好就是优先级更高的类别
+        self._keyword_pattern = re.compile('(?=(?:{}))'.format('|'.join(
+            '(?P<{}>{})'.format(category, '|'.join(re.escape(k) for k in sorted(keywords[category])))
+            for category, _, _ in self.CATEGORIES
+        )))
+        self._memo = {'': (SeatCellType.AISLE, None, '空白识别为走廊')}
+
+    def __call__(self, text):
+        result = self._memo.get(text)
+        if result is None:
+            result = self._classify(text)
+            self._memo[text] = result
+        return result
+
+    def _classify(self, text):
+        if text in self.manual_name_terms:
+            return SeatCellType.SEAT, text, '手动姓名'
+
+        found = set(self._manual_categories.get(text, ()))
+        found.update(match.lastgroup for match in self._keyword_pattern.finditer(text))
+        for category, cell_type, reason in self.CATEGORIES:
+            if category in found:
+                return cell_type, None, reason
+
+        if self.auto_detect_names and _is_name_like_text(text):
+            return SeatCellType.SEAT, text, '自动姓名'
+
+        return SeatCellType.SEAT, None, '默认座位'
+
+
+def _layout_cell_classifier(options):
+    key = (
+        frozenset(options.get('manual_name_terms', ())),
+        frozenset(options.get('manual_podium_terms', ())),
+        frozenset(options.get('manual_empty_terms', ())),
+        frozenset(options.get('manual_aisle_terms', ())),
+        bool(options.get('auto_detect_names', True)),
+    )
+    with _layout_classifier_lock:
+        classifier = _layout_classifier_cache.get(key)
+        if classifier is None:
+            classifier = LayoutCellClassifier(*key)
+            _layout_classifier_cache[key] = classifier
+        _layout_classifier_cache.move_to_end(key)
+        while len(_layout_classifier_cache) > LAYOUT_CLASSIFIER_CACHE_SIZE:
+            _layout_classifier_cache.popitem(last=False)
+        return classifier
 
 
-def _build_layout_grid_from_excel(temp_path, start_row, end_row, options):
-    wb = openpyxl.load_workbook(temp_path, data_only=True)
-    ws = wb.active
-    bounds = _detect_layout_bounds(ws)
+def _build_layout_grid(sheet, start_row, end_row, options, start_col=None, end_col=None):
+    bounds = sheet['bounds']
 
     start_row = max(bounds['min_row'], int(start_row or bounds['min_row']))
     end_row = min(bounds['max_row'], int(end_row or bounds['max_row']))
     if end_row < start_row:
         end_row = start_row
 
-    min_col, max_col = _calc_col_bounds_for_rows(
-        ws,
-        start_row,
-        end_row,
-        bounds['min_col'],
-        bounds['max_col']
-    )
-    merged_map = _build_merged_value_map(ws, start_row, end_row, min_col, max_col)
+    min_col, max_col = _calc_col_bounds_for_rows(sheet, start_row, end_row, start_col, end_col)
+    col_offset = bounds['min_col']
+    classify = _layout_cell_classifier(options)
 
     rows = []
     stats = {
@@ -1271,12 +1627,11 @@ def _build_layout_grid_from_excel(temp_path, start_row, end_row, options):
         'named': 0
     }
 
-    for r in range(start_row, end_row + 1):
+    for r, sheet_row in _iter_layout_sheet_rows(sheet, start_row, end_row):
         row_items = []
         for c in range(min_col, max_col + 1):
-            raw_val = merged_map.get((r, c), ws.cell(row=r, column=c).value)
-            text = _normalize_cell_text(raw_val)
-            cell_type, student_name, reason = _classify_layout_cell(text, options)
+            text = sheet_row[c - col_offset]
+            cell_type, student_name, reason = classify(text)
             row_items.append({
                 'sheet_row': r,
                 'sheet_col': c,
@@ -1292,7 +1647,6 @@ def _build_layout_grid_from_excel(temp_path, start_row, end_row, options):
 
     rows = _transform_layout_rows(rows, options.get('layout_transform', 'none'))
 
-    wb.close()
     return {
         'start_row': start_row,
         'end_row': end_row,
@@ -1334,13 +1688,15 @@ def _preview_rows_payload(grid_rows):
     return [render_row(i, row) for i, row in front], [render_row(i, row) for i, row in back]
 
 
-def _build_layout_preview_response(temp_path, start_row, end_row, options):
-    grid_data = _build_layout_grid_from_excel(temp_path, start_row, end_row, options)
+def _build_layout_preview_response(sheet, start_row, end_row, options, start_col=None, end_col=None):
+    grid_data = _build_layout_grid(sheet, start_row, end_row, options, start_col, end_col)
     front_rows, back_rows = _preview_rows_payload(grid_data['rows'])
     return {
         'layout_transform': options.get('layout_transform', 'none'),
         'start_row': grid_data['start_row'],
         'end_row': grid_data['end_row'],
+        'min_col': grid_data['min_col'],
+        'max_col': grid_data['max_col'],
         'bounds': grid_data['bounds'],
         'grid_rows': len(grid_data['rows']),
         'grid_cols': (grid_data['max_col'] - grid_data['min_col'] + 1),
@@ -1350,8 +1706,8 @@ def _build_layout_preview_response(temp_path, start_row, end_row, options):
     }
 
 
-def _apply_layout_excel_import(classroom, temp_path, start_row, end_row, options):
-    grid_data = _build_layout_grid_from_excel(temp_path, start_row, end_row, options)
+def _apply_layout_excel_import(classroom, sheet, start_row, end_row, options, start_col=None, end_col=None):
+    grid_data = _build_layout_grid(sheet, start_row, end_row, options, start_col, end_col)
     rows = grid_data['rows']
     row_count = len(rows)
     col_count = len(rows[0]) if rows else 0
@@ -1359,6 +1715,7 @@ def _apply_layout_excel_import(classroom, temp_path, start_row, end_row, options
         return 0, 0
 
     replace_students = options.get('replace_students', False)
+    report_progress(0.3, '座位表解析完成，正在写入座位')
 
     with transaction.atomic():
         _sync_seats(classroom, row_count, col_count)
@@ -1367,23 +1724,18 @@ def _apply_layout_excel_import(classroom, temp_path, start_row, end_row, options
             SeatConstraint.objects.filter(classroom=classroom).delete()
             Student.objects.filter(classroom=classroom).delete()
 
-        seats = list(classroom.seats.select_related('student').all())
-        seat_map = _build_seat_map(seats)
-
-        # Clear seat occupancy first to avoid one-to-one conflicts when students move to new seats.
-        for seat in seats:
-            seat.student = None
-            seat.group = None
-            seat.save(update_fields=['student', 'group'])
+        seat_map = _build_seat_map(classroom.seats.all())
 
         existing_by_name = defaultdict(list)
         if not replace_students:
             for student in classroom.students.all().order_by('pk'):
                 existing_by_name[student.name].append(student)
-        consumed_student_ids = set()
-
-        imported_student_count = 0
+        # 同名学生按顺序各占一个座位，用完后再出现的同名格子新建学生
+        available_by_name = {name: iter(students) for name, students in existing_by_name.items()}
 
+        # 先在内存中算出每个座位的最终状态与需要新建的学生，再批量写库
+        placements = []
+        new_students = []
         for local_r, row in enumerate(rows, start=1):
             for local_c, item in enumerate(row, start=1):
                 seat = seat_map.get((local_r, local_c))
@@ -1392,30 +1744,37 @@ def _apply_layout_excel_import(classroom, temp_path, start_row, end_row, options
                 target_student = None
                 student_name = item.get('student_name')
                 if item['cell_type'] == SeatCellType.SEAT and student_name:
-                    candidates = existing_by_name.get(student_name, [])
-                    for cand in candidates:
-                        if cand.pk not in consumed_student_ids:
-                            target_student = cand
-                            break
-                    if not target_student:
-                        target_student = Student.objects.create(
+                    target_student = next(available_by_name.get(student_name, iter(())), None)
+                    if target_student is None:
+                        target_student = Student(
                             classroom=classroom,
                             name=student_name,
                             student_id='',
                             score=0
                         )
-                        existing_by_name[student_name].append(target_student)
-                        imported_student_count += 1
-                    consumed_student_ids.add(target_student.pk)
-
-                seat.student = target_student
-                seat.group = None
+                        new_students.append(target_student)
                 seat.cell_type = item['cell_type']
-                seat.save(update_fields=['student', 'group', 'cell_type'])
+                placements.append((seat, target_student))
+
+        Student.objects.bulk_create(new_students, batch_size=IMPORT_BULK_BATCH_SIZE)
+        imported_student_count = len(new_students)
+
+        for seat, target_student in placements:
+            seat.student = target_student
+            seat.group = None
+
+        # 先整体清空入座学生，避免一对一约束在批量更新过程中因学生换座而冲突
+        classroom.seats.update(student=None, group=None)
+        Seat.objects.bulk_update(
+            [seat for seat, _ in placements],
+            ['student', 'group', 'cell_type'],
+            batch_size=IMPORT_BULK_BATCH_SIZE
+        )
 
     return row_count * col_count, imported_student_count
 
 
+@background_capable('import_layout_excel')
 def import_layout_excel(request, pk):
     classroom = get_object_or_404(Classroom, pk=pk)
     if request.method != 'POST':
@@ -1436,17 +1795,23 @@ def import_layout_excel(request, pk):
         excel_file = request.FILES.get('layout_excel_file')
         if not excel_file:
             return JsonResponse({'status': 'error', 'message': '请先选择 Excel 座位表文件'}, status=400)
-        suffix = os.path.splitext(excel_file.name)[1].lower() or '.xlsx'
-        file_id, temp_path = _save_uploaded_temp_file(excel_file, suffix)
         try:
-            defaults = _detect_layout_import_defaults(temp_path, options)
+            sheet = _parse_layout_sheet(excel_file)
+        except Exception as e:
+            return JsonResponse({'status': 'error', 'message': f'解析失败：{e}'}, status=400)
+        # 缓存解析结果，后续调整范围预览与确认导入都不再读取原文件
+        file_id = _store_layout_sheet(sheet)
+        try:
+            defaults = _detect_layout_import_defaults(sheet, options)
             preview_options = dict(options)
             preview_options['layout_transform'] = defaults['layout_transform']
             preview = _build_layout_preview_response(
-                temp_path,
+                sheet,
                 defaults['start_row'],
                 defaults['end_row'],
-                preview_options
+                preview_options,
+                defaults['start_col'],
+                defaults['end_col']
             )
             return JsonResponse({
                 'status': 'ready',
@@ -1456,33 +1821,34 @@ def import_layout_excel(request, pk):
                     'podium_row': defaults['podium_row'],
                     'start_row': defaults['start_row'],
                     'end_row': defaults['end_row'],
+                    'start_col': defaults['start_col'],
+                    'end_col': defaults['end_col'],
                     'layout_transform': defaults['layout_transform'],
+                    'blocks': defaults['blocks'],
+                    'aisle_cols': defaults['aisle_cols'],
                 },
                 **preview
             })
         except Exception as e:
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
+            _discard_import_artifact(file_id)
             return JsonResponse({'status': 'error', 'message': f'解析失败：{e}'}, status=400)
 
     file_id = request.POST.get('file_id', '').strip()
     if not file_id:
         return JsonResponse({'status': 'error', 'message': '缺少文件标识，请重新上传'}, status=400)
-    temp_path = None
-    for ext in ('.xlsx', '.xlsm', '.xls', ''):
-        candidate = os.path.join(_ensure_temp_import_dir(), f'{file_id}{ext}')
-        if os.path.exists(candidate):
-            temp_path = candidate
-            break
-    if not temp_path:
+    sheet = _load_layout_sheet(file_id)
+    if sheet is None:
         return JsonResponse({'status': 'error', 'message': '临时文件已过期，请重新上传'}, status=400)
 
     start_row = request.POST.get('start_row')
     end_row = request.POST.get('end_row')
+    # 起止列只在同一张表中有多个座位区域时由前端回传，否则按所选行自动确定
+    start_col = request.POST.get('start_col') or None
+    end_col = request.POST.get('end_col') or None
 
     if action == 'preview':
         try:
-            preview = _build_layout_preview_response(temp_path, start_row, end_row, options)
+            preview = _build_layout_preview_response(sheet, start_row, end_row, options, start_col, end_col)
             return JsonResponse({
                 'status': 'ready',
                 'file_id': file_id,
@@ -1496,14 +1862,15 @@ def import_layout_excel(request, pk):
         try:
             imported_cells, created_students = _apply_layout_excel_import(
                 classroom,
-                temp_path,
+                sheet,
                 start_row,
                 end_row,
-                options
+                options,
+                start_col,
+                end_col
             )
             _reset_history(request, pk)
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
+            _discard_import_artifact(file_id)
             return JsonResponse({
                 'status': 'success',
                 'message': f'导入完成：共处理 {imported_cells} 个网格，新建学生 {created_students} 人'
@@ -1521,6 +1888,7 @@ def import_layout_excel_options_page(request, pk):
     })
 
 
+@background_capable('import_students')
 def import_students(request, pk):
     classroom = get_object_or_404(Classroom, pk=pk)
     
@@ -1534,118 +1902,98 @@ def import_students(request, pk):
             import_mode = _resolve_student_import_mode(request.POST.get('import_mode'), clear_existing)
             
             try:
-                # 先读取一次尝试自动识别
-                df = pd.read_excel(excel_file)
-                columns = list(df.columns)
-
-                def find_column(keys):
-                    for key in keys:
-                        for col in columns:
-                            if key in str(col):
-                                return col
-                    return None
-
-                def find_exact_column(candidates):
-                    normalized_candidates = {str(item).strip().lower() for item in candidates}
-                    for col in columns:
-                        normalized_col = str(col).strip().lower()
-                        if normalized_col in normalized_candidates:
-                            return col
-                    return None
-
-                name_col = find_column(['姓名', '名字', '学生姓名', '学生'])
-                score_col = find_exact_column(['总分', '学生总分'])
-                
-                # 如果自动识别成功，直接导入
-                if name_col and score_col:
-                    student_id_col = find_column(['学号', '学生号', '编号', 'ID'])
-                    gender_col = find_column(['性别', '男女性别'])
-
-                    result = _process_import(
-                        classroom,
-                        df,
-                        name_col,
-                        student_id_col,
-                        gender_col,
-                        score_col,
-                        import_mode
-                    )
-                    return JsonResponse({'status': 'success', 'message': _format_import_result_message(result)})
-                
-                # 自动识别失败，保存临时文件并返回预览数据
-                import os
-                import uuid
-                from django.conf import settings
-                
-                file_id = str(uuid.uuid4())
-                temp_dir = os.path.join(settings.BASE_DIR, 'temp_imports')
-                os.makedirs(temp_dir, exist_ok=True)
-                temp_path = os.path.join(temp_dir, f'{file_id}.xlsx')
-                
-                # 重新定位指针或直接保存上传的文件
-                with open(temp_path, 'wb+') as destination:
-                    for chunk in excel_file.chunks():
-                        destination.write(chunk)
-                
-                # 读取前20行（无标题模式）返回给前端预览
-                df_preview = pd.read_excel(temp_path, header=None)
-                preview_data = df_preview.head(20).fillna('').values.tolist()
-                
+                # 流式读取前若干行，尝试自动识别表头
+                kind = _roster_file_kind(excel_file)
+                rows = _iter_roster_rows(excel_file, kind)
+                head_rows = list(itertools.islice(rows, ROSTER_PREVIEW_ROWS))
+                header_index, columns = _detect_roster_header(head_rows)
+
+                # 如果自动识别成功，直接导入（剩余行继续按需读取）
+                if header_index is not None:
+                    try:
+                        result = _process_import(
+                            classroom,
+                            itertools.chain(head_rows[header_index + 1:], rows),
+                            columns['name'],
+                            columns['student_id'],
+                            columns['gender'],
+                            columns['score'],
+                            import_mode
+                        )
+                    finally:
+                        rows.close()
+                    return JsonResponse({
+                        'status': 'success',
+                        'message': _format_import_result_message(result),
+                        'rejections': result['rejections'],
+                        'fuzzy_review': result['fuzzy_review'],
+                    })
+
+                # 自动识别失败，把整张表按列缓存一次，预览与确认导入都复用该缓存
+                file_id = _store_roster_artifact(itertools.chain(head_rows, rows))
+
                 return JsonResponse({
                     'status': 'ambiguous',
                     'file_id': file_id,
-                    'preview_data': preview_data,
+                    'preview_data': _roster_preview_rows(head_rows),
                     'message': '仅当列名精确为“总分”或“学生总分”时才会自动导入，请手动匹配列'
                 })
 
             except Exception as e:
                 return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
 
-        # 处理确认映射
-        elif action == 'confirm':
+        # 处理确认映射；preview_matches 只预演匹配结果（不写库），用于在预览中列出低置信度的疑似同一学生
+        elif action in {'confirm', 'preview_matches'}:
             file_id = request.POST.get('file_id')
             start_row = int(request.POST.get('start_row', 0)) # 0-indexed
             name_col_idx = int(request.POST.get('name_col_index'))
             score_col_idx = request.POST.get('score_col_index')
             clear_existing = request.POST.get('clear_existing') == 'true'
             import_mode = _resolve_student_import_mode(request.POST.get('import_mode'), clear_existing)
-            
-            import os
-            from django.conf import settings
-            temp_path = os.path.join(settings.BASE_DIR, 'temp_imports', f'{file_id}.xlsx')
-            
-            if not os.path.exists(temp_path):
+            accept_fuzzy = _parse_bool(request.POST.get('accept_fuzzy'))
+            dry_run = action == 'preview_matches'
+
+            artifact = _load_roster_artifact(file_id)
+            if artifact is None:
                 return JsonResponse({'status': 'error', 'message': '临时文件已过期，请重新上传'}, status=400)
-                
+
             try:
-                # 读取原始文件（无header）
-                df = pd.read_excel(temp_path, header=None)
-                
-                # 切片获取数据区域
                 # start_row 是用户选择的标题行，数据从下一行开始
-                df_data = df.iloc[start_row + 1:].copy()
-                
-                # 获取列名（用于_process_import，虽然我们这里用索引）
-                # 为了复用逻辑，我们重构 DataFrame
-                df_data.columns = [i for i in range(df_data.shape[1])]
-                
                 name_col = name_col_idx
                 score_col = int(score_col_idx) if score_col_idx and score_col_idx != '' else None
-                
+
                 result = _process_import(
                     classroom,
-                    df_data,
+                    _roster_artifact_rows(artifact, start_row + 1),
                     name_col,
                     None,
                     None,
                     score_col,
-                    import_mode
+                    import_mode,
+                    accept_fuzzy=accept_fuzzy,
+                    dry_run=dry_run
                 )
-                
-                # 清理文件
-                os.remove(temp_path)
-                
-                return JsonResponse({'status': 'success', 'message': _format_import_result_message(result)})
+
+                if dry_run:
+                    return JsonResponse({
+                        'status': 'success',
+                        'created': result['created'],
+                        'updated': result['updated'],
+                        'fuzzy_matches': result['fuzzy_matches'],
+                        'fuzzy_review': result['fuzzy_review'],
+                        'rejections': result['rejections'],
+                    })
+
+                # 清理缓存；未导入任何学生时保留，便于重新匹配列后再次提交
+                if result['created'] or result['updated']:
+                    _discard_roster_artifact(file_id)
+
+                return JsonResponse({
+                    'status': 'success',
+                    'message': _format_import_result_message(result),
+                    'rejections': result['rejections'],
+                    'fuzzy_review': result['fuzzy_review'],
+                })
             except Exception as e:
                 return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
 
@@ -1674,69 +2022,356 @@ def _resolve_student_import_mode(raw_mode, clear_existing=False):
 def _normalize_import_text(value):
     if value is None or pd.isna(value):
         return ''
-    return str(value).strip()
+    return re.sub(r'\s+', ' ', str(value).strip())
 
 
-def _parse_import_gender(value):
-    text = _normalize_import_text(value).lower()
-    if text in {'男', 'm', 'male'}:
-        return 'M'
-    if text in {'女', 'f', 'female'}:
-        return 'F'
-    return None
+IMPORT_BULK_BATCH_SIZE = 500
+ROSTER_HEADER_SCAN_ROWS = 5
+ROSTER_PREVIEW_ROWS = 20
+ROSTER_NAME_KEYS = ['姓名', '名字', '学生姓名', '学生']
+ROSTER_SCORE_HEADERS = ['总分', '学生总分']
+ROSTER_STUDENT_ID_KEYS = ['学号', '学生号', '编号', 'ID']
+ROSTER_GENDER_KEYS = ['性别', '男女性别']
 
 
-def _parse_import_score(value):
-    if value is None or pd.isna(value):
-        return 0
-    numeric_value = pd.to_numeric(value, errors='coerce')
-    if pd.isna(numeric_value):
-        return 0
-    return float(numeric_value)
+ROSTER_TEXT_EXTENSIONS = {'.csv', '.tsv', '.txt'}
+ROSTER_CSV_SAMPLE_SIZE = 64 * 1024
+ROSTER_CSV_DELIMITERS = ',\t;|'
 
 
-def _format_import_result_message(result):
-    if result['mode'] == IMPORT_MODE_REPLACE:
-        return f"成功导入 {result['created']} 名学生"
+def _roster_file_kind(source):
+    name = source if isinstance(source, str) else getattr(source, 'name', '') or ''
+    if hasattr(source, 'read'):
+        position = source.tell()
+        head = source.read(8)
+        source.seek(position)
+    else:
+        with open(source, 'rb') as fh:
+            head = fh.read(8)
+    kind = roster_sheets.workbook_kind(head)
+    if kind:
+        return kind
+    if os.path.splitext(name)[1].lower() in ROSTER_TEXT_EXTENSIONS:
+        return 'csv'
+    return 'xlsx'
+
+
+def _detect_csv_encoding(sample):
+    if sample.startswith(b'\xef\xbb\xbf'):
+        return 'utf-8-sig'
+    if sample.startswith((b'\xff\xfe', b'\xfe\xff')):
+        return 'utf-16'
+    try:
+        # 采样可能截断在多字节字符中间，用增量解码器忽略结尾的不完整字符
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        # 国内教务/阅卷系统导出的 CSV 多为 GBK，GB18030 是其超集
+        return 'gb18030'
 
-    parts = [f"匹配更新 {result['updated']} 人"]
-    if result['created'] > 0:
-        parts.append(f"新增 {result['created']} 人")
-    if result['skipped'] > 0:
-        parts.append(f"未匹配 {result['skipped']} 人")
-    return "匹配导入完成：" + "，".join(parts)
 
+def _detect_csv_dialect(text_sample, name):
+    try:
+        return csv.Sniffer().sniff(text_sample, delimiters=ROSTER_CSV_DELIMITERS)
+    except csv.Error:
+        return csv.excel_tab if name.lower().endswith('.tsv') else csv.excel
 
-def _process_import(classroom, df, name_col, student_id_col, gender_col, score_col, import_mode=IMPORT_MODE_MATCH):
-    import_mode = _resolve_student_import_mode(import_mode)
-    created_count = 0
-    updated_count = 0
-    skipped_count = 0
-    has_score_column = score_col is not None
 
-    with transaction.atomic():
-        if import_mode == IMPORT_MODE_REPLACE:
-            classroom.students.all().delete()
+def _iter_csv_roster_rows(source):
+    name = source if isinstance(source, str) else getattr(source, 'name', '') or ''
+    if hasattr(source, 'read'):
+        raw = getattr(source, 'file', source)
+        raw.seek(0)
+        owns_raw = False
+    else:
+        raw = open(source, 'rb')
+        owns_raw = True
+    try:
+        sample = raw.read(ROSTER_CSV_SAMPLE_SIZE)
+        raw.seek(0)
+        encoding = _detect_csv_encoding(sample)
+        text_sample = sample.decode(encoding, errors='ignore')
+        dialect = _detect_csv_dialect(text_sample, name)
+        text = io.TextIOWrapper(raw, encoding=encoding, errors='replace', newline='')
+        try:
+            for row in csv.reader(text, dialect):
+                yield tuple(roster_sheets.normalize_cell(value.strip()) for value in row)
+        finally:
+            text.detach()
+    finally:
+        if owns_raw:
+            raw.close()
+
+
+def _iter_roster_rows(source, kind=None):
+    """以只读流式方式逐行读取名单（Excel 第一个工作表或 CSV/TSV），产出每行的值元组。"""
+    kind = kind or _roster_file_kind(source)
+    if kind == 'csv':
+        return _iter_csv_roster_rows(source)
+    return roster_sheets.iter_sheet_rows(source, kind)
+
+
+def _find_roster_column(header, keys):
+    for key in keys:
+        for idx, text in enumerate(header):
+            if key in text:
+                return idx
+    return None
 
-        existing_students = list(classroom.students.all())
-        should_match_existing = import_mode == IMPORT_MODE_MATCH and len(existing_students) > 0
 
-        existing_by_id = {}
-        existing_names = defaultdict(list)
-        if should_match_existing:
-            for student in existing_students:
-                sid = _normalize_import_text(student.student_id).lower()
-                if sid and sid not in existing_by_id:
-                    existing_by_id[sid] = student
-                normalized_name = _normalize_import_text(student.name).lower()
-                if normalized_name:
-                    existing_names[normalized_name].append(student)
+def _find_roster_exact_column(header, candidates):
+    normalized_candidates = {str(item).strip().lower() for item in candidates}
+    for idx, text in enumerate(header):
+        if text.strip().lower() in normalized_candidates:
+            return idx
+    return None
 
-        unique_name_map = {
-            name_key: students[0]
-            for name_key, students in existing_names.items()
-            if len(students) == 1
-        }
+
+def _detect_roster_header(head_rows):
+    for idx, row in enumerate(head_rows[:ROSTER_HEADER_SCAN_ROWS]):
+        header = ['' if value is None else str(value) for value in row]
+        name_col = _find_roster_column(header, ROSTER_NAME_KEYS)
+        score_col = _find_roster_exact_column(header, ROSTER_SCORE_HEADERS)
+        if name_col is not None and score_col is not None:
+            return idx, {
+                'name': name_col,
+                'score': score_col,
+                'student_id': _find_roster_column(header, ROSTER_STUDENT_ID_KEYS),
+                'gender': _find_roster_column(header, ROSTER_GENDER_KEYS),
+            }
+    return None, None
+
+
+ROSTER_ARTIFACT_SUFFIX = '.roster.pkl'
+# 最近使用的导入解析结果（名单、座位表）在内存中保留的份数
+IMPORT_ARTIFACT_MEMO_SIZE = 8
+_import_artifact_memo = OrderedDict()
+_import_artifact_lock = threading.Lock()
+
+
+def _remember_import_artifact(file_id, artifact):
+    with _import_artifact_lock:
+        _import_artifact_memo[file_id] = artifact
+        _import_artifact_memo.move_to_end(file_id)
+        while len(_import_artifact_memo) > IMPORT_ARTIFACT_MEMO_SIZE:
+            _import_artifact_memo.popitem(last=False)
+
+
+def _save_import_artifact(artifact, suffix):
+    file_id = temp_store.save_bytes(pickle.dumps(artifact, protocol=pickle.HIGHEST_PROTOCOL), suffix)
+    _remember_import_artifact(file_id, artifact)
+    return file_id
+
+
+def _load_import_artifact(file_id, suffix):
+    # 以临时存储为准：文件过期或被淘汰后，内存中的解析结果也随之失效。
+    # 只反序列化本模块按对应后缀保存的解析结果；原始上传、导出文件等其他条目一律视为不存在
+    if temp_store.suffix_of(file_id) != suffix:
+        with _import_artifact_lock:
+            _import_artifact_memo.pop(file_id, None)
+        return None
+    with _import_artifact_lock:
+        artifact = _import_artifact_memo.get(file_id)
+        if artifact is not None:
+            _import_artifact_memo.move_to_end(file_id)
+            return artifact
+    data = temp_store.read_bytes(file_id)
+    if data is None:
+        return None
+    artifact = pickle.loads(data)
+    _remember_import_artifact(file_id, artifact)
+    return artifact
+
+
+def _discard_import_artifact(file_id):
+    with _import_artifact_lock:
+        _import_artifact_memo.pop(file_id, None)
+    temp_store.discard(file_id)
+
+
+def _store_roster_artifact(rows):
+    """把解析好的名单按列存入临时存储，返回 file_id；后续预览、确认与重新匹配都不再解析原文件。"""
+    rows = list(rows)
+    width = max((len(row) for row in rows), default=0)
+    artifact = {
+        'row_count': len(rows),
+        'columns': [
+            [row[col] if col < len(row) else None for row in rows]
+            for col in range(width)
+        ],
+    }
+    return _save_import_artifact(artifact, ROSTER_ARTIFACT_SUFFIX)
+
+
+def _load_roster_artifact(file_id):
+    return _load_import_artifact(file_id, ROSTER_ARTIFACT_SUFFIX)
+
+
+def _discard_roster_artifact(file_id):
+    _discard_import_artifact(file_id)
+
+
+def _store_layout_sheet(sheet):
+    return _save_import_artifact(sheet, LAYOUT_SHEET_SUFFIX)
+
+
+def _load_layout_sheet(file_id):
+    return _load_import_artifact(file_id, LAYOUT_SHEET_SUFFIX)
+
+
+def _roster_artifact_rows(artifact, start=0):
+    columns = artifact['columns']
+    if not columns:
+        return iter(())
+    return itertools.islice(zip(*columns), start, None)
+
+
+def _roster_preview_rows(head_rows):
+    width = max((len(row) for row in head_rows), default=0)
+    return [
+        ['' if value is None else value for value in row] + [''] * (width - len(row))
+        for row in head_rows
+    ]
+
+
+def _roster_cell(row, col):
+    if col is None or col >= len(row):
+        return None
+    return row[col]
+
+
+def _iter_import_records(rows, name_col, student_id_col, gender_col, score_col):
+    if isinstance(rows, pd.DataFrame):
+        for _, row in rows.iterrows():
+            yield (
+                row[name_col],
+                row.get(student_id_col) if student_id_col is not None else None,
+                row.get(gender_col) if gender_col is not None else None,
+                row.get(score_col) if score_col is not None else None,
+            )
+        return
+    for row in rows:
+        yield (
+            _roster_cell(row, name_col),
+            _roster_cell(row, student_id_col),
+            _roster_cell(row, gender_col),
+            _roster_cell(row, score_col),
+        )
+
+
+IMPORT_GENDER_LOOKUP = {
+    '男': 'M', 'm': 'M', 'male': 'M',
+    '女': 'F', 'f': 'F', 'female': 'F',
+}
+IMPORT_HEADER_NAME_KEYS = {'姓名', 'name'}
+IMPORT_REJECTION_REPORT_LIMIT = 50
+
+
+def _coerce_import_score(value):
+    if value is None:
+        return 0.0
+    try:
+        score = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if math.isnan(score) else score
+
+
+def _normalize_import_records(records, has_score_column):
+    """逐行规范化导入数据，返回可直接写库的行与被拒绝行（数据行序号从 1 开始）及原因。"""
+    normalized_rows = []
+    rejections = []
+    for position, (name, student_id, gender, score) in enumerate(records, start=1):
+        name_text = _normalize_import_text(name)
+        if not name_text:
+            blank = not (
+                _normalize_import_text(student_id)
+                or _normalize_import_text(gender)
+                or _normalize_import_text(score)
+            )
+            if not blank:
+                rejections.append({'row': position, 'reason': '缺少姓名'})
+            continue
+        name_key = name_text.lower()
+        if name_key in IMPORT_HEADER_NAME_KEYS:
+            rejections.append({'row': position, 'reason': '疑似标题行'})
+            continue
+        normalized_rows.append((
+            position,
+            name_text,
+            name_key,
+            _normalize_import_text(student_id),
+            IMPORT_GENDER_LOOKUP.get(_normalize_import_text(gender).lower()),
+            _coerce_import_score(score) if has_score_column else 0,
+        ))
+    return normalized_rows, rejections
+
+
+def _format_import_result_message(result):
+    rejected = result.get('rejected', 0)
+    if result['mode'] == IMPORT_MODE_REPLACE:
+        message = f"成功导入 {result['created']} 名学生"
+        if rejected > 0:
+            message += f"，忽略无效数据 {rejected} 行"
+        return message
+
+    parts = [f"匹配更新 {result['updated']} 人"]
+    if result.get('fuzzy_matched', 0) > 0:
+        parts.append(f"其中按相近姓名匹配 {result['fuzzy_matched']} 人")
+    if result['created'] > 0:
+        parts.append(f"新增 {result['created']} 人")
+    if result.get('fuzzy_review'):
+        parts.append(f"{len(result['fuzzy_review'])} 人与现有学生姓名相近，已按新学生导入，请核对")
+    if result['skipped'] > 0:
+        parts.append(f"未匹配 {result['skipped']} 人")
+    if rejected > 0:
+        parts.append(f"忽略无效数据 {rejected} 行")
+    return "匹配导入完成：" + "，".join(parts)
+
+
+def _fuzzy_match_entry(row, name, match):
+    return {
+        'row': row,
+        'name': name,
+        'matched_name': match.name,
+        'matched_student_id': match.payload.pk,
+        'confidence': round(match.confidence, 2),
+    }
+
+
+def _process_import(classroom, rows, name_col, student_id_col, gender_col, score_col, import_mode=IMPORT_MODE_MATCH,
+                    accept_fuzzy=False, dry_run=False):
+    import_mode = _resolve_student_import_mode(import_mode)
+    created_count = 0
+    updated_count = 0
+    skipped_count = 0
+    has_score_column = score_col is not None
+    fuzzy_matches = []
+    fuzzy_review = []
+
+    with transaction.atomic():
+        if import_mode == IMPORT_MODE_REPLACE and not dry_run:
+            classroom.students.all().delete()
+
+        existing_students = list(classroom.students.all()) if import_mode == IMPORT_MODE_MATCH else []
+        should_match_existing = import_mode == IMPORT_MODE_MATCH and len(existing_students) > 0
+
+        existing_by_id = {}
+        existing_names = defaultdict(list)
+        if should_match_existing:
+            for student in existing_students:
+                sid = _normalize_import_text(student.student_id).lower()
+                if sid and sid not in existing_by_id:
+                    existing_by_id[sid] = student
+                normalized_name = _normalize_import_text(student.name).lower()
+                if normalized_name:
+                    existing_names[normalized_name].append(student)
+
+        unique_name_map = {
+            name_key: students[0]
+            for name_key, students in existing_names.items()
+            if len(students) == 1
+        }
 
         def index_student(student):
             sid = _normalize_import_text(student.student_id).lower()
@@ -1752,75 +2387,231 @@ def _process_import(classroom, df, name_col, student_id_col, gender_col, score_c
             else:
                 unique_name_map.pop(name_key, None)
 
-        for _, row in df.iterrows():
-            name = _normalize_import_text(row[name_col])
-            if not name:
-                continue
+        def find_exact(student_id, name_key):
+            matched_student = None
+            if student_id:
+                matched_student = existing_by_id.get(student_id.lower())
+            if not matched_student:
+                matched_student = unique_name_map.get(name_key)
+            return matched_student
+
+        normalized_rows, rejections = _normalize_import_records(
+            _iter_import_records(rows, name_col, student_id_col, gender_col, score_col),
+            has_score_column
+        )
 
-            # 处理可能的标题行混入（如果手动选择时不准确）
-            if name.lower() in {'姓名', 'name'}:
-                continue
+        report_progress(0.3, f'已读取 {len(normalized_rows)} 行，正在匹配学生')
+
+        # 先在内存中确定新增与更新集合，再分批写入
+        pending_creates = []
+        pending_updates = {}
+        update_field_names = set()
+
+        def apply_row(matched_student, name, student_id, gender, score_value):
+            update_fields = []
+            if matched_student.name != name:
+                matched_student.name = name
+                update_fields.append('name')
+            if student_id and _normalize_import_text(matched_student.student_id) != student_id:
+                matched_student.student_id = student_id
+                update_fields.append('student_id')
+                existing_by_id[student_id.lower()] = matched_student
+            if gender is not None and matched_student.gender != gender:
+                matched_student.gender = gender
+                update_fields.append('gender')
+            if has_score_column and matched_student.score != score_value:
+                matched_student.score = score_value
+                update_fields.append('score')
+
+            # 本次新建的学生尚未写库，字段修改会随 bulk_create 一并写入
+            if update_fields and matched_student.pk is not None:
+                pending_updates[matched_student.pk] = matched_student
+                update_field_names.update(update_fields)
+
+        def create_row(name, student_id, gender, score_value):
+            created_student = Student(
+                classroom=classroom,
+                name=name,
+                student_id=student_id,
+                gender=gender,
+                score=score_value
+            )
+            pending_creates.append(created_student)
+            return created_student
 
-            student_id = _normalize_import_text(row.get(student_id_col, '')) if student_id_col is not None else ''
-            gender = _parse_import_gender(row.get(gender_col, '')) if gender_col is not None else None
-            score_value = _parse_import_score(row.get(score_col, 0)) if has_score_column else 0
+        if should_match_existing:
+            # 第一轮：学号或唯一姓名精确匹配，先占用对应学生，避免被其他行模糊匹配抢走
+            unmatched_rows = []
+            claimed = set()
+            for row in normalized_rows:
+                _, name, name_key, student_id, gender, score_value = row
+                matched_student = find_exact(student_id, name_key)
+                if not matched_student:
+                    unmatched_rows.append(row)
+                    continue
+                claimed.add(matched_student)
+                apply_row(matched_student, name, student_id, gender, score_value)
+                updated_count += 1
 
-            if should_match_existing:
-                matched_student = None
-                if student_id:
-                    matched_student = existing_by_id.get(student_id.lower())
+            # 第二轮：对剩余行做模糊匹配（繁简/全角差异、错别字、同音字），仍无结果则新增
+            name_index = NameIndex(
+                (student.name, student) for student in existing_students if student not in claimed
+            ) if unmatched_rows else None
+            for row_number, name, name_key, student_id, gender, score_value in unmatched_rows:
+                matched_student = find_exact(student_id, name_key)
                 if not matched_student:
-                    matched_student = unique_name_map.get(name.lower())
+                    match = name_index.match(name, exclude=claimed)
+                    if match is not None and (match.is_confident or accept_fuzzy):
+                        matched_student = match.payload
+                        fuzzy_matches.append(_fuzzy_match_entry(row_number, name, match))
+                    elif match is not None:
+                        fuzzy_review.append(_fuzzy_match_entry(row_number, name, match))
 
                 if not matched_student:
-                    created_student = Student.objects.create(
-                        classroom=classroom,
-                        name=name,
-                        student_id=student_id,
-                        gender=gender,
-                        score=score_value
-                    )
-                    index_student(created_student)
+                    index_student(create_row(name, student_id, gender, score_value))
                     created_count += 1
                     continue
-
-                update_fields = []
-                if matched_student.name != name:
-                    matched_student.name = name
-                    update_fields.append('name')
-                if student_id and _normalize_import_text(matched_student.student_id) != student_id:
-                    matched_student.student_id = student_id
-                    update_fields.append('student_id')
-                    existing_by_id[student_id.lower()] = matched_student
-                if gender is not None and matched_student.gender != gender:
-                    matched_student.gender = gender
-                    update_fields.append('gender')
-                if has_score_column and matched_student.score != score_value:
-                    matched_student.score = score_value
-                    update_fields.append('score')
-
-                if update_fields:
-                    matched_student.save(update_fields=update_fields)
+                # 同名新生的后续行会匹配到本次待新建的学生，它不在模糊索引中，无需占用
+                if matched_student.pk is not None:
+                    claimed.add(matched_student)
+                apply_row(matched_student, name, student_id, gender, score_value)
                 updated_count += 1
-                continue
-
-            Student.objects.create(
-                classroom=classroom,
-                name=name,
-                student_id=student_id,
-                gender=gender,
-                score=score_value
-            )
-            created_count += 1
+        else:
+            for _, name, _, student_id, gender, score_value in normalized_rows:
+                create_row(name, student_id, gender, score_value)
+                created_count += 1
+
+        if not dry_run:
+            report_progress(0.6, '正在写入学生数据')
+            if pending_creates:
+                Student.objects.bulk_create(pending_creates, batch_size=IMPORT_BULK_BATCH_SIZE)
+            if pending_updates:
+                Student.objects.bulk_update(
+                    list(pending_updates.values()),
+                    sorted(update_field_names),
+                    batch_size=IMPORT_BULK_BATCH_SIZE
+                )
 
     return {
         'mode': import_mode,
         'created': created_count,
         'updated': updated_count,
         'skipped': skipped_count,
+        'rejected': len(rejections),
+        'rejections': rejections[:IMPORT_REJECTION_REPORT_LIMIT],
+        'fuzzy_matched': len(fuzzy_matches),
+        'fuzzy_matches': fuzzy_matches[:IMPORT_REJECTION_REPORT_LIMIT],
+        'fuzzy_review': fuzzy_review[:IMPORT_REJECTION_REPORT_LIMIT],
     }
 
 
+GRADE_IMPORT_PARALLEL_BYTES = 4 * 1024 * 1024
+GRADE_IMPORT_MAX_WORKERS = 4
+
+
+def _iter_grade_sheets(excel_file, kind):
+    """产出 (工作表名, 行迭代器)。大文件的各工作表在子进程中并行解析，否则只打开一次工作簿顺序读取。"""
+    path = excel_file.temporary_file_path() if hasattr(excel_file, 'temporary_file_path') else None
+    if path and excel_file.size >= GRADE_IMPORT_PARALLEL_BYTES:
+        names = roster_sheets.sheet_names(path, kind)
+        workers = min(len(names), GRADE_IMPORT_MAX_WORKERS, os.cpu_count() or 1)
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [
+                    pool.submit(roster_sheets.read_sheet_rows, path, kind, index)
+                    for index in range(len(names))
+                ]
+                # 按表顺序写库，其余工作表在子进程中继续解析
+                for name, future in zip(names, futures):
+                    yield name, iter(future.result())
+            return
+    yield from roster_sheets.iter_workbook_sheets(excel_file, kind)
+
+
+def _import_grade_sheet(sheet_name, rows, import_mode, grid_rows, grid_cols):
+    classroom_name = _normalize_import_text(sheet_name)
+    head_rows = list(itertools.islice(rows, ROSTER_PREVIEW_ROWS))
+    header_index, columns = _detect_roster_header(head_rows)
+    if not classroom_name or header_index is None:
+        return {
+            'sheet': sheet_name,
+            'status': 'skipped',
+            'message': '未识别到表头（需包含姓名列和“总分”列），已跳过',
+        }
+
+    classroom = Classroom.objects.filter(name=classroom_name).order_by('pk').first()
+    classroom_created = classroom is None
+    if classroom_created:
+        classroom = Classroom.objects.create(name=classroom_name, rows=grid_rows, cols=grid_cols)
+
+    result = _process_import(
+        classroom,
+        itertools.chain(head_rows[header_index + 1:], rows),
+        columns['name'],
+        columns['student_id'],
+        columns['gender'],
+        columns['score'],
+        import_mode
+    )
+    return {
+        'sheet': sheet_name,
+        'status': 'success',
+        'classroom_id': classroom.pk,
+        'classroom_url': reverse('classroom_detail', args=[classroom.pk]),
+        'classroom_created': classroom_created,
+        'created': result['created'],
+        'updated': result['updated'],
+        'skipped': result['skipped'],
+        'rejected': result['rejected'],
+        'message': _format_import_result_message(result),
+    }
+
+
+@require_POST
+def import_grade(request):
+    excel_file = request.FILES.get('excel_file')
+    if not excel_file:
+        return JsonResponse({'status': 'error', 'message': '请先选择 Excel 文件'}, status=400)
+    kind = _roster_file_kind(excel_file)
+    if kind == 'csv':
+        return JsonResponse({'status': 'error', 'message': '按年级导入需要 Excel 工作簿（每个班级一个工作表）'}, status=400)
+
+    import_mode = _resolve_student_import_mode(request.POST.get('import_mode'))
+    try:
+        grid_rows = max(1, min(int(request.POST.get('rows', 6)), 30))
+        grid_cols = max(1, min(int(request.POST.get('cols', 8)), 30))
+    except (TypeError, ValueError):
+        return JsonResponse({'status': 'error', 'message': '座位行列数无效'}, status=400)
+
+    sheets = []
+    try:
+        # 整个年级在同一事务中导入，任一工作表出错则全部回滚
+        with transaction.atomic():
+            for sheet_name, sheet_rows in _iter_grade_sheets(excel_file, kind):
+                sheets.append(_import_grade_sheet(sheet_name, sheet_rows, import_mode, grid_rows, grid_cols))
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': f'导入失败：{e}'}, status=400)
+
+    imported = [item for item in sheets if item['status'] == 'success']
+    if not imported:
+        return JsonResponse({
+            'status': 'error',
+            'message': '没有可导入的工作表，请确认每个工作表都包含姓名列和“总分”列',
+            'sheets': sheets,
+        }, status=400)
+
+    new_classrooms = sum(1 for item in imported if item['classroom_created'])
+    message = (
+        f"已导入 {len(imported)} 个班级（新建 {new_classrooms} 个），"
+        f"新增学生 {sum(item['created'] for item in imported)} 人，"
+        f"更新 {sum(item['updated'] for item in imported)} 人"
+    )
+    skipped_sheets = len(sheets) - len(imported)
+    if skipped_sheets:
+        message += f"，跳过 {skipped_sheets} 个工作表"
+    return JsonResponse({'status': 'success', 'message': message, 'sheets': sheets})
+
+
 def _build_constraint_maps(classroom, students):
     must_rows = {}
     must_cols = {}
@@ -2211,6 +3002,7 @@ def _attempt_auto_constraint_fix(classroom, preferred_method=None):
     return False
 
 
+@background_capable('auto_arrange_seats')
 def auto_arrange_seats(request, pk):
     classroom = get_object_or_404(Classroom, pk=pk)
     if request.method == 'POST':
@@ -2233,12 +3025,14 @@ def auto_arrange_seats(request, pk):
                 if not _run_arrangement(classroom, method):
                     raise ValueError('未设置小组或小组没有座位')
 
+                report_progress(0.5, '正在检查排座约束')
                 _stabilize_layout_with_rules(classroom, request)
                 violations = _layout_hard_issues(classroom)
                 if violations:
                     raise ValueError(f'约束未满足，排座已回滚：{_format_issues_preview(violations)}')
         except ValueError as e:
             # 自动尝试修复，不直接失败
+            report_progress(0.6, '约束未满足，正在自动调整')
             if _attempt_auto_constraint_fix(classroom, preferred_method=method):
                 _reset_history(request, pk)
                 if is_ajax:
@@ -3355,147 +4149,165 @@ def delete_constraint(request, pk, constraint_id):
     return redirect('classroom_detail', pk=pk)
 
 
-def export_students(request, pk):
-    classroom = get_object_or_404(Classroom, pk=pk)
+def _streaming_export_response(cache_key, chunks, content_type, content_disposition):
+    """边生成边发送导出内容；完整发送后写入导出缓存。"""
+    def stream():
+        parts = []
+        for chunk in chunks:
+            data = chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+            parts.append(data)
+            yield data
+        export_cache.put(cache_key, {
+            'content_type': content_type,
+            'content_disposition': content_disposition,
+        }, b''.join(parts))
+
+    response = StreamingHttpResponse(stream(), content_type=content_type)
+    response['Content-Disposition'] = content_disposition
+    response['ETag'] = quote_etag(cache_key)
+    response['Cache-Control'] = 'no-cache'
+    return response
 
-    layout_transform = str(request.GET.get('layout_transform', 'none')).strip().lower()
-    rotate_180 = layout_transform in {'rotate_180', 'rot180', '180'}
-    if not rotate_180:
-        rotate_flag = str(request.GET.get('rotate_180', '')).strip().lower()
-        rotate_180 = rotate_flag in {'1', 'true', 'yes', 'on'}
 
-    # 导出网格布局
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = classroom.name
+SVG_EXPORT_FONT_FAMILY = '"鸿蒙黑体","PingFang SC","Microsoft YaHei",sans-serif'
+SVG_EXPORT_CELL_W = 120
+SVG_EXPORT_CELL_H = 86
+SVG_EXPORT_GAP = 10
+SVG_EXPORT_PADDING = 24
+# 导出选项页预览图的最大显示宽度（像素）
+SVG_PREVIEW_MAX_WIDTH = 640
+SVG_EXPORT_OPTION_KEYS = (
+    'show_title', 'show_podium', 'show_coords', 'show_name',
+    'show_score', 'show_group', 'show_empty_label', 'show_seat_type',
+)
 
-    # 样式设置
-    thin_border = Border(left=Side(style='thin'),
-                         right=Side(style='thin'),
-                         top=Side(style='thin'),
-                         bottom=Side(style='thin'))
-    center_align = Alignment(horizontal='center', vertical='center', wrap_text=True)
 
-    # 字体设置
-    font_name = '鸿蒙黑体'
-    header_font = Font(name=font_name, bold=True, size=20)
-    podium_font = Font(name=font_name, bold=True, size=14)
-    seat_font = Font(name=font_name, size=12, bold=False)
+@functools.lru_cache(maxsize=None)
+def _svg_export_stylesheet(theme):
+    # 主题颜色全部放在样式表中，格子与文字只引用类名；每个主题只生成一次
+    style = SVG_EXPORT_THEME_MAP[theme]
+    font = SVG_EXPORT_FONT_FAMILY
+    rules = [
+        f'.bg{{fill:{style["bg"]};}}',
+        f'.title{{font:700 24px {font};fill:{style["title"]};}}',
+        f'.cell-name{{font:600 16px {font};fill:{style["name"]};}}',
+        f'.cell-sub{{font:500 12px {font};fill:{style["sub"]};}}',
+        f'.tag{{font:700 11px {font};fill:{style["tag_text"]};}}',
+        f'.cell-type{{font:600 13px {font};fill:{style["type"]};}}',
+        '.mid{text-anchor:middle;}',
+        f'.podium{{fill:{style["podium_fill"]};stroke:{style["podium_stroke"]};}}',
+        f'.seat-occupied{{fill:{style["seat_fill_occupied"]};stroke:{style["seat_stroke_occupied"]};}}',
+        f'.seat-empty{{fill:{style["seat_fill_empty"]};stroke:{style["seat_stroke_empty"]};}}',
+        f'.nonseat-aisle{{fill:{style["nonseat_aisle"]};stroke:{style["nonseat_stroke"]};}}',
+        f'.nonseat-podium{{fill:{style["nonseat_podium"]};stroke:{style["nonseat_stroke"]};}}',
+        f'.nonseat-empty{{fill:{style["nonseat_empty"]};stroke:{style["nonseat_stroke"]};}}',
+        '.group-none{fill:#9aa6c2;}',
+    ]
+    rules.extend(
+        f'.group-{idx}{{fill:{color};}}'
+        for idx, color in enumerate(style['group_palette'])
+    )
+    return ''.join(rules)
 
-    # 标题
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=classroom.cols)
-    title_suffix = "（180°翻转）" if rotate_180 else ""
-    cell = ws.cell(row=1, column=1, value=f"{classroom.name} 座位表{title_suffix}")
-    cell.font = header_font
-    cell.alignment = center_align
-    ws.row_dimensions[1].height = 40
 
-    seat_start_row = 2 if rotate_180 else 3
-    podium_row = seat_start_row + classroom.rows if rotate_180 else 2
+def _svg_export_options(request):
+    """解析 SVG/PPTX 导出与预览共用的主题与显示选项。"""
+    def _qbool(key, default=True):
+        raw = request.GET.get(key)
+        if raw is None or raw == '':
+            return default
+        return str(raw).strip().lower() in {'1', 'true', 'yes', 'on'}
 
-    # 讲台（翻转模式下展示在底部）
-    ws.merge_cells(start_row=podium_row, start_column=1, end_row=podium_row, end_column=classroom.cols)
-    podium_cell = ws.cell(row=podium_row, column=1, value="讲台")
-    podium_cell.font = podium_font
-    podium_cell.alignment = center_align
-    ws.row_dimensions[podium_row].height = 30
+    theme = str(request.GET.get('theme', 'classic')).strip().lower()
+    if theme not in SVG_EXPORT_THEME_MAP:
+        theme = 'classic'
+    return theme, {key: _qbool(key, True) for key in SVG_EXPORT_OPTION_KEYS}
 
-    seats = classroom.seats.select_related('student').all()
-    seat_map = _build_seat_map(seats)
 
-    for c in range(1, classroom.cols + 1):
-        ws.column_dimensions[get_column_letter(c)].width = 14
+def _build_export_scene(classroom, seats):
+    """座次图的几何模型：只含网格尺寸与各格内容，与主题、显示选项无关，可直接序列化为 JSON。
 
-    for visual_row in range(1, classroom.rows + 1):
-        row_index = seat_start_row + visual_row - 1
-        ws.row_dimensions[row_index].height = 50
+    cells 按行列顺序排列，每项为 [行, 列, 格子类型, 姓名, 成绩, 小组编号]；空座位的姓名为 None。
+    """
+    seat_map = _build_seat_map(seats)
+    cells = []
+    groups = {}
+    for r in range(1, classroom.rows + 1):
         for c in range(1, classroom.cols + 1):
-            cell = ws.cell(row=row_index, column=c)
-            source_row = classroom.rows - visual_row + 1 if rotate_180 else visual_row
-            source_col = classroom.cols - c + 1 if rotate_180 else c
-            seat = seat_map.get((source_row, source_col))
-
-            value = ""
-            is_seat = False
-            if seat:
-                if seat.cell_type == SeatCellType.SEAT:
-                    is_seat = True
-                    if seat.student:
-                        value = seat.student.name
-                    else:
-                        value = ""
-                elif seat.cell_type == SeatCellType.AISLE or seat.cell_type == SeatCellType.EMPTY:
-                    value = ""
-                else:
-                    value = seat.get_cell_type_display()
-
-            cell.value = value
-            cell.alignment = center_align
-            cell.font = seat_font
-
-            # 仅对入座座位加边框
-            if is_seat and seat.student:
-                cell.border = thin_border
-
-    # A4 横向打印
-    from openpyxl.worksheet.page import PageMargins
-    ws.page_setup.orientation = ws.ORIENTATION_LANDSCAPE
-    ws.page_setup.paperSize = ws.PAPERSIZE_A4
-    ws.page_setup.margins = PageMargins(left=0.25, right=0.25, top=0.25, bottom=0.25, header=0, footer=0)
-    ws.print_options.horizontalCentered = True
-    ws.print_options.verticalCentered = True
+            seat = seat_map.get((r, c))
+            if not seat:
+                continue
+            if seat.group_id and seat.group:
+                groups[seat.group_id] = seat.group.name
+            if seat.cell_type != SeatCellType.SEAT:
+                cells.append([r, c, seat.cell_type, None, '', None])
+                continue
+            student = seat.student
+            cells.append([
+                r,
+                c,
+                seat.cell_type,
+                student.name if student else None,
+                student.display_score if student and (student.score or 0) > 0 else '',
+                seat.group_id if seat.group_id and seat.group else None,
+            ])
+    return {
+        'version': _export_fingerprint(classroom, seats),
+        'name': classroom.name,
+        'rows': classroom.rows,
+        'cols': classroom.cols,
+        'groups': sorted([group_id, name] for group_id, name in groups.items()),
+        'cells': cells,
+    }
 
-    # 适应页面
-    ws.page_setup.fitToPage = True
-    ws.page_setup.fitToHeight = 1
-    ws.page_setup.fitToWidth = 1
 
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    filename_suffix = "_座次图_180度翻转.xlsx" if rotate_180 else "_座次图.xlsx"
-    response['Content-Disposition'] = f'attachment; filename="{classroom.name}{filename_suffix}"'
-    wb.save(response)
+# 最近预览过的班级座次图几何模型，键为班级编号；值附带布局指纹，指纹一致时无需再查询数据库
+EXPORT_SCENE_MEMO_SIZE = 16
+_export_scene_memo = OrderedDict()
+_export_scene_lock = threading.Lock()
 
-    return response
 
+def _remember_export_scene(classroom_pk, scene):
+    with _export_scene_lock:
+        _export_scene_memo[classroom_pk] = scene
+        _export_scene_memo.move_to_end(classroom_pk)
+        while len(_export_scene_memo) > EXPORT_SCENE_MEMO_SIZE:
+            _export_scene_memo.popitem(last=False)
+    return scene
 
-def export_students_options_page(request, pk):
-    classroom = get_object_or_404(Classroom, pk=pk)
-    return render(request, 'seats/export_excel_options.html', {
-        'classroom': classroom
-    })
 
+def _load_export_scene(classroom_pk, version=None):
+    """返回班级的几何模型；调用方给出的指纹与内存中的一致时直接复用，否则重新读取座位。
 
-def export_students_svg(request, pk):
-    classroom = get_object_or_404(Classroom, pk=pk)
+    指纹由调用方在打开选项页时取得，之后切换选项不再核对数据库；正式导出始终读取最新座位。
+    """
+    if version:
+        with _export_scene_lock:
+            scene = _export_scene_memo.get(classroom_pk)
+            if scene is not None and scene['version'] == version:
+                _export_scene_memo.move_to_end(classroom_pk)
+                return scene
+    classroom = get_object_or_404(Classroom, pk=classroom_pk)
     seats = list(classroom.seats.select_related('student', 'group').all())
-    seat_map = _build_seat_map(seats)
-
-    def _qbool(key, default=True):
-        raw = request.GET.get(key)
-        if raw is None or raw == '':
-            return default
-        return str(raw).strip().lower() in {'1', 'true', 'yes', 'on'}
-
-    show_title = _qbool('show_title', True)
-    show_podium = _qbool('show_podium', True)
-    show_coords = _qbool('show_coords', True)
-    show_name = _qbool('show_name', True)
-    show_score = _qbool('show_score', True)
-    show_group = _qbool('show_group', True)
-    show_empty_label = _qbool('show_empty_label', True)
-    show_seat_type = _qbool('show_seat_type', True)
+    return _remember_export_scene(classroom.pk, _build_export_scene(classroom, seats))
+
+
+def _iter_svg_export(scene, theme, show_title=True, show_podium=True, show_coords=True,
+                     show_name=True, show_score=True, show_group=True, show_empty_label=True,
+                     show_seat_type=True, max_width=None):
+    """由几何模型逐行生成座次图 SVG。
+
+    座位外框定义为 <symbol>，每个格子用 <use> 引用并放在平移后的 <g> 中，
+    颜色与字体由样式表中的类名提供，格子内只保留相对坐标与文字。
+    指定 max_width 时按比例缩小显示尺寸（viewBox 不变），用于预览。
+    """
+    cell_w = SVG_EXPORT_CELL_W
+    cell_h = SVG_EXPORT_CELL_H
+    gap = SVG_EXPORT_GAP
+    padding_x = padding_y = SVG_EXPORT_PADDING
+    rows = scene['rows']
+    cols = scene['cols']
     name_emphasis_mode = show_name and (not show_coords) and (not show_score)
-
-    theme = str(request.GET.get('theme', 'classic')).strip().lower()
-    if theme not in SVG_EXPORT_THEME_MAP:
-        theme = 'classic'
-    style = SVG_EXPORT_THEME_MAP[theme]
-
-    cell_w = 120
-    cell_h = 86
-    gap = 10
-    padding_x = 24
-    padding_y = 24
     if show_title and show_podium:
         header_h = 90
     elif show_title or show_podium:
@@ -3503,173 +4315,377 @@ def export_students_svg(request, pk):
     else:
         header_h = 16
 
-    grid_w = classroom.cols * cell_w + max(0, classroom.cols - 1) * gap
-    grid_h = classroom.rows * cell_h + max(0, classroom.rows - 1) * gap
+    grid_w = cols * cell_w + max(0, cols - 1) * gap
+    grid_h = rows * cell_h + max(0, rows - 1) * gap
 
     width = padding_x * 2 + grid_w
     height = padding_y * 2 + header_h + grid_h
     grid_top = padding_y + header_h
+    display_w, display_h = width, height
+    if max_width and width > max_width:
+        display_w = max_width
+        display_h = round(height * max_width / width)
 
     podium_w = min(340, max(180, int(grid_w * 0.42)))
     podium_h = 34
     podium_x = padding_x + (grid_w - podium_w) // 2
+    palette_size = len(SVG_EXPORT_THEME_MAP[theme]['group_palette'])
+    empty_label_y = 56 if show_coords else 50
+
+    # 重复出现的格子内容只定义一次：座位外框、空座位、各类非座位格子与每个小组的标签
+    symbols = [
+        f'<symbol id="seat-frame" overflow="visible"><rect width="{cell_w}" height="{cell_h}" rx="16"/></symbol>',
+        '<symbol id="seat-vacant" overflow="visible"><use xlink:href="#seat-frame" class="seat-empty"/>'
+        + (f'<text x="12" y="{empty_label_y}" class="cell-sub">空座位</text>' if show_empty_label else '')
+        + '</symbol>',
+    ]
+    present_types = {cell[2] for cell in scene['cells']}
+    for cell_type, label in SeatCellType.choices:
+        if cell_type == SeatCellType.SEAT or cell_type not in present_types:
+            continue
+        symbols.append(
+            f'<symbol id="cell-{cell_type}" overflow="visible"><use xlink:href="#seat-frame" class="nonseat-{cell_type}"/>'
+            + (f'<text x="{cell_w / 2}" y="50" class="cell-type mid">{html.escape(str(label))}</text>' if show_seat_type else '')
+            + '</symbol>'
+        )
+    if show_group:
+        for group_id, group_name in scene['groups']:
+            tag_w = max(36, min(66, 18 + len(group_name) * 12))
+            symbols.append(
+                f'<symbol id="group-tag-{group_id}" overflow="visible">'
+                f'<rect x="{cell_w - tag_w - 8}" y="8" width="{tag_w}" height="20" rx="10" class="group-{(int(group_id) - 1) % palette_size}"/>'
+                f'<text x="{cell_w - tag_w / 2 - 8}" y="22" class="tag mid">{html.escape(group_name)}</text>'
+                '</symbol>'
+            )
 
-    def group_color(group_id):
-        if not group_id:
-            return '#9aa6c2'
-        group_palette = style['group_palette']
-        return group_palette[(int(group_id) - 1) % len(group_palette)]
-
-    chunks = [
+    head = [
         '<?xml version="1.0" encoding="UTF-8"?>',
-        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}">',
+        f'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" width="{display_w}" height="{display_h}" viewBox="0 0 {width} {height}">',
         '<defs>',
-        '<style><![CDATA['
-        '.title{font:700 24px "鸿蒙黑体","PingFang SC","Microsoft YaHei",sans-serif;}'
-        '.cell-name{font:600 16px "鸿蒙黑体","PingFang SC","Microsoft YaHei",sans-serif;}'
-        '.cell-sub{font:500 12px "鸿蒙黑体","PingFang SC","Microsoft YaHei",sans-serif;}'
-        '.tag{font:700 11px "鸿蒙黑体","PingFang SC","Microsoft YaHei",sans-serif;}'
-        '.cell-type{font:600 13px "鸿蒙黑体","PingFang SC","Microsoft YaHei",sans-serif;}'
-        ']]></style>',
+        f'<style><![CDATA[{_svg_export_stylesheet(theme)}]]></style>',
+        *symbols,
         '</defs>',
-        f'<rect x="0" y="0" width="{width}" height="{height}" fill="{style["bg"]}"/>',
+        f'<rect class="bg" x="0" y="0" width="{width}" height="{height}"/>',
     ]
 
     if show_title:
         title_y = padding_y + 28 if show_podium else padding_y + 30
-        chunks.append(
-            f'<text x="{padding_x}" y="{title_y}" class="title" fill="{style["title"]}">{html.escape(classroom.name)} 座次图</text>'
-        )
+        head.append(f'<text x="{padding_x}" y="{title_y}" class="title">{html.escape(scene["name"])} 座次图</text>')
 
     if show_podium:
         podium_y = padding_y + 32 if show_title else padding_y + 14
-        chunks.append(
-            f'<rect x="{podium_x}" y="{podium_y}" width="{podium_w}" height="{podium_h}" rx="12" fill="{style["podium_fill"]}" stroke="{style["podium_stroke"]}"/>'
+        head.append(
+            f'<rect class="podium" x="{podium_x}" y="{podium_y}" width="{podium_w}" height="{podium_h}" rx="12"/>'
         )
-        chunks.append(
-            f'<text x="{podium_x + podium_w / 2}" y="{podium_y + 22}" text-anchor="middle" class="cell-type" fill="{style["type"]}">讲台</text>'
+        head.append(
+            f'<text x="{podium_x + podium_w / 2}" y="{podium_y + 22}" class="cell-type mid">讲台</text>'
         )
+    yield ''.join(head)
 
-    for r in range(1, classroom.rows + 1):
-        for c in range(1, classroom.cols + 1):
-            seat = seat_map.get((r, c))
-            if not seat:
-                continue
-
+    for _, row_cells in itertools.groupby(scene['cells'], key=lambda cell: cell[0]):
+        row_chunks = []
+        for r, c, cell_type, name, score, group_id in row_cells:
             x = padding_x + (c - 1) * (cell_w + gap)
             y = grid_top + (r - 1) * (cell_h + gap)
 
-            if seat.cell_type == SeatCellType.SEAT:
-                if seat.student_id:
-                    fill = style['seat_fill_occupied']
-                    stroke = style['seat_stroke_occupied']
-                else:
-                    fill = style['seat_fill_empty']
-                    stroke = style['seat_stroke_empty']
+            if cell_type != SeatCellType.SEAT:
+                row_chunks.append(f'<use xlink:href="#cell-{cell_type}" x="{x}" y="{y}"/>')
+                continue
 
-                chunks.append(
-                    f'<rect x="{x}" y="{y}" width="{cell_w}" height="{cell_h}" rx="16" fill="{fill}" stroke="{stroke}"/>'
-                )
-                if show_coords:
-                    chunks.append(
-                        f'<text x="{x + 8}" y="{y + 16}" class="cell-sub" fill="{style["sub"]}">({r}-{c})</text>'
-                    )
+            row_chunks.append(f'<g transform="translate({x},{y})">')
+            if name is not None:
+                row_chunks.append('<use xlink:href="#seat-frame" class="seat-occupied"/>')
+            else:
+                row_chunks.append('<use xlink:href="#seat-vacant"/>')
+            if show_coords:
+                row_chunks.append(f'<text x="8" y="16" class="cell-sub">({r}-{c})</text>')
+            if show_group and group_id:
+                row_chunks.append(f'<use xlink:href="#group-tag-{group_id}"/>')
+
+            if name is not None:
+                base_name_y = 48 if show_coords else 42
+                if show_name:
+                    if name_emphasis_mode:
+                        name_size = _name_emphasis_font_size(name)
+                        center_y = cell_h / 2 + (6 if (show_group and group_id) else 0)
+                        row_chunks.append(
+                            f'<text x="{cell_w / 2}" y="{center_y}" text-anchor="middle" dominant-baseline="middle" class="cell-name" font-size="{name_size}">{html.escape(name)}</text>'
+                        )
+                    else:
+                        row_chunks.append(
+                            f'<text x="12" y="{base_name_y}" class="cell-name">{html.escape(name)}</text>'
+                        )
+                if show_score and score:
+                    score_y = base_name_y + 20 if show_name else (56 if show_coords else 50)
+                    row_chunks.append(f'<text x="12" y="{score_y}" class="cell-sub">{score}分</text>')
+            row_chunks.append('</g>')
+        yield ''.join(row_chunks)
 
-                if show_group and seat.group_id and seat.group:
-                    tag_w = max(36, min(66, 18 + len(seat.group.name) * 12))
-                    tag_color = group_color(seat.group_id)
-                    chunks.append(
-                        f'<rect x="{x + cell_w - tag_w - 8}" y="{y + 8}" width="{tag_w}" height="20" rx="10" fill="{tag_color}"/>'
-                    )
-                    chunks.append(
-                        f'<text x="{x + cell_w - tag_w / 2 - 8}" y="{y + 22}" text-anchor="middle" class="tag" fill="{style["tag_text"]}">{html.escape(seat.group.name)}</text>'
-                    )
+    yield '</svg>'
 
-                if seat.student:
-                    base_name_y = y + (48 if show_coords else 42)
-                    if show_name:
-                        if name_emphasis_mode:
-                            name_size = _name_emphasis_font_size(seat.student.name)
-                            center_y = y + cell_h / 2 + (6 if (show_group and seat.group_id) else 0)
-                            chunks.append(
-                                f'<text x="{x + cell_w / 2}" y="{center_y}" text-anchor="middle" dominant-baseline="middle" class="cell-name" font-size="{name_size}" fill="{style["name"]}">{html.escape(seat.student.name)}</text>'
-                            )
-                        else:
-                            chunks.append(
-                                f'<text x="{x + 12}" y="{base_name_y}" class="cell-name" fill="{style["name"]}">{html.escape(seat.student.name)}</text>'
-                            )
-                    if show_score and (seat.student.score or 0) > 0:
-                        score_y = base_name_y + 20 if show_name else y + (56 if show_coords else 50)
-                        chunks.append(
-                            f'<text x="{x + 12}" y="{score_y}" class="cell-sub" fill="{style["sub"]}">{seat.student.display_score}分</text>'
-                        )
-                elif show_empty_label:
-                    empty_y = y + (56 if show_coords else 50)
-                    chunks.append(
-                        f'<text x="{x + 12}" y="{empty_y}" class="cell-sub" fill="{style["sub"]}">空座位</text>'
-                    )
-                continue
 
-            if seat.cell_type == SeatCellType.AISLE:
-                fill = style['nonseat_aisle']
-            elif seat.cell_type == SeatCellType.PODIUM:
-                fill = style['nonseat_podium']
-            else:
-                fill = style['nonseat_empty']
+def _export_student_fingerprint(student):
+    if student is None:
+        return None
+    return [student.pk, student.name, student.score, student.gender, student.student_id]
 
-            chunks.append(
-                f'<rect x="{x}" y="{y}" width="{cell_w}" height="{cell_h}" rx="16" fill="{fill}" stroke="{style["nonseat_stroke"]}"/>'
-            )
-            if show_seat_type:
-                chunks.append(
-                    f'<text x="{x + cell_w / 2}" y="{y + 50}" text-anchor="middle" class="cell-type" fill="{style["type"]}">{html.escape(seat.get_cell_type_display())}</text>'
-                )
 
-    chunks.append('</svg>')
-    svg_content = ''.join(chunks)
+def _export_group_fingerprint(group):
+    if group is None:
+        return None
+    return [group.pk, group.name, group.order, group.leader_id]
 
-    response = HttpResponse(svg_content, content_type='image/svg+xml; charset=utf-8')
-    filename = escape_uri_path(f'{classroom.name}_座次图.svg')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+
+def _export_fingerprint(classroom, seats, groups=None, with_seat_groups=True):
+    """导出结果所依赖数据的摘要，由已加载的座位/小组计算，不额外查询数据库。"""
+    return _classroom_state_version({
+        'classroom': [classroom.pk, classroom.name, classroom.rows, classroom.cols],
+        'seats': [
+            [
+                seat.row,
+                seat.col,
+                seat.cell_type,
+                _export_student_fingerprint(seat.student),
+                _export_group_fingerprint(seat.group) if with_seat_groups else seat.group_id,
+            ]
+            for seat in seats
+        ],
+        'groups': [_export_group_fingerprint(group) for group in groups or ()],
+    })
+
+
+def _cached_export_response(request, cache_key):
+    """命中导出缓存时直接返回（客户端已有同一版本时返回 304）；未命中返回 None。"""
+    if _etag_matches(request, cache_key):
+        response = HttpResponseNotModified()
+    else:
+        cached = export_cache.get(cache_key)
+        if cached is None:
+            return None
+        meta, content = cached
+        response = HttpResponse(content, content_type=meta['content_type'])
+        response['Content-Disposition'] = meta['content_disposition']
+    response['ETag'] = quote_etag(cache_key)
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _store_export_response(cache_key, response):
+    export_cache.put(cache_key, {
+        'content_type': response['Content-Type'],
+        'content_disposition': response['Content-Disposition'],
+    }, response.content)
+    response['ETag'] = quote_etag(cache_key)
+    response['Cache-Control'] = 'no-cache'
     return response
 
 
-def export_students_svg_preview_student(request, pk):
+EXCEL_EXPORT_FONT_NAME = '鸿蒙黑体'
+
+
+def _thin_border():
+    side = Side(style='thin')
+    return Border(left=side, right=side, top=side, bottom=side)
+
+
+def _seat_chart_named_styles():
+    # NamedStyle 未指定的字体、边框按工作簿默认值，与逐格赋值时的效果一致
+    center_align = Alignment(horizontal='center', vertical='center', wrap_text=True)
+    seat_font = Font(name=EXCEL_EXPORT_FONT_NAME, size=12, bold=False)
+    return [
+        NamedStyle(
+            name='座次表标题',
+            font=Font(name=EXCEL_EXPORT_FONT_NAME, bold=True, size=20),
+            alignment=center_align,
+            border=DEFAULT_BORDER,
+        ),
+        NamedStyle(
+            name='座次表讲台',
+            font=Font(name=EXCEL_EXPORT_FONT_NAME, bold=True, size=14),
+            alignment=center_align,
+            border=DEFAULT_BORDER,
+        ),
+        NamedStyle(name='座次表座位', font=seat_font, alignment=center_align, border=DEFAULT_BORDER),
+        # 仅对入座座位加边框
+        NamedStyle(name='座次表学生', font=seat_font, alignment=center_align, border=_thin_border()),
+    ]
+
+
+def _group_report_named_styles():
+    center = Alignment(horizontal='center', vertical='center')
+    return [
+        NamedStyle(
+            name='小组作业表组名',
+            font=Font(name=EXCEL_EXPORT_FONT_NAME, bold=True, size=13),
+            alignment=center,
+            border=_thin_border(),
+            fill=PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid"),
+        ),
+        NamedStyle(name='小组作业表组员', font=Font(name='微软雅黑', size=11, color="000000"), alignment=center, border=_thin_border()),
+        NamedStyle(name='小组作业表组长', font=Font(name='微软雅黑', size=11, color="FF0000"), alignment=center, border=_thin_border()),
+        NamedStyle(name='小组作业表格子', font=DEFAULT_FONT, border=_thin_border()),
+    ]
+
+
+def _register_named_styles(wb, styles):
+    """把命名样式注册到工作簿（同名只注册一次），单元格按样式名引用，不再逐格创建字体、边框对象。"""
+    registered = set(wb.named_styles)
+    for style in styles:
+        if style.name not in registered:
+            wb.add_named_style(style)
+
+
+def _styled_cell(ws, value, style_name):
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = style_name
+    return cell
+
+
+def _write_seat_chart_sheet(wb, classroom, seats, rotate_180):
+    """向 write-only 工作簿追加一张座次表；行按顺序写出，列宽与页面设置须在第一行之前完成。"""
+    _register_named_styles(wb, _seat_chart_named_styles())
+    ws = wb.create_sheet(title=classroom.name)
+    cols = classroom.cols
+
+    for c in range(1, cols + 1):
+        ws.column_dimensions[get_column_letter(c)].width = 14
+
+    # A4 横向打印
+    ws.page_setup.orientation = Worksheet.ORIENTATION_LANDSCAPE
+    ws.page_setup.paperSize = Worksheet.PAPERSIZE_A4
+    ws.page_setup.margins = PageMargins(left=0.25, right=0.25, top=0.25, bottom=0.25, header=0, footer=0)
+    ws.print_options.horizontalCentered = True
+    ws.print_options.verticalCentered = True
+
+    # 适应页面
+    ws.page_setup.fitToPage = True
+    ws.page_setup.fitToHeight = 1
+    ws.page_setup.fitToWidth = 1
+
+    seat_start_row = 2 if rotate_180 else 3
+    podium_row = seat_start_row + classroom.rows if rotate_180 else 2
+
+    # 标题
+    ws.merged_cells.add(CellRange(min_col=1, min_row=1, max_col=cols, max_row=1))
+    ws.row_dimensions[1].height = 40
+    title_suffix = "（180°翻转）" if rotate_180 else ""
+    ws.append([_styled_cell(ws, f"{classroom.name} 座位表{title_suffix}", '座次表标题')])
+
+    # 讲台（翻转模式下展示在底部）
+    ws.merged_cells.add(CellRange(min_col=1, min_row=podium_row, max_col=cols, max_row=podium_row))
+    ws.row_dimensions[podium_row].height = 30
+
+    def append_podium():
+        ws.append([_styled_cell(ws, "讲台", '座次表讲台')])
+
+    if not rotate_180:
+        append_podium()
+
+    seat_map = _build_seat_map(seats)
+    for visual_row in range(1, classroom.rows + 1):
+        ws.row_dimensions[seat_start_row + visual_row - 1].height = 50
+        row = []
+        for c in range(1, cols + 1):
+            source_row = classroom.rows - visual_row + 1 if rotate_180 else visual_row
+            source_col = cols - c + 1 if rotate_180 else c
+            seat = seat_map.get((source_row, source_col))
+
+            value = None
+            style_name = '座次表座位'
+            if seat:
+                if seat.cell_type == SeatCellType.SEAT:
+                    if seat.student:
+                        value = seat.student.name
+                        style_name = '座次表学生'
+                elif seat.cell_type != SeatCellType.AISLE and seat.cell_type != SeatCellType.EMPTY:
+                    value = seat.get_cell_type_display()
+            row.append(_styled_cell(ws, value, style_name))
+        ws.append(row)
+
+    if rotate_180:
+        append_podium()
+    return ws
+
+
+@background_capable('export_students')
+def export_students(request, pk):
     classroom = get_object_or_404(Classroom, pk=pk)
-    student_ids = list(classroom.students.values_list('pk', flat=True))
-    if not student_ids:
-        return JsonResponse({'status': 'empty', 'message': '当前班级暂无学生'})
 
-    random_student_id = random.choice(student_ids)
-    student = classroom.students.filter(pk=random_student_id).first()
-    if not student:
-        return JsonResponse({'status': 'empty', 'message': '当前班级暂无学生'})
+    layout_transform = str(request.GET.get('layout_transform', 'none')).strip().lower()
+    rotate_180 = layout_transform in {'rotate_180', 'rot180', '180'}
+    if not rotate_180:
+        rotate_flag = str(request.GET.get('rotate_180', '')).strip().lower()
+        rotate_180 = rotate_flag in {'1', 'true', 'yes', 'on'}
 
-    seat = getattr(student, 'assigned_seat', None)
-    group_name = ''
-    group_index = 0
-    coord = ''
-    if seat:
-        coord = f'{seat.row}-{seat.col}'
-        if seat.group_id and seat.group:
-            group_name = seat.group.name
-            group_index = int(seat.group_id)
+    seats = list(classroom.seats.select_related('student').all())
+    cache_key = export_cache.make_key(
+        'export_students',
+        _export_fingerprint(classroom, seats, with_seat_groups=False),
+        {'rotate_180': rotate_180}
+    )
+    cached = _cached_export_response(request, cache_key)
+    if cached is not None:
+        return cached
 
-    score_display = student.display_score if (student.score or 0) > 0 else ''
+    wb = openpyxl.Workbook(write_only=True)
+    _write_seat_chart_sheet(wb, classroom, seats, rotate_180)
 
-    return JsonResponse({
-        'status': 'success',
-        'sample': {
-            'classroom': classroom.name,
-            'name': student.name,
-            'score': score_display,
-            'group': group_name,
-            'group_index': group_index,
-            'coord': coord
-        }
+    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    filename_suffix = "_座次图_180度翻转.xlsx" if rotate_180 else "_座次图.xlsx"
+    response['Content-Disposition'] = f'attachment; filename="{classroom.name}{filename_suffix}"'
+    wb.save(response)
+
+    return _store_export_response(cache_key, response)
+
+
+def export_students_options_page(request, pk):
+    classroom = get_object_or_404(Classroom, pk=pk)
+    return render(request, 'seats/export_excel_options.html', {
+        'classroom': classroom
     })
 
 
+@background_capable('export_students_svg')
+def export_students_svg(request, pk):
+    classroom = get_object_or_404(Classroom, pk=pk)
+    seats = list(classroom.seats.select_related('student', 'group').all())
+    theme, options = _svg_export_options(request)
+    scene = _remember_export_scene(classroom.pk, _build_export_scene(classroom, seats))
+
+    cache_key = export_cache.make_key('export_students_svg', scene['version'], {**options, 'theme': theme})
+    cached = _cached_export_response(request, cache_key)
+    if cached is not None:
+        return cached
+
+    chunks = _iter_svg_export(scene, theme, **options)
+    filename = escape_uri_path(f'{classroom.name}_座次图.svg')
+    return _streaming_export_response(
+        cache_key,
+        chunks,
+        'image/svg+xml; charset=utf-8',
+        f'attachment; filename="{filename}"'
+    )
+
+
+def export_students_preview(request, pk):
+    """导出选项页的实时预览。
+
+    format=json 返回座次图的几何模型（含布局指纹 version）；否则返回缩小尺寸的 SVG。
+    请求带上 version 且与内存中的模型一致时不访问数据库，切换主题与显示选项只重新生成样式与文字。
+    """
+    scene = _load_export_scene(pk, request.GET.get('version'))
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'status': 'success', 'scene': scene})
+
+    theme, options = _svg_export_options(request)
+    response = HttpResponse(
+        ''.join(_iter_svg_export(scene, theme, max_width=SVG_PREVIEW_MAX_WIDTH, **options)),
+        content_type='image/svg+xml; charset=utf-8'
+    )
+    response['X-Scene-Version'] = scene['version']
+    return response
+
+
 def export_students_svg_options_page(request, pk):
     classroom = get_object_or_404(Classroom, pk=pk)
     return render(request, 'seats/export_svg_options.html', {
@@ -3677,15 +4693,13 @@ def export_students_svg_options_page(request, pk):
     })
 
 
+@background_capable('export_students_pptx')
 def export_students_pptx(request, pk):
     try:
         from pptx import Presentation
-        from pptx.dml.color import RGBColor
-        from pptx.enum.shapes import MSO_SHAPE
-        from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
-        from pptx.oxml import parse_xml
-        from pptx.oxml.ns import nsdecls, qn
-        from pptx.util import Inches, Pt
+        from pptx.util import Inches
+
+        from .pptx_slides import SlideShapeWriter
     except ImportError:
         return HttpResponse('缺少 python-pptx 依赖，请先安装 requirements.txt', status=500)
 
@@ -3693,27 +4707,27 @@ def export_students_pptx(request, pk):
     seats = list(classroom.seats.select_related('student', 'group').all())
     seat_map = _build_seat_map(seats)
 
-    def _qbool(key, default=True):
-        raw = request.GET.get(key)
-        if raw is None or raw == '':
-            return default
-        return str(raw).strip().lower() in {'1', 'true', 'yes', 'on'}
-
-    show_title = _qbool('show_title', True)
-    show_podium = _qbool('show_podium', True)
-    show_coords = _qbool('show_coords', True)
-    show_name = _qbool('show_name', True)
-    show_score = _qbool('show_score', True)
-    show_group = _qbool('show_group', True)
-    show_empty_label = _qbool('show_empty_label', True)
-    show_seat_type = _qbool('show_seat_type', True)
+    theme, options = _svg_export_options(request)
+    show_title = options['show_title']
+    show_podium = options['show_podium']
+    show_coords = options['show_coords']
+    show_name = options['show_name']
+    show_score = options['show_score']
+    show_group = options['show_group']
+    show_empty_label = options['show_empty_label']
+    show_seat_type = options['show_seat_type']
     name_emphasis_mode = show_name and (not show_coords) and (not show_score)
-
-    theme = str(request.GET.get('theme', 'classic')).strip().lower()
-    if theme not in SVG_EXPORT_THEME_MAP:
-        theme = 'classic'
     style = SVG_EXPORT_THEME_MAP[theme]
 
+    cache_key = export_cache.make_key(
+        'export_students_pptx',
+        _export_fingerprint(classroom, seats),
+        {**options, 'theme': theme}
+    )
+    cached = _cached_export_response(request, cache_key)
+    if cached is not None:
+        return cached
+
     cell_w = 120
     cell_h = 86
     gap = 10
@@ -3761,9 +4775,6 @@ def export_students_pptx(request, pk):
     def font_pt(base_px):
         return max(8, base_px * scale * 72)
 
-    def rgb(hex_color):
-        return RGBColor(*_hex_to_rgb_parts(hex_color))
-
     def group_color(group_id):
         if not group_id:
             return '#9aa6c2'
@@ -3774,83 +4785,18 @@ def export_students_pptx(request, pk):
     prs.slide_width = Inches(slide_w)
     prs.slide_height = Inches(slide_h)
     slide = prs.slides.add_slide(prs.slide_layouts[6])
-
-    bg = slide.shapes.add_shape(
-        MSO_SHAPE.RECTANGLE,
-        Inches(0),
-        Inches(0),
-        Inches(slide_w),
-        Inches(slide_h),
-    )
-    bg.fill.solid()
-    bg.fill.fore_color.rgb = rgb(style['bg'])
-    bg.line.fill.background()
+    shapes = SlideShapeWriter(slide, '鸿蒙黑体')
+    shapes.add_background(slide_w, slide_h, style['bg'])
+    line_width_pt = max(0.75, scale * 72)
 
     def add_round_rect(x, y, w, h, fill_color, stroke_color=None):
-        shape = slide.shapes.add_shape(
-            MSO_SHAPE.ROUNDED_RECTANGLE,
-            Inches(sx(x)),
-            Inches(sy(y)),
-            Inches(sw(w)),
-            Inches(sh(h)),
-        )
-        shape.fill.solid()
-        shape.fill.fore_color.rgb = rgb(fill_color)
-        if stroke_color:
-            shape.line.color.rgb = rgb(stroke_color)
-            shape.line.width = Pt(max(0.75, scale * 72))
-        else:
-            shape.line.fill.background()
-        # 控制阴影透明度，避免默认主题阴影过重
-        sp_pr = shape._element.spPr
-        for child in list(sp_pr):
-            if child.tag == qn('a:effectLst'):
-                sp_pr.remove(child)
-        effect_xml = parse_xml(
-            f'<a:effectLst {nsdecls("a")}>'
-            '<a:outerShdw blurRad="38100" dist="19050" dir="5400000" algn="ctr" rotWithShape="0">'
-            '<a:srgbClr val="000000"><a:alpha val="12000"/></a:srgbClr>'
-            '</a:outerShdw>'
-            '</a:effectLst>'
-        )
-        sp_pr.append(effect_xml)
-        return shape
+        shapes.add_round_rect(sx(x), sy(y), sw(w), sh(h), fill_color, stroke_color, line_width_pt)
 
     def add_text(x, y, w, h, text, color, size_px, bold=False, center=False, middle=True):
-        if text is None:
-            return
-        font_name = '鸿蒙黑体'
-        shape = slide.shapes.add_textbox(
-            Inches(sx(x)),
-            Inches(sy(y)),
-            Inches(sw(w)),
-            Inches(sh(h)),
+        shapes.add_text(
+            sx(x), sy(y), sw(w), sh(h), text, color, font_pt(size_px),
+            bold=bold, center=center, middle=middle,
         )
-        tf = shape.text_frame
-        tf.clear()
-        tf.margin_left = 0
-        tf.margin_right = 0
-        tf.margin_top = 0
-        tf.margin_bottom = 0
-        tf.word_wrap = False
-        tf.vertical_anchor = MSO_ANCHOR.MIDDLE if middle else MSO_ANCHOR.TOP
-        paragraph = tf.paragraphs[0]
-        paragraph.alignment = PP_ALIGN.CENTER if center else PP_ALIGN.LEFT
-        run = paragraph.add_run()
-        run.text = str(text)
-        run.font.name = font_name
-        run.font.bold = bool(bold)
-        run.font.size = Pt(font_pt(size_px))
-        run.font.color.rgb = rgb(color)
-        # 同时设置 latin/eastAsia/cs，确保中文文本在 PPT 中按指定字体渲染
-        r_pr = run._r.get_or_add_rPr()
-        for tag in ('latin', 'ea', 'cs'):
-            node = r_pr.find(qn(f'a:{tag}'))
-            if node is None:
-                node = parse_xml(f'<a:{tag} {nsdecls("a")} typeface="{font_name}"/>')
-                r_pr.append(node)
-            else:
-                node.set('typeface', font_name)
 
     if show_title:
         title_y = padding_y + 28 if show_podium else padding_y + 30
@@ -4024,7 +4970,7 @@ def export_students_pptx(request, pk):
     )
     filename = escape_uri_path(f'{classroom.name}_座次图.pptx')
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    return response
+    return _store_export_response(cache_key, response)
 
 
 def export_students_pptx_options_page(request, pk):
@@ -4034,28 +4980,13 @@ def export_students_pptx_options_page(request, pk):
     })
 
 
-def export_group_report(request, pk):
-    classroom = get_object_or_404(Classroom, pk=pk)
-    groups = list(classroom.groups.all())
-
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = '小组作业登记表'
-    
-    from openpyxl.worksheet.page import PageMargins
-
-    # 样式
-    thin_border = Border(
-        left=Side(style='thin'), right=Side(style='thin'),
-        top=Side(style='thin'), bottom=Side(style='thin'),
-    )
-    font_name = '鸿蒙黑体'
-    group_font = Font(name=font_name, bold=True, size=13)
-    name_font  = Font(name=font_name, size=11)
-    center     = Alignment(horizontal='center', vertical='center')
+def _write_group_report_sheet(wb, classroom, groups, occupied_group_seats):
+    """向 write-only 工作簿追加一张小组作业登记表（左右两栏，整页打印）。"""
+    _register_named_styles(wb, _group_report_named_styles())
+    ws = wb.create_sheet(title='小组作业登记表')
 
     # 页眉
-    header_text = f"&\"{font_name},Bold\"&14 {classroom.name} (          ) 登记表"
+    header_text = f"&\"{EXCEL_EXPORT_FONT_NAME},Bold\"&14 {classroom.name} (          ) 登记表"
     ws.oddHeader.center.text = header_text
     ws.evenHeader.center.text = header_text
 
@@ -4069,6 +5000,10 @@ def export_group_report(request, pk):
     WEIGHT_GAP = 10
     
     total_weight = 0
+
+    group_member_seats = defaultdict(list)
+    for s in occupied_group_seats:
+        group_member_seats[s.group_id].append(s)
     
     for i, group in enumerate(groups):
         # 组头
@@ -4081,7 +5016,7 @@ def export_group_report(request, pk):
         total_weight += WEIGHT_HEADER
         
         # 成员
-        seats = group.seats.select_related('student').filter(student__isnull=False)
+        seats = group_member_seats.get(group.pk, [])
         members = []
         for s in seats:
              is_ldr = (group.leader_id == s.student_id)
@@ -4227,69 +5162,111 @@ def export_group_report(request, pk):
     for b in range(1, boxes_count + 1):
         ws.column_dimensions[get_column_letter(right_col_idx + b)].width = box_width
 
-    # 5. 渲染内容
-    def _write_entry(ws, row, start_col, entry):
-        kind = entry['type']
-        
-        if kind == 'header':
-            ws.merge_cells(
-                start_row=row, start_column=start_col,
-                end_row=row, end_column=start_col + boxes_count
-            )
-            cell = ws.cell(row=row, column=start_col, value=entry['text'])
-            cell.font = group_font
-            cell.alignment = center
-            cell.fill = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
-            for c in range(start_col, start_col + boxes_count + 1):
-                ws.cell(row=row, column=c).border = thin_border
-            
-        elif kind == 'member':
-            cell_name = ws.cell(row=row, column=start_col, value=entry['text'])
-            cell_name.font = Font(name='微软雅黑', size=11, color="FF0000" if entry.get('is_leader') else "000000")
-            cell_name.alignment = center
-            cell_name.border = thin_border
-            for b in range(1, boxes_count + 1):
-                ws.cell(row=row, column=start_col + b).border = thin_border
-
+    # 5. 页面设置（write-only 工作表须在写第一行之前完成）
     start_row = 1
-    
-    for i in range(max_rows):
-        r = start_row + i
-        
-        # 写入内容
-        l_entry = left_entries[i] if i < len(left_entries) else None
-        r_entry = right_entries[i] if i < len(right_entries) else None
-        
-        if l_entry: _write_entry(ws, r, left_col_idx, l_entry)
-        if r_entry: _write_entry(ws, r, right_col_idx, r_entry)
-            
-        # 动态行高
-        h_pts = row_weights[i] * unit_h
-        ws.row_dimensions[r].height = h_pts
-            
-    # 设置打印区域
     last_col_letter = get_column_letter(right_col_idx + boxes_count)
     ws.print_area = f"A1:{last_col_letter}{start_row + max_rows - 1}"
 
-    # 6. 页面设置
-    ws.page_setup.orientation = ws.ORIENTATION_PORTRAIT
-    ws.page_setup.paperSize = ws.PAPERSIZE_A4
+    ws.page_setup.orientation = Worksheet.ORIENTATION_PORTRAIT
+    ws.page_setup.paperSize = Worksheet.PAPERSIZE_A4
     ws.page_setup.margins = PageMargins(
         left=0.25, right=0.25,
         top=0.5, bottom=0.25,
         header=0.3, footer=0.2
     )
     ws.print_options.horizontalCentered = True
-    
+
     # 强制一页
     ws.page_setup.fitToPage = True
     ws.page_setup.fitToWidth = 1
     ws.page_setup.fitToHeight = 1
 
+    # 6. 渲染内容
+    def _entry_cells(row, start_col, entry):
+        kind = entry['type']
+        if kind == 'header':
+            ws.merged_cells.add(CellRange(
+                min_col=start_col, min_row=row,
+                max_col=start_col + boxes_count, max_row=row
+            ))
+            return [_styled_cell(ws, entry['text'], '小组作业表组名')] + [
+                _styled_cell(ws, None, '小组作业表格子') for _ in range(boxes_count)
+            ]
+        if kind == 'member':
+            name_style = '小组作业表组长' if entry.get('is_leader') else '小组作业表组员'
+            return [_styled_cell(ws, entry['text'], name_style)] + [
+                _styled_cell(ws, None, '小组作业表格子') for _ in range(boxes_count)
+            ]
+        return []
+
+    for i in range(max_rows):
+        r = start_row + i
+
+        # 动态行高
+        ws.row_dimensions[r].height = row_weights[i] * unit_h
+
+        l_entry = left_entries[i] if i < len(left_entries) else None
+        r_entry = right_entries[i] if i < len(right_entries) else None
+
+        row_cells = _entry_cells(r, left_col_idx, l_entry) if l_entry else []
+        if r_entry:
+            row_cells += [None] * (right_col_idx - 1 - len(row_cells))
+            row_cells += _entry_cells(r, right_col_idx, r_entry)
+        ws.append(row_cells)
+    return ws
+
+
+@background_capable('export_group_report')
+def export_group_report(request, pk):
+    classroom = get_object_or_404(Classroom, pk=pk)
+    groups = list(classroom.groups.all())
+    occupied_group_seats = list(classroom.seats.select_related('student').filter(
+        group__isnull=False,
+        student__isnull=False
+    ))
+    cache_key = export_cache.make_key(
+        'export_group_report',
+        _export_fingerprint(classroom, occupied_group_seats, groups, with_seat_groups=False),
+        {}
+    )
+    cached = _cached_export_response(request, cache_key)
+    if cached is not None:
+        return cached
+
+    wb = openpyxl.Workbook(write_only=True)
+    _write_group_report_sheet(wb, classroom, groups, occupied_group_seats)
+
     response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
     response['Content-Disposition'] = f'attachment; filename="{classroom.name}_小组作业表.xlsx"'
     wb.save(response)
 
+    return _store_export_response(cache_key, response)
+
+
+
+def export_bundle(request):
+    """把所选班级的座次图（Excel、SVG、PPTX）与小组作业表打包成一个 ZIP，边渲染边输出。"""
+    params = request.POST if request.method == 'POST' else request.GET
+    try:
+        classroom_ids = [int(value) for value in params.getlist('classroom') if str(value).strip()]
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': '班级编号无效'}, status=400)
+    if params.get('all') in {'1', 'true', 'yes', 'on'}:
+        classrooms = list(Classroom.objects.order_by('name', 'pk'))
+    else:
+        classrooms = list(Classroom.objects.filter(pk__in=classroom_ids).order_by('name', 'pk'))
+    if not classrooms:
+        return JsonResponse({'status': 'error', 'message': '请选择要导出的班级'}, status=400)
+
+    formats = params.getlist('format') or list(EXPORT_BUNDLE_FORMATS)
+    unknown = [fmt for fmt in formats if fmt not in EXPORT_BUNDLE_FORMATS]
+    if unknown:
+        return JsonResponse({'status': 'error', 'message': f'不支持的导出格式：{"、".join(unknown)}'}, status=400)
+
+    tasks = build_bundle_tasks(classrooms, list(dict.fromkeys(formats)))
+    response = StreamingHttpResponse(iter_bundle_zip(tasks), content_type='application/zip')
+    filename = escape_uri_path(f'座次图导出_{timezone.localdate():%Y%m%d}.zip')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
     return response
 
 
@@ -677,158 +677,189 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     };
 
+    let stateVersion = null;
+
+    const readBootstrapState = () => {
+        const node = document.getElementById('classroom-bootstrap-state');
+        if (!node) return null;
+        try {
+            return JSON.parse(node.textContent);
+        } catch (err) {
+            return null;
+        }
+    };
+
     const refreshState = () => {
         if (!urls.state) return;
-        const selectedSeatKey = selectedSeat ? seatKey(selectedSeat) : null;
-        const selectedUnseatedId = selectedUnseated ? selectedUnseated.dataset.studentId : null;
-
         const stateUrl = `${urls.state}?t=${Date.now()}`;
-        fetch(stateUrl, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
-            .then(res => res.json())
+        const headers = { 'X-Requested-With': 'XMLHttpRequest' };
+        if (stateVersion) headers['If-None-Match'] = `"${stateVersion}"`;
+        fetch(stateUrl, { headers })
+            .then(res => {
+                // 304：状态未变化，无需重新渲染
+                if (res.status === 304) return null;
+                return res.json();
+            })
             .then(data => {
-                const seatMap = new Map();
-                data.seats.forEach(seat => {
-                    seatMap.set(`${seat.row}-${seat.col}`, seat);
-                });
-                seatElements.forEach(seat => {
-                    const key = seatKey(seat);
-                    const info = seatMap.get(key);
-                    if (info) updateSeatElement(seat, info);
-                });
-
-                if (unseatedList) {
-                    if (data.unseated && data.unseated.length) {
-                        unseatedList.innerHTML = data.unseated.map(student => {
-                            const score = student.score_display ? `${student.score_display}分` : '';
-                            return `
-                                <div class="unseated-item" draggable="true" data-student-id="${student.id}">
-                                    <div>
-                                        <div class="unseated-name">${student.name}</div>
-                                        <div class="unseated-info">${score}</div>
-                                    </div>
-                                    <button type="button" class="icon-btn delete-student" data-delete-url="${student.delete_url}">删除</button>
-                                </div>
-                            `;
-                        }).join('');
-                    } else {
-                        unseatedList.innerHTML = '<div class="empty-hint">所有学生已入座</div>';
-                    }
-                    applyUnseatedFilter();
+                if (!data) {
+                    clearDragFeedback();
+                    setDragEnabled(!groupMode);
+                    return;
                 }
+                applyState(data);
+            })
+            .catch(() => alert('刷新失败'));
+    };
 
-                if (unseatedCount) {
-                    unseatedCount.textContent = `${data.unseated_count} 人`;
-                }
+    const applyState = (data, { initial = false } = {}) => {
+        if (data.version) stateVersion = data.version;
+        const selectedSeatKey = selectedSeat ? seatKey(selectedSeat) : null;
+        const selectedUnseatedId = selectedUnseated ? selectedUnseated.dataset.studentId : null;
 
-                if (data.suggestions) {
-                    const toastContainer = document.getElementById('toast-container') || createToastContainer();
-                    toastContainer.innerHTML = ''; // 清空容器（简单同步逻辑，可优化）
-
-                    const listItems = [];
-                    data.suggestions.forEach(item => {
-                        if (typeof item === 'object' && item.action_label) {
-                            const suggestionType = item.type || '';
-                            if (!enabledActionSuggestionTypes.has(suggestionType)) {
-                                if (item.message) {
-                                    listItems.push(`<div class="suggestion-item">${item.message}</div>`);
-                                }
-                                return;
-                            }
-                            // 渲染为弹窗
-                            const toast = document.createElement('div');
-                            toast.className = 'toast-notification';
-                            toast.innerHTML = `
-                                <div class="toast-header">
-                                    <span>优化建议</span>
-                                    <span style="color:var(--text-secondary); font-weight:400; font-size:11px;">刚刚</span>
-                                </div>
-                                <div class="toast-body">${item.message}</div>
-                                <div class="toast-actions">
-                                    <button class="toast-btn primary toast-action-btn" data-url="${item.action_url}" data-msg-type="${suggestionType}">${item.action_label}</button>
-                                    ${item.ignore_label ? `<button class="toast-btn secondary toast-ignore-btn" data-url="${item.ignore_url}">${item.ignore_label}</button>` : ''}
-                                </div>
-                            `;
-                            toastContainer.appendChild(toast);
-                        } else {
-                            // 渲染为列表项
-                            listItems.push(`<div class="suggestion-item">${item}</div>`);
-                        }
-                    });
+        // 首屏内嵌状态与服务端渲染的座位、未入座列表同源，只需同步版本号与建议
+        if (!initial) {
+            const seatMap = new Map();
+            data.seats.forEach(seat => {
+                seatMap.set(`${seat.row}-${seat.col}`, seat);
+            });
+            seatElements.forEach(seat => {
+                const key = seatKey(seat);
+                const info = seatMap.get(key);
+                if (info) updateSeatElement(seat, info);
+            });
+        }
 
-                    // 绑定弹窗事件
-                    toastContainer.querySelectorAll('.toast-action-btn').forEach(btn => {
-                        btn.addEventListener('click', () => {
-                            const url = btn.dataset.url;
-                            const type = btn.dataset.msgType;
-
-                            if (type === 'export_suggestion') {
-                                const originalText = btn.textContent;
-                                btn.disabled = true;
-                                btn.textContent = '保存中...';
-                                saveExportFromUrl(url, {
-                                    fallbackFilename: '小组作业表.xlsx',
-                                    acceptMime: excelMime,
-                                    acceptExtensions: ['.xlsx']
-                                }).then((result) => {
-                                    if (result.status === 'cancelled') return;
-                                    if (result.status === 'saved') {
-                                        showInlineToast(`文件已保存：${result.filename}`);
-                                    } else if (result.status === 'downloaded') {
-                                        showInlineToast(`已开始下载：${result.filename}`);
-                                    }
-                                    btn.closest('.toast-notification')?.remove();
-                                }).catch((error) => {
-                                    alert(error?.message || '导出失败');
-                                }).finally(() => {
-                                    if (!btn.isConnected) return;
-                                    btn.disabled = false;
-                                    btn.textContent = originalText;
-                                });
-                                return;
-                            }
+        if (unseatedList && !initial) {
+            if (data.unseated && data.unseated.length) {
+                unseatedList.innerHTML = data.unseated.map(student => {
+                    const score = student.score_display ? `${student.score_display}分` : '';
+                    return `
+                        <div class="unseated-item" draggable="true" data-student-id="${student.id}">
+                            <div>
+                                <div class="unseated-name">${student.name}</div>
+                                <div class="unseated-info">${score}</div>
+                            </div>
+                            <button type="button" class="icon-btn delete-student" data-delete-url="${student.delete_url}">删除</button>
+                        </div>
+                    `;
+                }).join('');
+            } else {
+                unseatedList.innerHTML = '<div class="empty-hint">所有学生已入座</div>';
+            }
+            applyUnseatedFilter();
+        }
 
-                            if (type === 'auto_fixed') {
-                                btn.closest('.toast-notification').remove();
-                                return;
-                            }
+        if (unseatedCount && !initial) {
+            unseatedCount.textContent = `${data.unseated_count} 人`;
+        }
 
-                            handleResponse(postJson(url, {}));
-                        });
-                    });
+        if (data.suggestions) {
+            const toastContainer = document.getElementById('toast-container') || createToastContainer();
+            toastContainer.innerHTML = ''; // 清空容器（简单同步逻辑，可优化）
+
+            const listItems = [];
+            data.suggestions.forEach(item => {
+                if (typeof item === 'object' && item.action_label) {
+                    const suggestionType = item.type || '';
+                    if (!enabledActionSuggestionTypes.has(suggestionType)) {
+                        if (item.message) {
+                            listItems.push(`<div class="suggestion-item">${item.message}</div>`);
+                        }
+                        return;
+                    }
+                    // 渲染为弹窗
+                    const toast = document.createElement('div');
+                    toast.className = 'toast-notification';
+                    toast.innerHTML = `
+                        <div class="toast-header">
+                            <span>优化建议</span>
+                            <span style="color:var(--text-secondary); font-weight:400; font-size:11px;">刚刚</span>
+                        </div>
+                        <div class="toast-body">${item.message}</div>
+                        <div class="toast-actions">
+                            <button class="toast-btn primary toast-action-btn" data-url="${item.action_url}" data-msg-type="${suggestionType}">${item.action_label}</button>
+                            ${item.ignore_label ? `<button class="toast-btn secondary toast-ignore-btn" data-url="${item.ignore_url}">${item.ignore_label}</button>` : ''}
+                        </div>
+                    `;
+                    toastContainer.appendChild(toast);
+                } else {
+                    // 渲染为列表项
+                    listItems.push(`<div class="suggestion-item">${item}</div>`);
+                }
+            });
 
-                    toastContainer.querySelectorAll('.toast-ignore-btn').forEach(btn => {
-                        btn.addEventListener('click', () => {
-                            const url = btn.dataset.url;
-                            if (url && url !== '#') {
-                                handleResponse(postJson(url, {}));
+            // 绑定弹窗事件
+            toastContainer.querySelectorAll('.toast-action-btn').forEach(btn => {
+                btn.addEventListener('click', () => {
+                    const url = btn.dataset.url;
+                    const type = btn.dataset.msgType;
+
+                    if (type === 'export_suggestion') {
+                        const originalText = btn.textContent;
+                        btn.disabled = true;
+                        btn.textContent = '保存中...';
+                        saveExportFromUrl(url, {
+                            fallbackFilename: '小组作业表.xlsx',
+                            acceptMime: excelMime,
+                            acceptExtensions: ['.xlsx']
+                        }).then((result) => {
+                            if (result.status === 'cancelled') return;
+                            if (result.status === 'saved') {
+                                showInlineToast(`文件已保存：${result.filename}`);
+                            } else if (result.status === 'downloaded') {
+                                showInlineToast(`已开始下载：${result.filename}`);
                             }
-                            btn.closest('.toast-notification').remove();
+                            btn.closest('.toast-notification')?.remove();
+                        }).catch((error) => {
+                            alert(error?.message || '导出失败');
+                        }).finally(() => {
+                            if (!btn.isConnected) return;
+                            btn.disabled = false;
+                            btn.textContent = originalText;
                         });
-                    });
+                        return;
+                    }
 
-                    if (suggestionList) {
-                        if (listItems.length) {
-                            suggestionList.innerHTML = listItems.join('');
-                        } else {
-                            suggestionList.innerHTML = '<div class="empty-hint">当前布局没有明显问题</div>';
-                        }
+                    if (type === 'auto_fixed') {
+                        btn.closest('.toast-notification').remove();
+                        return;
                     }
-                }
 
-                if (selectedSeatKey) {
-                    const target = document.querySelector(`.seat[data-seat-key="${selectedSeatKey}"]`);
-                    if (target) setSelectedSeat(target);
-                }
+                    handleResponse(postJson(url, {}));
+                });
+            });
 
-                if (selectedUnseatedId) {
-                    const target = document.querySelector(`.unseated-item[data-student-id="${selectedUnseatedId}"]`);
-                    if (target) setSelectedUnseated(target);
+            toastContainer.querySelectorAll('.toast-ignore-btn').forEach(btn => {
+                btn.addEventListener('click', () => {
+                    const url = btn.dataset.url;
+                    if (url && url !== '#') {
+                        handleResponse(postJson(url, {}));
+                    }
+                    btn.closest('.toast-notification').remove();
+                });
+            });
+
+            if (suggestionList) {
+                if (listItems.length) {
+                    suggestionList.innerHTML = listItems.join('');
+                } else {
+                    suggestionList.innerHTML = '<div class="empty-hint">当前布局没有明显问题</div>';
                 }
+            }
+        }
 
-                clearDragFeedback();
-                setDragEnabled(!groupMode);
-            })
-            .catch(() => alert('刷新失败'));
+        if (selectedSeatKey) {
+            const target = document.querySelector(`.seat[data-seat-key="${selectedSeatKey}"]`);
+            if (target) setSelectedSeat(target);
+        }
+
+        if (selectedUnseatedId) {
+            const target = document.querySelector(`.unseated-item[data-student-id="${selectedUnseatedId}"]`);
+            if (target) setSelectedUnseated(target);
+        }
+
+        clearDragFeedback();
+        setDragEnabled(!groupMode);
     };
 
 
@@ -1533,4 +1564,42 @@ document.addEventListener('DOMContentLoaded', () => {
             hideContextMenu();
         });
     }
+
+    // 自动排座在后台任务中执行，按钮上显示进度，完成后刷新座位
+    const arrangeForm = document.querySelector('.quick-arrange-form');
+    if (arrangeForm) {
+        arrangeForm.addEventListener('submit', async (event) => {
+            event.preventDefault();
+            const arrangeBtn = document.getElementById('btn-auto-arrange');
+            const originalText = arrangeBtn ? arrangeBtn.textContent : '';
+            if (arrangeBtn) {
+                arrangeBtn.textContent = '排座中...';
+                arrangeBtn.disabled = true;
+            }
+            try {
+                await window.runBackgroundJob(arrangeForm.action, {
+                    method: 'POST',
+                    headers: {
+                        'X-Requested-With': 'XMLHttpRequest',
+                        'X-CSRFToken': csrf
+                    },
+                    body: new FormData(arrangeForm)
+                }, (progress, message) => {
+                    if (arrangeBtn && message) arrangeBtn.textContent = `${message}（${Math.round(progress * 100)}%）`;
+                });
+                refreshState();
+            } catch (error) {
+                showInlineToast(error?.message || '排座失败');
+            } finally {
+                if (arrangeBtn) {
+                    arrangeBtn.textContent = originalText;
+                    arrangeBtn.disabled = false;
+                }
+            }
+        });
+    }
+
+    // 使用页面内嵌的首屏状态完成初始化，后续刷新携带版本号以便服务端返回 304
+    const bootstrapState = readBootstrapState();
+    if (bootstrapState) applyState(bootstrapState, { initial: true });
 });
@@ -9,7 +9,7 @@ document.addEventListener('DOMContentLoaded', () => {
     const kind = root.dataset.kind || '';
     const isSvgLike = kind === 'svg' || kind === 'pptx';
     const exportUrl = root.dataset.exportUrl || '';
-    const previewStudentUrl = root.dataset.previewStudentUrl || '';
+    const previewUrl = root.dataset.previewUrl || '';
     const backUrl = root.dataset.backUrl || '/';
     const defaultFilename = root.dataset.defaultFilename || '导出文件';
     const acceptMime = root.dataset.acceptMime || '';
@@ -112,7 +112,9 @@ document.addEventListener('DOMContentLoaded', () => {
             }
         }
 
-        const response = await fetch(url, {
+        // 导出在后台任务中生成，完成后再下载生成的文件
+        const job = await window.runBackgroundJob(url, { method: 'GET' }, options.onProgress);
+        const response = await fetch(job.download_url, {
             method: 'GET',
             credentials: 'same-origin'
         });
@@ -198,7 +200,31 @@ document.addEventListener('DOMContentLoaded', () => {
         if (filenameEl) filenameEl.textContent = payload.filename;
     };
 
-    const renderSvgPreview = () => {
+    // 预览由服务端按班级的几何模型生成；首次取得布局指纹后，每次切换选项只重新生成样式与文字
+    let sceneVersion = '';
+    let previewToken = 0;
+    const previewCache = new Map();
+
+    const loadSceneVersion = async () => {
+        if (!previewUrl) return;
+        try {
+            const response = await fetch(buildUrlWithQuery(previewUrl, { format: 'json' }), {
+                method: 'GET',
+                credentials: 'same-origin',
+                headers: {
+                    'X-Requested-With': 'XMLHttpRequest'
+                }
+            });
+            const data = await response.json().catch(() => ({}));
+            if (response.ok && data.status === 'success') {
+                sceneVersion = data.scene?.version || '';
+            }
+        } catch (_) {
+            sceneVersion = '';
+        }
+    };
+
+    const renderSvgPreview = async () => {
         if (!isSvgLike) return;
         const theme = document.querySelector('input[name="svg-export-theme"]:checked')?.value || 'classic';
         const themeLabelMap = {
@@ -206,59 +232,6 @@ document.addEventListener('DOMContentLoaded', () => {
             minimal: '简洁灰',
             contrast: '高对比'
         };
-        const styleMap = {
-            classic: {
-                bg: '#f7faff',
-                title: '#0f172a',
-                name: '#111827',
-                sub: '#667085',
-                type: '#475467',
-                podiumFill: '#e7efff',
-                podiumStroke: '#c9dbff',
-                seatFillOccupied: '#eef4ff',
-                seatStrokeOccupied: '#bfd4ff',
-                seatFillEmpty: '#f8fbff',
-                seatStrokeEmpty: '#d3e1ff',
-                nonseatAisle: '#eff3f8',
-                nonseatStroke: '#d0d5dd',
-                tagText: '#ffffff',
-                groupPalette: ['#0a59f7', '#00a38c', '#ff8b00', '#e45193']
-            },
-            minimal: {
-                bg: '#f8fafc',
-                title: '#1f2937',
-                name: '#111827',
-                sub: '#6b7280',
-                type: '#4b5563',
-                podiumFill: '#edf2f7',
-                podiumStroke: '#d2dae6',
-                seatFillOccupied: '#f9fafb',
-                seatStrokeOccupied: '#cbd5e1',
-                seatFillEmpty: '#ffffff',
-                seatStrokeEmpty: '#d1d5db',
-                nonseatAisle: '#f1f5f9',
-                nonseatStroke: '#d1d5db',
-                tagText: '#ffffff',
-                groupPalette: ['#0a59f7', '#64748b', '#0f766e', '#b45309']
-            },
-            contrast: {
-                bg: '#0b1220',
-                title: '#e5ecff',
-                name: '#ffffff',
-                sub: '#b7c7e9',
-                type: '#d2dbf5',
-                podiumFill: '#1c2f5d',
-                podiumStroke: '#33509c',
-                seatFillOccupied: '#172a55',
-                seatStrokeOccupied: '#3b5db7',
-                seatFillEmpty: '#111b34',
-                seatStrokeEmpty: '#30477f',
-                nonseatAisle: '#1d2a44',
-                nonseatStroke: '#2e426f',
-                tagText: '#ffffff',
-                groupPalette: ['#0a59f7', '#0fa968', '#f59e0b', '#ef4444']
-            }
-        };
         const enabledFields = [];
         if (getChecked('svg-export-show-title') === '1') enabledFields.push('标题');
         if (getChecked('svg-export-show-podium') === '1') enabledFields.push('讲台');
@@ -275,166 +248,36 @@ document.addEventListener('DOMContentLoaded', () => {
 
         if (themeEl) themeEl.textContent = themeLabelMap[theme] || theme;
         if (fieldsEl) fieldsEl.textContent = enabledFields.length ? enabledFields.join('、') : '无';
-        if (!livePreviewEl) return;
-
-        const sample = window.__svgPreviewSample || {};
-        const style = styleMap[theme] || styleMap.classic;
-        const showTitle = getChecked('svg-export-show-title') === '1';
-        const showPodium = getChecked('svg-export-show-podium') === '1';
-        const showCoords = getChecked('svg-export-show-coords') === '1';
-        const showName = getChecked('svg-export-show-name') === '1';
-        const showScore = getChecked('svg-export-show-score') === '1';
-        const showGroup = getChecked('svg-export-show-group') === '1';
-        const showEmptyLabel = getChecked('svg-export-show-empty-label') === '1';
-        const showSeatType = getChecked('svg-export-show-seat-type') === '1';
-        const nameEmphasis = showName && !showCoords && !showScore;
-
-        const width = 500;
-        const height = 260;
-        const titleY = 28;
-        const podiumY = showTitle ? 36 : 16;
-        const seatY = showPodium ? 78 : 56;
-        const groupColor = style.groupPalette[(sample.groupIndex || 0) % style.groupPalette.length];
-        const nameFontSize = (text) => {
-            const length = Math.max(1, String(text || '').length);
-            let size = 30 - length * 2;
-            if (size < 16) size = 16;
-            if (size > 26) size = 26;
-            return size;
-        };
-        const safe = (text) => String(text || '')
-            .replaceAll('&', '&amp;')
-            .replaceAll('<', '&lt;')
-            .replaceAll('>', '&gt;')
-            .replaceAll('"', '&quot;')
-            .replaceAll("'", '&#39;');
-
-        const chunks = [
-            `<svg xmlns="http://www.w3.org/2000/svg" width="${width}" height="${height}" viewBox="0 0 ${width} ${height}">`,
-            '<style><![CDATA[',
-            '.t{font:700 20px "HarmonyOS Sans SC","PingFang SC","Microsoft YaHei",sans-serif;}',
-            '.n{font:600 16px "HarmonyOS Sans SC","PingFang SC","Microsoft YaHei",sans-serif;}',
-            '.s{font:500 12px "HarmonyOS Sans SC","PingFang SC","Microsoft YaHei",sans-serif;}',
-            '.k{font:700 11px "HarmonyOS Sans SC","PingFang SC","Microsoft YaHei",sans-serif;}',
-            '.c{font:600 13px "HarmonyOS Sans SC","PingFang SC","Microsoft YaHei",sans-serif;}',
-            ']]></style>',
-            `<rect x="0" y="0" width="${width}" height="${height}" fill="${style.bg}"/>`
-        ];
-
-        if (showTitle) {
-            chunks.push(`<text x="20" y="${titleY}" class="t" fill="${style.title}">${safe(sample.classroom || '示例班级')} 座次图</text>`);
-        }
-
-        if (showPodium) {
-            chunks.push(`<rect x="160" y="${podiumY}" width="180" height="30" rx="10" fill="${style.podiumFill}" stroke="${style.podiumStroke}"/>`);
-            chunks.push(`<text x="250" y="${podiumY + 20}" text-anchor="middle" class="c" fill="${style.type}">讲台</text>`);
-        }
+        if (!livePreviewEl || !previewUrl) return;
 
-        chunks.push(`<rect x="20" y="${seatY}" width="200" height="120" rx="16" fill="${style.seatFillOccupied}" stroke="${style.seatStrokeOccupied}"/>`);
-        if (showCoords) {
-            chunks.push(`<text x="30" y="${seatY + 18}" class="s" fill="${style.sub}">(${safe(sample.coord || '1-1')})</text>`);
-        }
-        if (showGroup) {
-            chunks.push(`<rect x="154" y="${seatY + 8}" width="56" height="20" rx="10" fill="${groupColor}"/>`);
-            chunks.push(`<text x="182" y="${seatY + 22}" text-anchor="middle" class="k" fill="${style.tagText}">${safe(sample.group || '未分组')}</text>`);
-        }
-        if (showName) {
-            const rawName = String(sample.name || '随机学生');
-            const nameText = safe(rawName);
-            if (nameEmphasis) {
-                const fontSize = nameFontSize(rawName);
-                const centerY = seatY + (showGroup ? 66 : 60);
-                chunks.push(`<text x="120" y="${centerY}" text-anchor="middle" dominant-baseline="middle" class="n" font-size="${fontSize}" fill="${style.name}">${nameText}</text>`);
-            } else {
-                chunks.push(`<text x="34" y="${seatY + (showCoords ? 58 : 46)}" class="n" fill="${style.name}">${nameText}</text>`);
-            }
-        }
-        if (showScore) {
-            chunks.push(`<text x="34" y="${seatY + (showCoords ? 80 : 68)}" class="s" fill="${style.sub}">${safe(sample.score || 90)}分</text>`);
-        }
-
-        chunks.push(`<rect x="240" y="${seatY}" width="120" height="120" rx="16" fill="${style.seatFillEmpty}" stroke="${style.seatStrokeEmpty}"/>`);
-        if (showEmptyLabel) {
-            chunks.push(`<text x="254" y="${seatY + 66}" class="s" fill="${style.sub}">空座位</text>`);
-        }
-        chunks.push(`<rect x="380" y="${seatY}" width="100" height="120" rx="16" fill="${style.nonseatAisle}" stroke="${style.nonseatStroke}"/>`);
-        if (showSeatType) {
-            chunks.push(`<text x="430" y="${seatY + 66}" text-anchor="middle" class="c" fill="${style.type}">走廊</text>`);
-        }
-
-        chunks.push('</svg>');
-        livePreviewEl.innerHTML = chunks.join('');
-    };
-
-    const setFallbackSvgSample = () => {
-        window.__svgPreviewSample = {
-            classroom: '预览班级',
-            name: '暂无学生',
-            score: '',
-            group: '',
-            groupIndex: 0,
-            coord: ''
-        };
-    };
-
-    const fetchRandomSvgSample = async () => {
-        if (!previewStudentUrl) {
-            setFallbackSvgSample();
+        const query = new URL(buildSvgExport().url, window.location.origin).search;
+        const cached = previewCache.get(query);
+        if (cached !== undefined) {
+            livePreviewEl.innerHTML = cached;
             return;
         }
+
+        // 快速连续切换时只显示最后一次请求的结果
+        const token = ++previewToken;
         try {
-            const response = await fetch(previewStudentUrl, {
+            const params = Object.fromEntries(new URLSearchParams(query));
+            const response = await fetch(buildUrlWithQuery(previewUrl, { ...params, version: sceneVersion }), {
                 method: 'GET',
-                credentials: 'same-origin',
-                headers: {
-                    'X-Requested-With': 'XMLHttpRequest'
-                }
+                credentials: 'same-origin'
             });
-            const data = await response.json().catch(() => ({}));
-            if (!response.ok || data.status === 'error') {
-                throw new Error(data.message || '获取预览学生失败');
-            }
-            if (data.status === 'empty') {
-                setFallbackSvgSample();
-                return;
+            if (!response.ok) return;
+            const markup = await response.text();
+            sceneVersion = response.headers.get('X-Scene-Version') || sceneVersion;
+            previewCache.set(query, markup);
+            if (token === previewToken) {
+                livePreviewEl.innerHTML = markup;
             }
-            const sample = data.sample || {};
-            window.__svgPreviewSample = {
-                classroom: sample.classroom || '预览班级',
-                name: sample.name || '未命名学生',
-                score: sample.score || '',
-                group: sample.group || '',
-                groupIndex: Number(sample.group_index || 0),
-                coord: sample.coord || ''
-            };
         } catch (_) {
-            setFallbackSvgSample();
+            // 预览失败不影响导出
         }
     };
 
-    const bindSvgPreviewRandomButton = () => {
-        const randomBtn = document.getElementById('svg-preview-random-btn');
-        if (!randomBtn) return;
-        randomBtn.addEventListener('click', async () => {
-            if (randomBtn.dataset.pending === '1') return;
-            randomBtn.dataset.pending = '1';
-            const originalText = randomBtn.textContent;
-            randomBtn.textContent = '加载中...';
-            randomBtn.disabled = true;
-            await fetchRandomSvgSample();
-            renderSvgPreview();
-            randomBtn.textContent = originalText;
-            randomBtn.disabled = false;
-            randomBtn.dataset.pending = '';
-        });
-    };
-
     resetColumnScrollTop();
-    if (isSvgLike) {
-        if (!window.__svgPreviewSample) {
-            setFallbackSvgSample();
-        }
-    }
 
     const getExportPayload = () => {
         if (kind === 'excel') return buildExcelExport();
@@ -460,8 +303,7 @@ document.addEventListener('DOMContentLoaded', () => {
             .forEach((element) => {
                 element.addEventListener('change', renderSvgPreview);
             });
-        bindSvgPreviewRandomButton();
-        fetchRandomSvgSample().finally(renderSvgPreview);
+        loadSceneVersion().finally(renderSvgPreview);
     }
 
     if (confirmBtn) {
@@ -483,7 +325,10 @@ document.addEventListener('DOMContentLoaded', () => {
                 const result = await saveExportFromUrl(payload.url, {
                     fallbackFilename: payload.filename,
                     acceptMime,
-                    acceptExtensions
+                    acceptExtensions,
+                    onProgress: (progress, message) => {
+                        if (progress > 0) setHint(`${message || '正在导出'}（${Math.round(progress * 100)}%）`);
+                    }
                 });
                 if (result.status === 'cancelled') {
                     setHint('已取消保存。');
@@ -14,6 +14,8 @@ document.addEventListener('DOMContentLoaded', () => {
 
     let seatLayoutFileId = null;
     let seatLayoutTransform = 'none';
+    // 同一张表中有多个座位区域时，后端自动选定的列范围；为空表示按所选行自动确定
+    let seatLayoutCols = { start: '', end: '' };
 
     const setHint = (text) => {
         if (!hint) return;
@@ -71,7 +73,9 @@ document.addEventListener('DOMContentLoaded', () => {
             manual_podium_terms: document.getElementById('seat-layout-manual-podium')?.value || '',
             manual_empty_terms: document.getElementById('seat-layout-manual-empty')?.value || '',
             manual_aisle_terms: document.getElementById('seat-layout-manual-aisle')?.value || '',
-            layout_transform: seatLayoutTransform
+            layout_transform: seatLayoutTransform,
+            start_col: seatLayoutCols.start,
+            end_col: seatLayoutCols.end
         };
         if (includeReplaceStudents) {
             options.replace_students = document.getElementById('seat-layout-replace-students')?.checked ? '1' : '0';
@@ -153,14 +157,21 @@ document.addEventListener('DOMContentLoaded', () => {
         });
 
         const csrf = uploadForm?.querySelector('input[name="csrfmiddlewaretoken"]')?.value || '';
-        return fetch(importUrl, {
+        const init = {
             method: 'POST',
             headers: {
                 'X-Requested-With': 'XMLHttpRequest',
                 'X-CSRFToken': csrf
             },
             body: formData
-        }).then(async (response) => {
+        };
+        if (action === 'confirm') {
+            // 正式导入在后台任务中执行，期间显示进度
+            return window.runBackgroundJob(importUrl, init, (progress, message) => {
+                if (message) setHint(`${message}（${Math.round(progress * 100)}%）`);
+            });
+        }
+        return fetch(importUrl, init).then(async (response) => {
             const data = await response.json().catch(() => ({}));
             if (!response.ok || data.status === 'error') {
                 throw new Error(data.message || '导入失败');
@@ -210,6 +221,7 @@ document.addEventListener('DOMContentLoaded', () => {
         uploadForm.addEventListener('submit', async (event) => {
             event.preventDefault();
             seatLayoutFileId = null;
+            seatLayoutCols = { start: '', end: '' };
             setTransform('none', true);
             setHint('正在上传并识别文件...');
 
@@ -239,8 +251,20 @@ document.addEventListener('DOMContentLoaded', () => {
                 if (data.status !== 'ready') {
                     throw new Error(data.message || '识别失败');
                 }
+                const autoSelected = data.auto_selected || {};
+                seatLayoutCols = {
+                    start: autoSelected.start_col || '',
+                    end: autoSelected.end_col || ''
+                };
                 applyPreviewData(data);
-                setHint(data.message || '文件解析完成，请确认范围后导入。');
+                const blockCount = (autoSelected.blocks || []).length;
+                let blockHint = '';
+                if (blockCount > 1) {
+                    blockHint = seatLayoutCols.start
+                        ? `（表中识别到 ${blockCount} 个座位区域，已选取人数最多的一块）`
+                        : `（表中识别到 ${blockCount} 个座位区域，未能确认是不同班级，已按整表范围识别）`;
+                }
+                setHint(`${data.message || '文件解析完成，请确认范围后导入。'}${blockHint}`);
             } catch (error) {
                 setHint('');
                 alert(error?.message || '识别失败');
@@ -15,12 +15,16 @@ document.addEventListener('DOMContentLoaded', () => {
     const previewArea = document.getElementById('import-preview-area');
     const stageText = document.getElementById('student-import-stage');
     const modePreview = document.getElementById('student-import-mode-preview');
+    const fuzzyReview = document.getElementById('import-fuzzy-review');
+    const fuzzyList = document.getElementById('import-fuzzy-list');
+    const acceptFuzzyInput = document.getElementById('import-accept-fuzzy');
 
     const importUrl = root.dataset.importUrl || '';
     const backUrl = root.dataset.backUrl || '/';
 
     let currentImportData = null;
     let currentImportFileId = null;
+    let matchPreviewTimer = null;
 
     const exitPage = () => {
         window.location.href = backUrl;
@@ -68,6 +72,8 @@ document.addEventListener('DOMContentLoaded', () => {
         currentImportData = null;
         currentImportFileId = null;
         if (mappingPanel) mappingPanel.style.display = 'none';
+        if (fuzzyReview) fuzzyReview.style.display = 'none';
+        if (acceptFuzzyInput) acceptFuzzyInput.checked = false;
     };
 
     const updateColumnSelects = () => {
@@ -127,6 +133,64 @@ document.addEventListener('DOMContentLoaded', () => {
         previewArea.innerHTML = html;
     };
 
+    const renderFuzzyReview = (items) => {
+        if (!fuzzyReview || !fuzzyList) return;
+        if (!items || !items.length) {
+            fuzzyReview.style.display = 'none';
+            fuzzyList.innerHTML = '';
+            return;
+        }
+        let html = '<table class="preview-table"><thead><tr><th>行</th><th>导入姓名</th><th>现有学生</th><th>相似度</th></tr></thead><tbody>';
+        items.forEach((item) => {
+            html += `<tr><td>${escapeHtml(item.row)}</td><td>${escapeHtml(item.name)}</td><td>${escapeHtml(item.matched_name)}</td><td>${Math.round((item.confidence || 0) * 100)}%</td></tr>`;
+        });
+        html += '</tbody></table>';
+        fuzzyList.innerHTML = html;
+        fuzzyReview.style.display = '';
+    };
+
+    const showProgress = (progress, message) => {
+        if (message) setHint(`${message}（${Math.round(progress * 100)}%）`);
+    };
+
+    const buildMappingFormData = (action) => {
+        const formData = new FormData();
+        formData.append('action', action);
+        formData.append('file_id', currentImportFileId);
+        formData.append('start_row', Math.max(0, (parseInt(startRowInput?.value || '1', 10) || 1) - 1));
+        formData.append('name_col_index', nameColSelect.value);
+        formData.append('import_mode', getImportMode());
+        if (scoreColSelect && scoreColSelect.value !== '') {
+            formData.append('score_col_index', scoreColSelect.value);
+        }
+        return formData;
+    };
+
+    const refreshMatchPreview = () => {
+        clearTimeout(matchPreviewTimer);
+        renderFuzzyReview([]);
+        if (!currentImportFileId || !nameColSelect || nameColSelect.value === '' || getImportMode() !== 'match') return;
+        matchPreviewTimer = setTimeout(async () => {
+            const csrf = importForm?.querySelector('input[name="csrfmiddlewaretoken"]')?.value || '';
+            try {
+                const response = await fetch(importUrl, {
+                    method: 'POST',
+                    headers: {
+                        'X-Requested-With': 'XMLHttpRequest',
+                        'X-CSRFToken': csrf
+                    },
+                    body: buildMappingFormData('preview_matches')
+                });
+                const data = await response.json().catch(() => ({}));
+                if (response.ok && data.status === 'success') {
+                    renderFuzzyReview(data.fuzzy_review);
+                }
+            } catch (error) {
+                renderFuzzyReview([]);
+            }
+        }, 250);
+    };
+
     const showMapping = (data) => {
         currentImportData = data.preview_data || [];
         currentImportFileId = data.file_id || '';
@@ -134,6 +198,7 @@ document.addEventListener('DOMContentLoaded', () => {
         if (startRowInput) startRowInput.value = 1;
         updateColumnSelects();
         updatePreview();
+        refreshMatchPreview();
     };
 
     if (cancelBtn) {
@@ -150,7 +215,10 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     importForm?.querySelectorAll('input[name="import_mode"]').forEach((input) => {
-        input.addEventListener('change', updateModePreview);
+        input.addEventListener('change', () => {
+            updateModePreview();
+            refreshMatchPreview();
+        });
     });
     updateModePreview();
 
@@ -158,10 +226,14 @@ document.addEventListener('DOMContentLoaded', () => {
         startRowInput.addEventListener('change', () => {
             updateColumnSelects();
             updatePreview();
+            refreshMatchPreview();
         });
     }
     if (nameColSelect) {
-        nameColSelect.addEventListener('change', updatePreview);
+        nameColSelect.addEventListener('change', () => {
+            updatePreview();
+            refreshMatchPreview();
+        });
     }
     if (scoreColSelect) {
         scoreColSelect.addEventListener('change', updatePreview);
@@ -182,18 +254,14 @@ document.addEventListener('DOMContentLoaded', () => {
             const csrf = importForm.querySelector('input[name="csrfmiddlewaretoken"]')?.value || '';
 
             try {
-                const response = await fetch(importForm.action || importUrl, {
+                const data = await window.runBackgroundJob(importForm.action || importUrl, {
                     method: 'POST',
                     headers: {
                         'X-Requested-With': 'XMLHttpRequest',
                         'X-CSRFToken': csrf
                     },
                     body: formData
-                });
-                const data = await response.json().catch(() => ({}));
-                if (!response.ok) {
-                    throw new Error(data.message || '导入失败');
-                }
+                }, showProgress);
 
                 if (data.status === 'success') {
                     setHint(`${data.message || '导入成功'}，正在返回...`);
@@ -233,28 +301,22 @@ document.addEventListener('DOMContentLoaded', () => {
             confirmBtn.disabled = true;
             setHint('正在导入，请稍候...');
 
-            const formData = new FormData();
-            formData.append('action', 'confirm');
-            formData.append('file_id', currentImportFileId);
-            formData.append('start_row', Math.max(0, (parseInt(startRowInput?.value || '1', 10) || 1) - 1));
-            formData.append('name_col_index', nameColSelect.value);
-            formData.append('import_mode', getImportMode());
-            if (scoreColSelect && scoreColSelect.value !== '') {
-                formData.append('score_col_index', scoreColSelect.value);
+            const formData = buildMappingFormData('confirm');
+            if (acceptFuzzyInput && acceptFuzzyInput.checked) {
+                formData.append('accept_fuzzy', '1');
             }
 
             const csrf = importForm?.querySelector('input[name="csrfmiddlewaretoken"]')?.value || '';
             try {
-                const response = await fetch(importUrl, {
+                const data = await window.runBackgroundJob(importUrl, {
                     method: 'POST',
                     headers: {
                         'X-Requested-With': 'XMLHttpRequest',
                         'X-CSRFToken': csrf
                     },
                     body: formData
-                });
-                const data = await response.json().catch(() => ({}));
-                if (!response.ok || data.status !== 'success') {
+                }, showProgress);
+                if (data.status !== 'success') {
                     throw new Error(data.message || '导入失败');
                 }
                 setHint(`${data.message || '导入成功'}，正在返回...`);
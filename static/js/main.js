@@ -1,3 +1,32 @@
+// 后台任务：请求带上 async=1 后由服务端放入后台执行，这里轮询任务状态并回调进度，
+// 完成时返回任务结果（导出文件为 download_url 等信息，其余为视图原本返回的 JSON）
+const JOB_POLL_INTERVAL = 500;
+
+window.runBackgroundJob = async (url, init = {}, onProgress = null) => {
+    const target = new URL(url, window.location.origin);
+    target.searchParams.set('async', '1');
+    const response = await fetch(`${target.pathname}${target.search}`, {
+        credentials: 'same-origin',
+        ...init
+    });
+    const queued = await response.json().catch(() => ({}));
+    if (response.status !== 202 || !queued.job_url) {
+        throw new Error(queued.message || `任务提交失败（${response.status}）`);
+    }
+
+    for (;;) {
+        await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL));
+        const statusResponse = await fetch(queued.job_url, { credentials: 'same-origin' });
+        const job = await statusResponse.json().catch(() => ({}));
+        if (!statusResponse.ok) {
+            throw new Error(job.message || `任务状态查询失败（${statusResponse.status}）`);
+        }
+        if (job.status === 'success') return job.result || {};
+        if (job.status === 'failed') throw new Error(job.message || '任务执行失败');
+        if (onProgress) onProgress(job.progress || 0, job.message || '');
+    }
+};
+
 document.addEventListener('DOMContentLoaded', () => {
     const header = document.querySelector('.app-header');
     const titlebarBadge = document.querySelector('.titlebar-badge');